@@ -0,0 +1,61 @@
+"""
+Throughput of src/backfill.py vs number of worker processes, per backend.
+
+Generates --files synthetic <timestamp>.npy spectrograms and scores them
+with nothing written (sink=None), so the numbers are loading + inference
+only. Speedup is relative to 1 worker of the same backend; it can only be
+near-linear up to the number of physical cores.
+
+    python benchmarks/backfill_scaling.py --files 256 --workers 1 2 4 --backends ort ort-int8
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+from src.backfill import backfill, list_inputs, BACKENDS
+from src.ort_session import available_cpus
+
+
+def write_spectrograms(directory, files, frames, seed=0):
+    rng = np.random.default_rng(seed)
+    for k in range(files):
+        np.save(os.path.join(directory, f"2004.02.12.{k // 60:02d}.{k % 60:02d}.00.npy"),
+                rng.random((128, frames), dtype=np.float32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=256)
+    parser.add_argument('--frames', type=int, default=161)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--backends', nargs='+', default=['ort'], choices=sorted(BACKENDS))
+    parser.add_argument('--shard-size', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_spectrograms(directory, args.files, args.frames)
+        paths = list_inputs(spectrogram_dir=directory)
+        print(f"CPU: {available_cpus()}, pliki: {args.files} x {args.frames} ramek, "
+              f"shard: {args.shard_size}")
+        print(f"{'backend':<10}{'procesy':>8}{'wątki':>7}{'pliki/s':>10}{'okna/s':>10}"
+              f"{'speedup':>9}")
+        for backend in args.backends:
+            baseline = None
+            for workers in args.workers:
+                stats = backfill(paths, None, backend, workers=workers,
+                                 shard_size=args.shard_size)
+                baseline = baseline or stats['files_per_s']
+                print(f"{backend:<10}{workers:>8}{stats['threads']:>7}"
+                      f"{stats['files_per_s']:>10.1f}{stats['windows_per_s']:>10.0f}"
+                      f"{stats['files_per_s'] / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
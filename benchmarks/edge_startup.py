@@ -0,0 +1,70 @@
+"""
+Startup time / RSS benchmark: librosa feature path vs. NumPy/SciPy path.
+
+Every variant runs in a fresh interpreter (like an edge process would):
+import the feature code, compute one mel-spectrogram of a 20480-sample
+snapshot and report import time, time to first spectrogram and peak RSS.
+
+    python benchmarks/edge_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+CHILD_CODE = r'''
+import json, resource, sys, time
+t0 = time.perf_counter()
+{imports}
+import numpy as np
+import pandas as pd
+from src.data_loader import compute_melspec
+t1 = time.perf_counter()
+rng = np.random.default_rng(0)
+df = pd.DataFrame(rng.normal(0, 0.1, (20480, 4)),
+                  columns=['Bearing_1', 'Bearing_2', 'Bearing_3', 'Bearing_4'])
+melspec = compute_melspec(df, backend='{backend}')
+t2 = time.perf_counter()
+print(json.dumps({{
+    'import_s': t1 - t0,
+    'first_spectrogram_s': t2 - t0,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'librosa_loaded': 'librosa.core' in sys.modules,
+}}))
+'''
+
+VARIANTS = {
+    # the imports data_loader used to pay at module level
+    'librosa (eager imports)': dict(
+        imports='import librosa, librosa.display\nfrom sklearn.preprocessing import MinMaxScaler',
+        backend='librosa'),
+    'librosa (lazy)': dict(imports='', backend='librosa'),
+    'numpy/scipy': dict(imports='', backend='numpy'),
+}
+
+
+def run_variant(imports, backend):
+    code = CHILD_CODE.format(imports=imports, backend=backend)
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=project_root)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'wariant':<26}{'import [s]':>12}{'1. spektrogram [s]':>20}{'RSS [MB]':>10}  librosa")
+    for name, variant in VARIANTS.items():
+        results = [run_variant(**variant) for _ in range(args.runs)]
+        best = min(results, key=lambda r: r['first_spectrogram_s'])
+        print(f"{name:<26}{best['import_s']:>12.3f}{best['first_spectrogram_s']:>20.3f}"
+              f"{best['max_rss_mb']:>10.1f}  {best['librosa_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Edge vs cloud scoring: uplink bytes and end-to-end latency per snapshot.
+
+cloud: spectrogram encoded on the device -> uplink -> decoded + scored in Lambda
+edge:  scored on the device -> result record uplink (+ spectrogram on
+       anomaly / every --sample-every snapshot)
+Uplink time is modelled from --uplink-kbps (typical cellular/LoRa gateway
+link), compute is measured. The model runs on this machine for both sides,
+so the edge numbers are optimistic for a weaker device.
+
+    python benchmarks/edge_vs_cloud.py --data-dir data/raw/2nd_test --files 50
+Without --data-dir synthetic vibration snapshots are used.
+"""
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+import onnxruntime as ort
+
+from src.codec import encode_payload, decode_spectrogram
+from src.scoring import score_spectrogram
+from edge.edge_inference import EdgeScorer, MODEL_PATH
+from benchmarks.uplink_format import synthetic_snapshots, dataset_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data-dir', default=None)
+    parser.add_argument('--files', type=int, default=30)
+    parser.add_argument('--uplink-format', default='uint8')
+    parser.add_argument('--uplink-kbps', type=float, default=256.0)
+    parser.add_argument('--sample-every', type=int, default=10)
+    args = parser.parse_args()
+
+    snapshots = list(dataset_snapshots(args.data_dir, args.files) if args.data_dir
+                     else synthetic_snapshots(args.files))
+    session = ort.InferenceSession(MODEL_PATH)
+    scorer = EdgeScorer(session=session, sample_every=args.sample_every)
+    bytes_per_s = args.uplink_kbps * 1000 / 8
+
+    cloud_bytes, cloud_ms, edge_bytes, edge_ms, uploaded_spectrograms = [], [], [], [], 0
+    for i, spectrogram in enumerate(snapshots):
+        # cloud scoring
+        start = time.perf_counter()
+        payload, _ = encode_payload(spectrogram, args.uplink_format)
+        score_spectrogram(session, decode_spectrogram(payload))
+        compute = time.perf_counter() - start
+        cloud_bytes.append(len(payload))
+        cloud_ms.append(1000 * (compute + len(payload) / bytes_per_s))
+
+        # edge scoring
+        start = time.perf_counter()
+        record, send_spectrogram = scorer.score(f"snapshot_{i:05d}", spectrogram)
+        sent = len(scorer.result_payload(record))
+        compute = time.perf_counter() - start
+        edge_ms.append(1000 * (compute + sent / bytes_per_s))
+        if send_spectrogram:
+            sent += len(encode_payload(spectrogram, args.uplink_format)[0])
+            uploaded_spectrograms += 1
+        edge_bytes.append(sent)
+
+    print(f"Snapshotów: {len(snapshots)}, uplink: {args.uplink_format}, "
+          f"{args.uplink_kbps:.0f} kbps, próbkowanie co {args.sample_every}")
+    print(f"Spektrogramy wysłane z edge: {uploaded_spectrograms}/{len(snapshots)}")
+    print(f"{'tryb':<8}{'B/snapshot':>12}{'suma [kB]':>12}"
+          f"{'wynik p50 [ms]':>16}{'wynik p95 [ms]':>16}")
+    for label, sizes, latency in (('cloud', cloud_bytes, cloud_ms),
+                                  ('edge', edge_bytes, edge_ms)):
+        print(f"{label:<8}{np.mean(sizes):>12.0f}{sum(sizes) / 1000:>12.1f}"
+              f"{np.percentile(latency, 50):>16.2f}{np.percentile(latency, 95):>16.2f}")
+    print(f"Redukcja uplinku: {sum(cloud_bytes) / sum(edge_bytes):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
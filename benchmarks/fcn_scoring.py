@@ -0,0 +1,65 @@
+"""
+Window-based vs fully-convolutional scoring: latency and MSE parity.
+
+windows: 64-wide windows with stride 32 (every column passes the network ~2x)
+fcn:     one pass of models/bearing_model_fcn.onnx over the whole spectrogram,
+         per-window MSE from the error map (src/scoring.py)
+
+    python benchmarks/fcn_scoring.py --frames 161 1600 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+import onnxruntime as ort
+
+from src.scoring import score_spectrogram, score_spectrogram_fcn
+from src.preprocessing import count_windows
+
+MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model.onnx')
+FCN_MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model_fcn.onnx')
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, nargs='+', default=[161, 1600])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    window_session = ort.InferenceSession(MODEL_PATH)
+    fcn_session = ort.InferenceSession(FCN_MODEL_PATH)
+    rng = np.random.default_rng(0)
+
+    print(f"{'kolumny':>9}{'okna':>7}{'okna [ms]':>11}{'fcn [ms]':>10}"
+          f"{'przyspieszenie':>16}{'|ΔMSE|/MSE':>13}{'max okno':>10}")
+    for frames in args.frames:
+        spectrogram = np.clip(rng.normal(0.5, 0.1, (128, frames)), 0, 1).astype(np.float32)
+
+        windows = score_spectrogram(window_session, spectrogram)
+        fcn = score_spectrogram_fcn(fcn_session, spectrogram)
+        file_drift = abs(fcn.mean() - windows.mean()) / windows.mean()
+        window_drift = np.max(np.abs(fcn - windows) / windows)
+
+        window_ms = best_of(lambda: score_spectrogram(window_session, spectrogram), args.repeat)
+        fcn_ms = best_of(lambda: score_spectrogram_fcn(fcn_session, spectrogram), args.repeat)
+        print(f"{frames:>9}{count_windows(frames):>7}{window_ms:>11.2f}{fcn_ms:>10.2f}"
+              f"{window_ms / fcn_ms:>15.1f}x{file_drift:>13.2e}{window_drift:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
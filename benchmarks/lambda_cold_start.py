@@ -0,0 +1,118 @@
+"""
+Cold vs warm invocation latency of cloud/lambda_handler.py.
+
+Every variant runs in a fresh process (= new Lambda container): import of
+the handler module (the init phase), then --invocations S3 events against
+in-memory S3/DynamoDB fakes.
+
+lazy:          model/config loaded inside the first request (EAGER_INIT=0)
+eager:         loaded at import, no warm-up inference
+eager+warmup:  loaded at import + one dummy micro-batch (the Lambda default)
+
+    python benchmarks/lambda_cold_start.py --frames 161 --invocations 20 --runs 3
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+VARIANTS = {
+    'lazy': {'EAGER_INIT': '0'},
+    'eager': {'EAGER_INIT': '1', 'WARMUP_INFERENCE': '0'},
+    'eager+warmup': {'EAGER_INIT': '1', 'WARMUP_INFERENCE': '1'},
+}
+
+
+class MemoryTable:
+    """put_item / batch_writer that only count items"""
+
+    def __init__(self):
+        self.items = 0
+
+    def put_item(self, Item):
+        self.items += 1
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def run_child(frames, invocations):
+    """Child process (cwd = package dir): JSON with init and per-invocation times [ms]"""
+    from benchmarks.s3_ingest import MemoryS3
+
+    start = time.perf_counter()
+    import cloud.lambda_handler as lh
+    init_ms = 1000 * (time.perf_counter() - start)
+
+    lh.s3, lh.table = MemoryS3(), MemoryTable()
+    buffer = io.BytesIO()
+    np.save(buffer, np.random.default_rng(0).random((128, frames), dtype=np.float32))
+    lh.s3.put_object(Bucket='bench', Key='snapshot.npy', Body=buffer.getvalue())
+    event = {'Records': [{'s3': {'bucket': {'name': 'bench'},
+                                 'object': {'key': 'snapshot.npy'}}}]}
+
+    times = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        response = lh.lambda_handler(event, None)
+        times.append(1000 * (time.perf_counter() - start))
+        assert response['statusCode'] == 200, response
+    print(json.dumps({'init': init_ms, 'invocations': times}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=161)
+    parser.add_argument('--invocations', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as package_dir:
+        # the handler reads the model and config from its working directory
+        shutil.copy(os.path.join(project_root, 'models', 'bearing_model.onnx'), package_dir)
+        shutil.copy(os.path.join(project_root, 'config', 'model_config.json'), package_dir)
+        base_env = {k: v for k, v in os.environ.items() if k != 'AWS_LAMBDA_FUNCTION_NAME'}
+        base_env.update({'AWS_DEFAULT_REGION': 'us-east-1', 'PYTHONPATH': project_root})
+
+        print(f"{'wariant':<14}{'init [ms]':>11}{'1. żądanie [ms]':>17}"
+              f"{'zimny start [ms]':>18}{'ciepłe p50 [ms]':>17}")
+        for name, env in VARIANTS.items():
+            runs = []
+            for _ in range(args.runs):
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child',
+                     str(args.frames), str(args.invocations)],
+                    cwd=package_dir, env={**base_env, **env},
+                    capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+
+            init = np.median([r['init'] for r in runs])
+            first = np.median([r['invocations'][0] for r in runs])
+            warm = np.median([t for r in runs for t in r['invocations'][1:]])
+            print(f"{name:<14}{init:>11.1f}{first:>17.1f}{init + first:>18.1f}{warm:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
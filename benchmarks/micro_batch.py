@@ -0,0 +1,84 @@
+"""
+Peak memory and throughput of single-batch vs micro-batched scoring.
+
+Every variant runs in a fresh process (ORT's arena never shrinks), peak
+RSS is read from getrusage. Also prints the micro-batch auto-tuning
+report that the Lambda logs with MICRO_BATCH_SIZE=auto.
+
+    python benchmarks/micro_batch.py --minutes 1 5 --batch-sizes 8 32
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model.onnx')
+# 20 kHz, hop 128
+FRAMES_PER_MINUTE = 60 * 20000 // 128
+
+
+def run_variant(frames, batch_size):
+    """Child process: batch_size 0 = whole spectrogram in one session.run"""
+    import onnxruntime as ort
+    from src.scoring import MicroBatchScorer, score_spectrogram
+
+    session = ort.InferenceSession(MODEL_PATH)
+    spectrogram = np.random.default_rng(0).random((128, frames), dtype=np.float32)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if batch_size == 0:
+        mse = score_spectrogram(session, spectrogram)
+    else:
+        mse = MicroBatchScorer(session, batch_size).score([spectrogram])[0]
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'windows': len(mse), 'seconds': elapsed,
+                      'peak_mb': peak / 1024, 'extra_mb': (peak - baseline) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 5])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32])
+    parser.add_argument('--child', nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_variant(*args.child)
+        return
+
+    print(f"{'minuty':>7}{'okna':>8}{'batch':>8}{'czas [s]':>10}{'okna/s':>9}"
+          f"{'szczyt RSS [MB]':>17}{'przyrost [MB]':>15}")
+    for minutes in args.minutes:
+        frames = int(minutes * FRAMES_PER_MINUTE)
+        for batch_size in [0] + args.batch_sizes:
+            out = subprocess.run([sys.executable, __file__, '--child', str(frames), str(batch_size)],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            label = 'całość' if batch_size == 0 else str(batch_size)
+            print(f"{minutes:>7g}{r['windows']:>8}{label:>8}{r['seconds']:>10.2f}"
+                  f"{r['windows'] / r['seconds']:>9.0f}{r['peak_mb']:>17.0f}{r['extra_mb']:>15.0f}")
+
+    import onnxruntime as ort
+    from src.scoring import tune_micro_batch
+    best, report = tune_micro_batch(ort.InferenceSession(MODEL_PATH))
+    print("\nStrojenie micro-batcha:")
+    for row in report:
+        marker = '  <- wybrany' if row['batch_size'] == best else ''
+        print(f"  {row['batch_size']:>4}: {row['windows_per_s']:>7.0f} okien/s, "
+              f"bufory {row['buffer_mb']:.1f} MB{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Accuracy / latency report of the precision variants (src/model_optimization.py).
+
+Replays a run-to-failure test file by file through fp32, int8_dynamic,
+int8_static (calibrated on the first --healthy-files files) and fp16:
+- per-file MSE drift against fp32 and files classified differently,
+- detection: first file where MSE stays above the config threshold for
+  --persistence consecutive files, and how long before the end of the
+  test (the failure) that happens,
+- ORT latency per --batch windows and throughput.
+
+    python benchmarks/model_variants.py --data-dir data/raw/2nd_test
+Without --data-dir synthetic snapshots with growing wear are used.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+from src.model_optimization import build_variants, calibration_windows
+from src.ort_session import create_session, MODEL_VARIANTS
+from src.scoring import MicroBatchScorer, load_threshold
+from edge.edge_inference import MODEL_PATH, CONFIG_PATH
+from benchmarks.uplink_format import synthetic_snapshots, dataset_snapshots
+
+
+def detection_index(file_mse, threshold, persistence):
+    """First file of the first run of `persistence` files above threshold"""
+    above = np.asarray(file_mse) > threshold
+    for i in range(len(above) - persistence + 1):
+        if above[i:i + persistence].all():
+            return i
+    return None
+
+
+def lead_time(names, index):
+    """Time from detection to the last file of the test (the failure)"""
+    if index is None:
+        return '-'
+    start = datetime.strptime(names[index], '%Y.%m.%d.%H.%M.%S')
+    end = datetime.strptime(names[-1], '%Y.%m.%d.%H.%M.%S')
+    return f"{(end - start).total_seconds() / 3600:.1f} h"
+
+
+def latency(session, batch_size, repeat):
+    batch = np.random.default_rng(0).random((batch_size, 128, 64, 1), dtype=np.float32)
+    feed = {session.get_inputs()[0].name: batch}
+    session.run(None, feed)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.run(None, feed)
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data-dir', default=None)
+    parser.add_argument('--files', type=int, default=None)
+    parser.add_argument('--healthy-files', type=int, default=100)
+    parser.add_argument('--calibration-windows', type=int, default=512)
+    parser.add_argument('--persistence', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        from src.data_loader import list_bearing_files
+        names = list_bearing_files(args.data_dir)[:args.files]
+        snapshots = list(dataset_snapshots(args.data_dir, args.files))
+    else:
+        names = None
+        snapshots = list(synthetic_snapshots(args.files or 200))
+    threshold = load_threshold(CONFIG_PATH)
+    healthy = snapshots[:min(args.healthy_files, len(snapshots))]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, os.path.basename(MODEL_PATH))
+        shutil.copy(MODEL_PATH, model_path)
+        paths = {'fp32': model_path}
+        paths.update(build_variants(model_path,
+                                    calibration_windows(healthy, args.calibration_windows)))
+
+        print(f"Plików: {len(snapshots)}, kalibracja: {len(healthy)} zdrowych, "
+              f"próg: {threshold:.6f}, trwałość: {args.persistence}")
+        print(f"{'wariant':<14}{'rozmiar [kB]':>13}{'batch [ms]':>12}{'okna/s':>9}"
+              f"{'ΔMSE śr.':>10}{'ΔMSE max':>10}{'inna klasa':>12}{'wykrycie':>10}{'przed awarią':>14}")
+        reference = None
+        for variant in MODEL_VARIANTS:
+            session = create_session(paths[variant])
+            file_mse = np.array([m.mean() for m in
+                                 MicroBatchScorer(session, args.batch).score(snapshots)])
+            if reference is None:
+                reference = file_mse
+            drift = np.abs(file_mse - reference) / reference
+            flipped = int(np.sum((file_mse > threshold) != (reference > threshold)))
+            index = detection_index(file_mse, threshold, args.persistence)
+            batch_ms = latency(session, args.batch, args.repeat)
+
+            lead = lead_time(names, index) if names else (
+                '-' if index is None else f"{len(snapshots) - index} pl.")
+            print(f"{variant:<14}{os.path.getsize(paths[variant]) / 1024:>13.0f}"
+                  f"{batch_ms:>12.2f}{1000 * args.batch / batch_ms:>9.0f}"
+                  f"{drift.mean():>10.2e}{drift.max():>10.2e}{flipped:>12}"
+                  f"{'-' if index is None else index:>10}{lead:>14}")
+
+
+if __name__ == "__main__":
+    main()
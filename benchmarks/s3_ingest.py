@@ -0,0 +1,108 @@
+"""
+Lambda ingestion per stage: download_file -> /tmp -> np.load (old) vs
+get_object streamed into memory (src/s3_stream.py).
+
+With --endpoint-url (LocalStack) real S3 is used; otherwise an in-process
+fake client serves the objects from memory, so the numbers isolate the
+disk round trip and parsing cost from the network.
+
+    python benchmarks/s3_ingest.py --frames 161 16000 --repeat 20
+    python benchmarks/s3_ingest.py --endpoint-url http://localhost:4566
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+from src.s3_stream import read_npy_stream
+
+BUCKET_NAME = 'echoguard-bench'
+
+
+class MemoryS3:
+    """Minimal get_object / download_file over a dict of bytes."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key):
+        data = self.objects[Key]
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+    def download_file(self, bucket, key, path):
+        with open(path, 'wb') as f:
+            f.write(self.objects[key])
+
+
+def timed(stages, name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+    return result
+
+
+def ingest_tmp(s3, key, tmp_dir, stages):
+    path = os.path.join(tmp_dir, key)
+    timed(stages, 'download_file', s3.download_file, BUCKET_NAME, key, path)
+    array = timed(stages, 'np.load', lambda: np.load(path).astype(np.float32))
+    timed(stages, 'cleanup', os.remove, path)
+    return array
+
+
+def ingest_stream(s3, key, stages):
+    body = timed(stages, 'get_object', lambda: s3.get_object(Bucket=BUCKET_NAME, Key=key)['Body'])
+    return timed(stages, 'stream->float32', read_npy_stream, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, nargs='+', default=[161, 16000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--endpoint-url', default=None)
+    args = parser.parse_args()
+
+    if args.endpoint_url:
+        from edge.uploader import make_s3_client
+        s3 = make_s3_client(endpoint_url=args.endpoint_url)
+        try:
+            s3.create_bucket(Bucket=BUCKET_NAME)
+        except Exception:
+            pass
+    else:
+        s3 = MemoryS3()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for frames in args.frames:
+            key = f"bench_{frames}.npy"
+            buffer = io.BytesIO()
+            np.save(buffer, rng.random((128, frames), dtype=np.float32))
+            s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=buffer.getvalue())
+
+            old, new = {}, {}
+            for _ in range(args.repeat):
+                a = ingest_tmp(s3, key, tmp_dir, old)
+                b = ingest_stream(s3, key, new)
+            assert np.array_equal(a, b)
+
+            print(f"\n{frames} kolumn ({len(buffer.getvalue()) / 1e6:.2f} MB), "
+                  f"średnio z {args.repeat} [ms]:")
+            for label, stages in (('/tmp + np.load', old), ('strumień', new)):
+                total = sum(stages.values())
+                parts = ", ".join(f"{name} {1000 * t / args.repeat:.2f}" for name, t in stages.items())
+                print(f"  {label:<16}{1000 * total / args.repeat:>8.2f}  ({parts})")
+
+
+if __name__ == "__main__":
+    main()
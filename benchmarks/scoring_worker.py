@@ -0,0 +1,177 @@
+"""
+Per-event Lambda path vs the long-running worker (cloud/scoring_worker.py)
+at 1, 10 and 100 simulated devices.
+
+Every device uploads --files-per-device snapshots, one every --period
+seconds (random phase per device). Objects are served from memory and
+DynamoDB is a fake that sleeps --write-ms per request (put_item or one
+batch_writer request of 25 items), so the numbers isolate scheduling,
+batching and write round trips from the network.
+
+paced:  uploads arrive on schedule -> latency upload -> stored result
+burst:  all uploads arrive at once -> maximum throughput [files/s]
+
+lambda: one lambda_handler call per event, in arrival order (one warm
+        container; on a single vCPU concurrent containers only share it)
+worker: ScoringWorker with the given --max-windows / --max-latency-ms
+
+    python benchmarks/scoring_worker.py --devices 1 10 100 --files-per-device 10
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import numpy as np
+
+import cloud.scoring_worker as sw
+from benchmarks.s3_ingest import MemoryS3
+
+lh = sw.lh
+BUCKET_NAME = 'echoguard-bench'
+BATCH_WRITE_SIZE = 25
+
+
+class DelayTable:
+    """put_item / batch_writer with a fixed round trip per request"""
+
+    def __init__(self, write_ms):
+        self.delay = write_ms / 1000
+        self.requests = 0
+        self.items = 0
+
+    def put_item(self, Item):
+        self._request(1)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return DelayBatchWriter(self)
+
+    def _request(self, items):
+        time.sleep(self.delay)
+        self.requests += 1
+        self.items += items
+
+
+class DelayBatchWriter:
+    """Buffers items like boto3's batch_writer: one request per 25 items"""
+
+    def __init__(self, table):
+        self.table = table
+        self.buffered = 0
+
+    def put_item(self, Item):
+        self.buffered += 1
+        if self.buffered == BATCH_WRITE_SIZE:
+            self.table._request(self.buffered)
+            self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.buffered:
+            self.table._request(self.buffered)
+        return False
+
+
+def make_events(s3, devices, files_per_device, period, frames, seed=0):
+    """Uploads the objects; returns (arrival offset [s], S3 record) sorted by arrival"""
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    np.save(buffer, rng.random((128, frames), dtype=np.float32))
+    events = []
+    for device in range(devices):
+        phase = rng.uniform(0, period)
+        for k in range(files_per_device):
+            key = f"device_{device:03d}/2004.02.12.{k // 60:02d}.{k % 60:02d}.00.npy"
+            s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=buffer.getvalue())
+            events.append((phase + k * period, {'s3': {'bucket': {'name': BUCKET_NAME},
+                                                       'object': {'key': key}}}))
+    return sorted(events, key=lambda event: event[0])
+
+
+def run_lambda(events, paced):
+    latencies = []
+    start = time.perf_counter()
+    for offset, record in events:
+        arrival = start + (offset if paced else 0.0)
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        response = lh.lambda_handler({'Records': [record]}, None)
+        assert response['statusCode'] == 200, response
+        latencies.append(time.perf_counter() - arrival)
+    return latencies, time.perf_counter() - start
+
+
+def run_worker(events, paced, max_windows, max_latency):
+    async def replay():
+        worker = sw.ScoringWorker(max_windows, max_latency)
+        await worker.start()
+        start = time.perf_counter()
+        for offset, record in events:
+            if paced:
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await worker.submit(BUCKET_NAME, record['s3']['object']['key'])
+        await worker.drain()
+        elapsed = time.perf_counter() - start
+        await worker.stop()
+        assert worker.stats['errors'] == 0, worker.stats
+        return worker.latencies, elapsed, worker.stats['batches']
+
+    return asyncio.run(replay())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--files-per-device', type=int, default=10)
+    parser.add_argument('--period', type=float, default=1.0)
+    parser.add_argument('--frames', type=int, default=161)
+    parser.add_argument('--write-ms', type=float, default=5.0)
+    parser.add_argument('--max-windows', type=int, default=sw.DEFAULT_MAX_WINDOWS)
+    parser.add_argument('--max-latency-ms', type=float, default=1000 * sw.DEFAULT_MAX_LATENCY)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    lh.s3 = MemoryS3()
+    lh.table = DelayTable(args.write_ms)
+    lh.guard.table = None
+    sw.ScoringWorker.init(os.path.join(project_root, 'models', 'bearing_model.onnx'),
+                          os.path.join(project_root, 'config', 'model_config.json'))
+
+    print(f"Okres: {args.period}s, plików/urządzenie: {args.files_per_device}, "
+          f"ramki: {args.frames}, zapis DynamoDB: {args.write_ms} ms/żądanie, "
+          f"worker: max {args.max_windows} okien / {args.max_latency_ms:.0f} ms")
+    print(f"{'tryb':<7}{'urządzenia':>11}{'ścieżka':>9}{'pliki/s':>10}"
+          f"{'p50 [ms]':>10}{'p99 [ms]':>10}{'oceny':>8}{'zapisy':>8}")
+    for devices in args.devices:
+        events = make_events(lh.s3, devices, args.files_per_device, args.period, args.frames)
+        for mode in ('paced', 'burst'):
+            paced = mode == 'paced'
+            for path in ('lambda', 'worker'):
+                lh.table.requests = lh.table.items = 0
+                lh.guard._recent.clear()
+                if path == 'lambda':
+                    latencies, elapsed = run_lambda(events, paced)
+                    calls = len(events)
+                else:
+                    latencies, elapsed, calls = run_worker(
+                        events, paced, args.max_windows, args.max_latency_ms / 1000)
+                p50, p99 = 1000 * np.percentile(latencies, [50, 99])
+                print(f"{mode:<7}{devices:>11}{path:>9}{len(events) / elapsed:>10.1f}"
+                      f"{p50:>10.1f}{p99:>10.1f}{calls:>8}{lh.table.requests:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cold start and warm latency of the ONNX Runtime session variants.
+
+default:        ort.InferenceSession(model) with library defaults
+tuned:          src/ort_session.py options, optimized at load time ('all')
+extended-opt:   build-time 'extended' artifact, loaded with 'all'
+all-opt:        build-time 'all' artifact, loaded with optimizations off
+
+Every cold start runs in a fresh process; its session time includes the
+onnxruntime import (the first import happens inside load_variant).
+
+    python benchmarks/session_startup.py --cold 5 --repeat 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model.onnx')
+VARIANTS = ['default', 'tuned', 'extended-opt', 'all-opt']
+
+
+def load_variant(variant, tmp_dir):
+    import onnxruntime as ort
+    from src.ort_session import create_session, RUNTIME_LEVEL_FOR_ARTIFACT
+
+    if variant == 'default':
+        return ort.InferenceSession(MODEL_PATH, providers=['CPUExecutionProvider'])
+    if variant == 'tuned':
+        return create_session(MODEL_PATH)
+    level = variant.split('-')[0]
+    return create_session(os.path.join(tmp_dir, f"{level}.opt.onnx"),
+                          optimization_level=RUNTIME_LEVEL_FOR_ARTIFACT[level])
+
+
+def run_child(variant, tmp_dir):
+    """Child process: JSON with session (incl. import) / first-run times [ms]"""
+    start = time.perf_counter()
+    session = load_variant(variant, tmp_dir)
+    created = time.perf_counter()
+    batch = np.zeros((4, 128, 64, 1), dtype=np.float32)
+    session.run(None, {session.get_inputs()[0].name: batch})
+    first = time.perf_counter()
+    print(json.dumps({'session': 1000 * (created - start),
+                      'first_run': 1000 * (first - created)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cold', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from src.ort_session import optimize_model
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for level in ('extended', 'all'):
+            optimize_model(MODEL_PATH, os.path.join(tmp_dir, f"{level}.opt.onnx"), level)
+
+        batch = np.random.default_rng(0).random((4, 128, 64, 1), dtype=np.float32)
+        print(f"{'wariant':<14}{'sesja [ms]':>12}{'1. run [ms]':>13}{'ciepły [ms]':>13}")
+        for variant in VARIANTS:
+            runs = []
+            for _ in range(args.cold):
+                out = subprocess.run([sys.executable, __file__, '--child', variant, tmp_dir],
+                                     capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+            cold = {name: np.median([r[name] for r in runs]) for name in runs[0]}
+
+            session = load_variant(variant, tmp_dir)
+            feed = {session.get_inputs()[0].name: batch}
+            session.run(None, feed)
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                session.run(None, feed)
+                times.append(time.perf_counter() - start)
+
+            print(f"{variant:<14}{cold['session']:>12.1f}{cold['first_run']:>13.1f}"
+                  f"{1000 * np.median(times):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Uplink format benchmark: bytes per snapshot and MSE drift vs float32.
+
+For every format the snapshot is encoded, decoded like lambda_handler does
+and scored with the ONNX autoencoder. Drift = |MSE(decoded) - MSE(float32)|,
+i.e. how far the anomaly score moves because of the wire format.
+
+    python benchmarks/uplink_format.py --data-dir data/raw/2nd_test --files 50
+Without --data-dir synthetic vibration snapshots are used.
+"""
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+import onnxruntime as ort
+
+from src.codec import encode_payload, decode_spectrogram, lz4_frame
+from src.preprocessing import create_windows
+from src.features import melspectrogram, power_to_db, normalize_melspec
+
+MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model.onnx')
+
+
+def synthetic_snapshots(n_files, n_samples=20480, sr=20000):
+    """Vibration-like signals: shaft harmonics + noise growing over 'lifetime'."""
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples) / sr
+    for i in range(n_files):
+        wear = i / max(1, n_files - 1)
+        signal = (0.1 * np.sin(2 * np.pi * 33.3 * t)
+                  + wear * 0.3 * np.sin(2 * np.pi * 236.4 * t)
+                  + rng.normal(0, 0.05 + 0.1 * wear, n_samples))
+        yield normalize_melspec(power_to_db(melspectrogram(signal))).astype(np.float32)
+
+
+def dataset_snapshots(data_dir, n_files):
+    from src.data_loader import list_bearing_files
+    from src.feature_cache import cached_features, feature_params_from_config
+    params = feature_params_from_config()
+    for name in list_bearing_files(data_dir)[:n_files]:
+        yield np.asarray(cached_features(os.path.join(data_dir, name), params))
+
+
+def score(session, spectrogram):
+    batch = create_windows(spectrogram)
+    name_in = session.get_inputs()[0].name
+    name_out = session.get_outputs()[0].name
+    reconstructions = session.run([name_out], {name_in: batch})[0]
+    return float(np.mean(np.power(batch - reconstructions, 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data-dir', default=None)
+    parser.add_argument('--files', type=int, default=30)
+    args = parser.parse_args()
+
+    snapshots = list(dataset_snapshots(args.data_dir, args.files) if args.data_dir
+                     else synthetic_snapshots(args.files))
+    session = ort.InferenceSession(MODEL_PATH)
+    reference = [score(session, s) for s in snapshots]
+
+    variants = [('npy', 'none'), ('float16', 'none'), ('float16', 'zlib'),
+                ('uint8', 'none'), ('uint8', 'zlib')]
+    if lz4_frame is not None:
+        variants += [('float16', 'lz4'), ('uint8', 'lz4')]
+
+    print(f"Snapshotów: {len(snapshots)}, kształt: {snapshots[0].shape}")
+    print(f"{'format':<18}{'B/snapshot':>12}{'vs npy':>9}{'encode+decode [ms]':>20}"
+          f"{'max |Δx|':>11}{'mean |ΔMSE|':>14}{'max |ΔMSE|/MSE':>16}")
+    baseline_bytes = None
+    for uplink_format, compression in variants:
+        sizes, drifts, rel_drifts, input_err = [], [], [], []
+        start = time.perf_counter()
+        decoded_all = []
+        for s in snapshots:
+            payload, _ = encode_payload(s, uplink_format, compression)
+            decoded_all.append(decode_spectrogram(payload))
+            sizes.append(len(payload))
+        elapsed_ms = 1000 * (time.perf_counter() - start) / len(snapshots)
+
+        for s, decoded, mse_ref in zip(snapshots, decoded_all, reference):
+            mse = score(session, decoded)
+            drifts.append(abs(mse - mse_ref))
+            rel_drifts.append(abs(mse - mse_ref) / mse_ref)
+            input_err.append(np.max(np.abs(decoded - s)))
+
+        avg_bytes = float(np.mean(sizes))
+        if baseline_bytes is None:
+            baseline_bytes = avg_bytes
+        label = uplink_format if uplink_format == 'npy' else f"{uplink_format}+{compression}"
+        print(f"{label:<18}{avg_bytes:>12.0f}{baseline_bytes / avg_bytes:>8.1f}x"
+              f"{elapsed_ms:>20.3f}{max(input_err):>11.2e}{np.mean(drifts):>14.2e}"
+              f"{max(rel_drifts):>16.2e}")
+
+
+if __name__ == "__main__":
+    main()
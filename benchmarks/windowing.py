@@ -0,0 +1,62 @@
+"""
+create_windows micro-benchmark: loop of slices + np.array (old) vs strided
+view copied once into a float32 buffer (new), on long spectrograms.
+
+    python benchmarks/windowing.py --frames 161 1600 16000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import numpy as np
+
+from src.preprocessing import create_windows, count_windows
+
+
+def create_windows_loop(data, window_width=64, stride=32):
+    """Previous implementation, kept here as the baseline."""
+    n_mels, time_steps = data.shape
+    windows = [data[:, start:start + window_width]
+               for start in range(0, time_steps - window_width + 1, stride)]
+    return np.expand_dims(np.array(windows), axis=-1).astype(np.float32)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, nargs='+', default=[161, 1600, 16000])
+    parser.add_argument('--dtype', default='float64', choices=['float32', 'float64'])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'kolumny':>9}{'okna':>7}{'pętla [ms]':>12}{'view [ms]':>11}"
+          f"{'bufor [ms]':>12}{'przyspieszenie':>16}")
+    for frames in args.frames:
+        data = rng.random((128, frames)).astype(args.dtype)
+        n = count_windows(frames)
+        buffer = np.empty((n, 128, 64, 1), dtype=np.float32)
+
+        assert np.array_equal(create_windows_loop(data), create_windows(data))
+        loop_ms = best_of(lambda: create_windows_loop(data), args.repeat)
+        view_ms = best_of(lambda: create_windows(data), args.repeat)
+        buffer_ms = best_of(lambda: create_windows(data, out=buffer), args.repeat)
+        print(f"{frames:>9}{n:>7}{loop_ms:>12.2f}{view_ms:>11.2f}"
+              f"{buffer_ms:>12.2f}{loop_ms / buffer_ms:>15.1f}x")
+
+
+if __name__ == "__main__":
+    main()
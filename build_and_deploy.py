@@ -1,3 +1,5 @@
+import glob
+import json
 import os
 import subprocess
 import shutil
@@ -10,6 +12,15 @@ FUNCTION_NAME = 'EchoGuardAnalyzer'
 BUCKET_NAME = 'echoguard-data'
 ZIP_NAME = 'lambda_package.zip'
 BUILD_DIR = 'dist'
+# .npy - raw float spectrogram, .egq - compact quantized format,
+# .npz - multi-snapshot bundle, .result.json - result scored on the edge
+# (src/codec.py RESULT_SUFFIX; other .json keys in the bucket must not trigger)
+TRIGGER_SUFFIXES = ['.npy', '.egq', '.npz', '.result.json']
+# onnxruntime installed into the Lambda package
+LAMBDA_ORT_VERSION = '1.14.1'
+# graph optimization baked into *.opt.onnx at build time (src/ort_session.py):
+# 'extended' is portable, 'all' only if the build CPU matches Lambda
+ORT_ARTIFACT_LEVEL = os.getenv('ORT_ARTIFACT_LEVEL', 'extended')
 aws_endpoint = os.getenv('AWS_ENDPOINT_URL', 'http://localhost:4566')
 
 lambda_client = boto3.client('lambda', endpoint_url=aws_endpoint,
@@ -42,7 +53,7 @@ def build_package():
         subprocess.check_call([
             sys.executable, '-m', 'pip', 'install',
             'numpy==1.23.5',
-            'onnxruntime==1.14.1',
+            f'onnxruntime=={LAMBDA_ORT_VERSION}',
             'protobuf==3.20.3',
             '--target', BUILD_DIR, 
             '--no-cache-dir',
@@ -70,19 +81,100 @@ def build_package():
                     f'{BUILD_DIR}/lambda_handler.py')
         shutil.copy('src/preprocessing.py',
                     f'{BUILD_DIR}/preprocessing.py')
+        shutil.copy('src/codec.py',
+                    f'{BUILD_DIR}/codec.py')
+        shutil.copy('src/scoring.py',
+                    f'{BUILD_DIR}/scoring.py')
+        shutil.copy('src/s3_stream.py',
+                    f'{BUILD_DIR}/s3_stream.py')
+        shutil.copy('src/ort_session.py',
+                    f'{BUILD_DIR}/ort_session.py')
+        shutil.copy('src/result_schema.py',
+                    f'{BUILD_DIR}/result_schema.py')
+        shutil.copy('src/idempotency.py',
+                    f'{BUILD_DIR}/idempotency.py')
+        shutil.copy('src/model_registry.py',
+                    f'{BUILD_DIR}/model_registry.py')
+        shutil.copy('src/metrics.py',
+                    f'{BUILD_DIR}/metrics.py')
         shutil.copy('models/bearing_model.onnx',
                     f'{BUILD_DIR}/bearing_model.onnx')
+        # dynamic-width export for SCORING_MODE=fcn (python -m src.model_export)
+        shutil.copy('models/bearing_model_fcn.onnx',
+                    f'{BUILD_DIR}/bearing_model_fcn.onnx')
         shutil.copy('config/model_config.json',
                     f'{BUILD_DIR}/model_config.json')
+        # device id -> model + config; S3 artifacts are fetched by the Lambda
+        shutil.copy('config/model_registry.json',
+                    f'{BUILD_DIR}/model_registry.json')
     except FileNotFoundError as e:
         print(f"❌ Brakuje pliku: {e}")
         sys.exit(1)
+    copy_model_variant()
 
-    # 4. Compress to ZIP
+    # 4. Pre-optimized models (skip graph optimization on cold start)
+    optimize_models()
+
+    # 5. Compress to ZIP
     print("   📦 Pakowanie ZIP...")
     shutil.make_archive('lambda_package', 'zip', BUILD_DIR)
     print(f"   ✅ Gotowe: {ZIP_NAME}")
 
+def copy_model_variant():
+    """
+    Ships the precision variant selected by "model_variant" in the config
+    (built with python -m src.model_optimization), if it exists.
+    """
+    with open('config/model_config.json', 'r') as f:
+        variant = json.load(f).get('model_variant', 'fp32')
+    if variant == 'fp32':
+        return
+    for name in ('bearing_model', 'bearing_model_fcn'):
+        path = f'models/{name}.{variant}.onnx'
+        if os.path.exists(path):
+            shutil.copy(path, f'{BUILD_DIR}/{name}.{variant}.onnx')
+            print(f"   ✅ Wariant modelu: {path}")
+        else:
+            print(f"   ⚠️ Brak {path} - Lambda użyje modelu fp32")
+
+
+def package_model_version():
+    """Content hash of the packaged model (selected variant) + config"""
+    # stdlib only: the init-aws container has boto3 but no onnxruntime
+    from src.model_registry import artifact_version
+    with open(f'{BUILD_DIR}/model_config.json', 'r') as f:
+        variant = json.load(f).get('model_variant', 'fp32')
+    model_path = f'{BUILD_DIR}/bearing_model.onnx'
+    if variant != 'fp32' and os.path.exists(f'{BUILD_DIR}/bearing_model.{variant}.onnx'):
+        model_path = f'{BUILD_DIR}/bearing_model.{variant}.onnx'
+    return artifact_version(model_path, f'{BUILD_DIR}/model_config.json')
+
+
+def optimize_models():
+    """
+    Saves <model>.opt.onnx next to every model in the package. The artifact
+    has to be produced by the same onnxruntime version the Lambda runs,
+    otherwise the Lambda keeps optimizing the original model at load time.
+    """
+    try:
+        import onnxruntime
+        from src.ort_session import optimize_model, optimized_path
+    except ImportError as e:
+        print(f"   ⚠️ Pomijam optymalizację modeli: {e}")
+        return
+
+    if onnxruntime.__version__ != LAMBDA_ORT_VERSION:
+        print(f"   ⚠️ Pomijam optymalizację modeli: lokalny onnxruntime "
+              f"{onnxruntime.__version__} != {LAMBDA_ORT_VERSION} w Lambdzie")
+        return
+
+    print(f"   ⚙️ Optymalizacja grafów ONNX (poziom: {ORT_ARTIFACT_LEVEL})...")
+    for model_path in glob.glob(f'{BUILD_DIR}/bearing_model*.onnx'):
+        if model_path.endswith('.opt.onnx'):
+            continue
+        optimize_model(model_path, optimized_path(model_path), ORT_ARTIFACT_LEVEL)
+
+
 def deploy():
     print(f"🚀 KROK 2: Wdrażanie {FUNCTION_NAME}...")
     with open(f'{ZIP_NAME}', 'rb') as f:
@@ -102,7 +194,22 @@ def deploy():
         Code={'ZipFile': zip_content},
         Timeout=60,
         MemorySize=512,
-        Environment={'Variables': {'LOG_LEVEL': 'INFO'}}
+        Environment={'Variables': {
+            'LOG_LEVEL': 'INFO',
+            'ORT_ARTIFACT_LEVEL': ORT_ARTIFACT_LEVEL,
+            # windows per session.run ('auto' = tuned at cold start)
+            'MICRO_BATCH_SIZE': os.getenv('MICRO_BATCH_SIZE', '8'),
+            # processed object versions, created by infra/init-aws.sh
+            'IDEMPOTENCY_TABLE': os.getenv('IDEMPOTENCY_TABLE', 'EchoGuardProcessed'),
+            # per-device models (src/model_registry.py) and their session budget
+            'MODEL_REGISTRY': 'model_registry.json',
+            'SESSION_CACHE_MB': os.getenv('SESSION_CACHE_MB', '256'),
+            # stored with every result; hot reload (cloud/publish_model.py) replaces it
+            'MODEL_VERSION': package_model_version(),
+            'MODEL_MANIFEST': os.getenv('MODEL_MANIFEST', ''),
+            'MODEL_RELOAD_TTL': os.getenv('MODEL_RELOAD_TTL', '60'),
+            # per-invocation EMF metrics line (src/metrics.py)
+            'METRICS': os.getenv('METRICS', '1')}}
     )
     print("   ⏳ Czekam 2s na stabilizację...")
     time.sleep(2)
@@ -142,8 +249,8 @@ def configure_trigger(function_arn):
                 'LambdaFunctionConfigurations': [{
                     'LambdaFunctionArn': function_arn, 
                     'Events': ['s3:ObjectCreated:*'],
-                    'Filter': {'Key': {'FilterRules': [{'Name': 'suffix', 'Value': '.npy'}]}}
-                }]
+                    'Filter': {'Key': {'FilterRules': [{'Name': 'suffix', 'Value': suffix}]}}
+                } for suffix in TRIGGER_SUFFIXES]
             }
         )
         print("   ✅ Trigger skonfigurowany pomyślnie.")
@@ -1,18 +1,43 @@
+import io
 import os
 import json
 import logging
 import sys
+import threading
+import time
 import boto3
 import numpy as np
 import onnxruntime as ort
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
-    from preprocessing import create_windows
+    from scoring import (MicroBatchScorer, tune_micro_batch,
+                         score_spectrogram_fcn, classify, check_spectrogram)
+    from codec import (decode_spectrogram, decode_bundle, is_quantized_key,
+                       is_bundle_key, is_result_key, decode_result, QUANTIZED_SUFFIX)
+    from s3_stream import read_npy_stream, read_object, S3RangeReader, RANGE_THRESHOLD
+    from ort_session import (session_options, optimized_path, variant_path,
+                             RUNTIME_LEVEL_FOR_ARTIFACT)
+    from result_schema import result_item, error_profile
+    from idempotency import IdempotencyGuard, idempotency_key
+    from model_registry import (ModelRegistry, ArtifactStore, SessionCache, DeviceModel,
+                                ManifestWatcher, device_from_key, DEFAULT_CACHE_DIR)
+    from metrics import Metrics
 except ImportError:
     sys.path.append(os.path.abspath(
         os.path.join(os.path.dirname(__file__), '../src')))
-    from preprocessing import create_windows
+    from scoring import (MicroBatchScorer, tune_micro_batch,
+                         score_spectrogram_fcn, classify, check_spectrogram)
+    from codec import (decode_spectrogram, decode_bundle, is_quantized_key,
+                       is_bundle_key, is_result_key, decode_result, QUANTIZED_SUFFIX)
+    from s3_stream import read_npy_stream, read_object, S3RangeReader, RANGE_THRESHOLD
+    from ort_session import (session_options, optimized_path, variant_path,
+                             RUNTIME_LEVEL_FOR_ARTIFACT)
+    from result_schema import result_item, error_profile
+    from idempotency import IdempotencyGuard, idempotency_key
+    from model_registry import (ModelRegistry, ArtifactStore, SessionCache, DeviceModel,
+                                ManifestWatcher, device_from_key, DEFAULT_CACHE_DIR)
+    from metrics import Metrics
     
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -21,111 +46,765 @@ s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = "EchoGuardResults"
 table = dynamodb.Table(TABLE_NAME)
+# processed object versions (duplicate S3 events); '' = in-container LRU only
+IDEMPOTENCY_TABLE = os.getenv('IDEMPOTENCY_TABLE', 'EchoGuardProcessed')
+guard = IdempotencyGuard(dynamodb.Table(IDEMPOTENCY_TABLE) if IDEMPOTENCY_TABLE else None,
+                         cache_size=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '1024')))
+# claim lease = remaining invocation time + this margin [s], so a timed-out
+# invocation does not block the async retries of its event
+LEASE_MARGIN_SECONDS = float(os.getenv('IDEMPOTENCY_LEASE_MARGIN', '10'))
+# marker returned by the download pool for a duplicate record
+DUPLICATE = object()
+
+DEFAULT_DEVICE_ID = 'test_rig_1'
+# 'windows' = 64-wide overlapping windows (bearing_model.onnx),
+# 'fcn' = one pass over the whole spectrogram (bearing_model_fcn.onnx)
+SCORING_MODE = os.getenv('SCORING_MODE', 'windows')
+# windows per session.run; 'auto' = tuned at cold start
+MICRO_BATCH_SIZE = os.getenv('MICRO_BATCH_SIZE', '8')
+# optimization level baked into *.opt.onnx by build_and_deploy.py
+ORT_ARTIFACT_LEVEL = os.getenv('ORT_ARTIFACT_LEVEL', 'extended')
+# concurrent S3 downloads when an event carries several records
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '8'))
+# load model/config at import = Lambda init phase (on by default inside Lambda)
+EAGER_INIT = os.getenv('EAGER_INIT', '1' if os.getenv('AWS_LAMBDA_FUNCTION_NAME') else '0') == '1'
+# one dummy inference during eager init (kernel selection, arena, IOBinding buffers)
+WARMUP_INFERENCE = os.getenv('WARMUP_INFERENCE', '1') == '1'
+# per-window MSE (+ per-mel-band error) stored as float16 with every result
+ERROR_PROFILE = os.getenv('ERROR_PROFILE', '1') == '1'
+BAND_PROFILE = ERROR_PROFILE and os.getenv('BAND_PROFILE', '1') == '1'
+# device id -> model + config (src/model_registry.py); '' = one model for all devices
+MODEL_REGISTRY = os.getenv('MODEL_REGISTRY', '')
+# memory budget of the sessions loaded for registered devices
+SESSION_CACHE_MB = float(os.getenv('SESSION_CACHE_MB', '256'))
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', DEFAULT_CACHE_DIR)
+# s3:// manifest of the published default model (cloud/publish_model.py);
+# '' = the packaged model, changed only by a redeploy
+MODEL_MANIFEST = os.getenv('MODEL_MANIFEST', '')
+# warm containers check the manifest (one HEAD) at most this often [s]
+MODEL_RELOAD_TTL = float(os.getenv('MODEL_RELOAD_TTL', '60'))
+# content hash of the packaged model + config, set by build_and_deploy.py
+PACKAGE_MODEL_VERSION = os.getenv('MODEL_VERSION', 'package')
+# one EMF line per invocation (src/metrics.py): stage times, windows, bytes, cold start, RSS
+METRICS_ENABLED = os.getenv('METRICS', '1') == '1'
+metrics = Metrics(dimensions={'Function': os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local')},
+                  enabled=METRICS_ENABLED)
+
+MODEL_PATH = 'bearing_model_fcn.onnx' if SCORING_MODE == 'fcn' else 'bearing_model.onnx'
+CONFIG_PATH = 'model_config.json'
 
 session = None
+scorer = None
 threshold = None
+model_version = None
+registry = None
+watcher = None
+# readers take session/scorer/threshold/version together, reloads swap them together
+model_lock = threading.Lock()
+# stage -> seconds of the last initialization; cleared once reported
+init_metrics = {}
+cold_start = True
 
 
-def lambda_handler(event, context):
-    global session, threshold
+def _timestamp_from_filename(filename):
+    for suffix in ('.npy', QUANTIZED_SUFFIX):
+        filename = filename.replace(suffix, '')
+    return filename.replace('.', '-')
 
-    logger.info("--- START LAMBDA (Deep Scan Mode) ---")
 
-    # --- 1.Loading Modaen and Config---
+def _edge_result_item(bucket, key, client=None):
+    """
+    Snapshot already scored on the device: the result record becomes the
+    DynamoDB item as-is, without download of the spectrogram or inference.
+    """
+    logger.info(f"📥 Wynik z urządzenia: {key}")
+    client = client or s3
+    with metrics.timer('download'):
+        body = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+    metrics.count('bytes_downloaded', len(body), 'Bytes')
+    record = decode_result(body)
+
+    return result_item(
+        device_id=record.get('device_id', device_from_key(key, DEFAULT_DEVICE_ID)),
+        timestamp=_timestamp_from_filename(record['timestamp']),
+        mse=record['mse'],
+        status=record['status'],
+        threshold=record['threshold'],
+        source_file=key,
+        windows=record['windows'],
+        scored_on='edge')
+
+
+def _load_snapshots(bucket, key, client=None):
+    """
+    S3 object -> list of snapshots (timestamp, device_id, source_file, spectrogram).
+    A bundle (.bundle.npz) holds many snapshots, other objects hold one.
+    The device is the key prefix ('rig_7/...'), unless the bundle names it.
+    Objects are streamed into memory; nothing is written to /tmp.
+    client: S3 client (default: the module one) or anything with
+    get_object/head_object, e.g. the local directory of scoring_worker.py.
+    """
+    logger.info(f"📥 Pobieranie: {key}")
+    client = client or s3
+    device_id = device_from_key(key, DEFAULT_DEVICE_ID)
+
+    if is_bundle_key(key):
+        size = client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        metrics.count('bytes_downloaded', size, 'Bytes')
+        if size >= RANGE_THRESHOLD:
+            # zipfile seeks to the central directory and reads members lazily
+            # (ranged GETs inside decode: download and decode are one stage)
+            with metrics.timer('decode'):
+                entries = decode_bundle(
+                    io.BufferedReader(S3RangeReader(client, bucket, key, size)))
+        else:
+            with metrics.timer('download'):
+                data = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+            with metrics.timer('decode'):
+                entries = decode_bundle(data)
+        logger.info(f"📦 Paczka: {len(entries)} snapshotów")
+        return [{
+            'timestamp': _timestamp_from_filename(entry['timestamp']),
+            'device_id': entry.get('device_id', device_id),
+            'source_file': f"{key}#{entry.get('source', entry['timestamp'])}",
+            'spectrogram': check_spectrogram(spectrogram)
+        } for entry, spectrogram in entries]
+
+    if is_quantized_key(key):
+        # Compact uplink format (uint8/float16, optionally compressed);
+        # the payload sits in the reused buffer, the result must not
+        with metrics.timer('download'):
+            payload = read_object(client, bucket, key)
+        metrics.count('bytes_downloaded', len(payload), 'Bytes')
+        with metrics.timer('decode'):
+            full_spectrogram = decode_spectrogram(payload)
+            if np.shares_memory(full_spectrogram, np.asarray(payload)):
+                full_spectrogram = full_spectrogram.copy()
+    else:
+        # .npy is parsed while it streams in (no separate np.load stage)
+        with metrics.timer('download'):
+            response = client.get_object(Bucket=bucket, Key=key)
+            full_spectrogram = read_npy_stream(response['Body'])
+        metrics.count('bytes_downloaded', response.get('ContentLength', full_spectrogram.nbytes),
+                      'Bytes')
+
+    if full_spectrogram.ndim > 2:
+        full_spectrogram = np.squeeze(full_spectrogram)
+    check_spectrogram(full_spectrogram)
+
+    return [{
+        'timestamp': _timestamp_from_filename(os.path.basename(key)),
+        'device_id': device_id,
+        'source_file': key,
+        'spectrogram': full_spectrogram
+    }]
+
+
+def _score_snapshots(spectrograms, model=None):
+    """
+    Windows of all snapshots go through fixed-size micro-batches (a batch
+    may span snapshots), so memory does not grow with the upload length.
+    Returns (per-window MSE array, per-band error or None) of every snapshot.
+    model: DeviceModel to score with (default: the global session/scorer).
+    """
+    model = model or _default_model()
+    if SCORING_MODE == 'fcn':
+        # widths differ between snapshots: one whole-spectrogram pass each
+        with metrics.timer('inference'):
+            scored = [score_spectrogram_fcn(model.session, spectrogram, band_errors=BAND_PROFILE)
+                      for spectrogram in spectrograms]
+        if not BAND_PROFILE:
+            return scored, [None] * len(scored)
+        return [mse for mse, _ in scored], [band for _, band in scored]
+
+    model_scorer = model.scorer
+    model_scorer.reset_stats()
+    if BAND_PROFILE:
+        mse_per_snapshot, band_per_snapshot = model_scorer.score(spectrograms, band_errors=True)
+    else:
+        mse_per_snapshot, band_per_snapshot = (model_scorer.score(spectrograms),
+                                               [None] * len(spectrograms))
+    metrics.add_time('windowing', model_scorer.score_seconds - model_scorer.inference_seconds)
+    metrics.add_time('inference', model_scorer.inference_seconds)
+    metrics.count('windows', model_scorer.windows)
+    logger.info(f"🧩 Okien: {model_scorer.windows}, micro-batchy: "
+                f"{model_scorer.batches} x {model_scorer.batch_size} ({model.name})")
+    return mse_per_snapshot, band_per_snapshot
+
+
+def _default_model():
+    with model_lock:
+        return DeviceModel('default', session, scorer, threshold, model_version)
+
+
+def _score_items(snapshots):
+    """
+    Scores every snapshot with the model of its device (one pass per
+    model). Returns (DynamoDB item, response entry) per snapshot, in order.
+    The default model is taken once, so a reload does not split the call.
+    """
+    default = _default_model()
+    groups = {}
+    for i, snap in enumerate(snapshots):
+        model = (registry.resolve(snap['device_id'], default)
+                 if registry is not None else None) or default
+        groups.setdefault(id(model.session), []).append((i, model))
+
+    scored = [None] * len(snapshots)
+    for members in groups.values():
+        indices = [i for i, _ in members]
+        mse_per_snapshot, band_per_snapshot = _score_snapshots(
+            [snapshots[i]['spectrogram'] for i in indices], members[0][1])
+        for (i, model), mse_per_window, band_error in zip(
+                members, mse_per_snapshot, band_per_snapshot):
+            scored[i] = _snapshot_result(snapshots[i], mse_per_window, band_error, model)
+    return scored
+
+
+def _score_records(snapshots, owners):
+    """
+    _score_items over the snapshots of all records (owners: record of
+    every snapshot). If the shared pass fails, every record is scored on
+    its own, so only the bad one fails.
+    Returns ({record: [(item, result), ...]}, {record: exception}).
+    """
+    by_record = {}
+    for owner, snap in zip(owners, snapshots):
+        by_record.setdefault(owner, []).append(snap)
     try:
-        MODEL_PATH = 'bearing_model.onnx'
-        CONFIG_PATH = 'model_config.json'
-
-        if session is None:
-            if not os.path.exists(MODEL_PATH):
-                raise FileNotFoundError(f"Brak pliku modelu: {MODEL_PATH}")
-            session = ort.InferenceSession(MODEL_PATH)
-            logger.info("✅ Model ONNX załadowany.")
-
-        if threshold is None:
-            if os.path.exists(CONFIG_PATH):
-                with open(CONFIG_PATH, 'r') as f:
-                    config = json.load(f)
-                    threshold = config.get('threshold', 0.002)
-            else:
-                threshold = 0.002
-            logger.info(f"⚙️ Próg (Threshold): {threshold}")
+        scored = _score_items(snapshots)
+    except Exception as e:
+        if len(by_record) <= 1:
+            return {}, {owner: e for owner in by_record}
+        logger.warning(f"⚠️ Wspólna ocena nieudana ({e}), oceniam rekordy osobno")
+        scored_by_record, failures = {}, {}
+        for owner, record_snapshots in by_record.items():
+            try:
+                scored_by_record[owner] = _score_items(record_snapshots)
+            except Exception as record_error:
+                failures[owner] = record_error
+        return scored_by_record, failures
+
+    scored_by_record = {}
+    for owner, pair in zip(owners, scored):
+        scored_by_record.setdefault(owner, []).append(pair)
+    return scored_by_record, {}
+
+
+def _make_scorer(session):
+    """
+    MICRO_BATCH_SIZE=auto measures the best size once per container
+    """
+    if MICRO_BATCH_SIZE != 'auto':
+        return MicroBatchScorer(session, int(MICRO_BATCH_SIZE))
+
+    batch_size, report = tune_micro_batch(session)
+    for row in report:
+        logger.info(f"⏱️ Micro-batch {row['batch_size']:>4}: {row['windows_per_s']:.0f} okien/s, "
+                    f"bufory {row['buffer_mb']:.1f} MB")
+    logger.info(f"⚙️ Wybrany micro-batch: {batch_size}")
+    return MicroBatchScorer(session, batch_size)
 
+
+def _model_path(base_path, config):
+    """
+    Precision variant selected by "model_variant" in the config; falls
+    back to the fp32 model when the package does not contain it
+    """
+    variant = config.get('model_variant', 'fp32')
+    path = variant_path(base_path, variant)
+    if variant != 'fp32' and not os.path.exists(path):
+        logger.warning(f"⚠️ Brak wariantu modelu {variant} ({path}), używam fp32")
+        return base_path
+    return path
+
+
+def _create_session(model_path):
+    """
+    Session with explicit options; the pre-optimized artifact is preferred
+    when the build produced one (less graph optimization on cold start).
+    """
+    level = 'all'
+    if os.path.exists(optimized_path(model_path)):
+        model_path = optimized_path(model_path)
+        level = RUNTIME_LEVEL_FOR_ARTIFACT[ORT_ARTIFACT_LEVEL]
+    elif not os.path.exists(model_path):
+        raise FileNotFoundError(f"Brak pliku modelu: {model_path}")
+
+    options = session_options(optimization_level=level)
+    new_session = ort.InferenceSession(model_path, sess_options=options,
+                                       providers=['CPUExecutionProvider'])
+    logger.info(f"✅ Model ONNX załadowany: {model_path} (optymalizacja: {level}, "
+                f"wątki: {options.intra_op_num_threads})")
+    return new_session
+
+
+def _warm_up(model=None):
+    """
+    Dummy inference with the production batch shape, so the first request
+    does not pay for kernel selection and memory arena growth
+    """
+    model = model or _default_model()
+    if SCORING_MODE == 'fcn':
+        score_spectrogram_fcn(model.session, np.zeros((128, 64), dtype=np.float32))
+        return
+    model.scorer.score_batch(np.zeros((model.scorer.batch_size, 128, 64, 1), dtype=np.float32))
+    model.scorer.reset_stats()
+
+
+def _load_device_model(model_path, config):
+    """ModelRegistry loader: (session, scorer) of a registered device's model"""
+    start = time.perf_counter()
+    device_session = _create_session(_model_path(model_path, config))
+    device_scorer = None if SCORING_MODE == 'fcn' else _make_scorer(device_session)
+    logger.info(f"⏱️ Model urządzenia wczytany: {model_path} "
+                f"({1000 * (time.perf_counter() - start):.1f} ms)")
+    return device_session, device_scorer
+
+
+def _artifact_json(location):
+    with open(ArtifactStore(s3, MODEL_CACHE_DIR).local_path(location), 'r') as f:
+        return json.load(f)
+
+
+def _poll_manifest(force=False):
+    """New manifest or None (unchanged, not due, or S3 not reachable)"""
+    try:
+        return watcher.poll(force)
     except Exception as e:
-        logger.error(f"❌ Błąd inicjalizacji: {e}")
-        return {'statusCode': 500, 'body': f"Init Error: {e}"}
+        logger.warning(f"⚠️ Manifest modelu niedostępny ({MODEL_MANIFEST}): {e}")
+        return None
+
+
+def _manifest_mode_matches(manifest):
+    """
+    A windowed model cannot serve SCORING_MODE=fcn (and vice versa);
+    manifests without "scoring_mode" predate it and are windowed
+    """
+    mode = manifest.get('scoring_mode', 'windows')
+    if mode == SCORING_MODE:
+        return True
+    logger.error(f"❌ Manifest {manifest.get('version')} ma tryb oceny {mode}, "
+                 f"a SCORING_MODE={SCORING_MODE}; model pominięty")
+    return False
+
 
-    # --- 2. Data processing ---
+def _maybe_reload():
+    """
+    Warm container: when the manifest names a new version, its session and
+    scorer are built and warmed up first, then swapped in under model_lock.
+    Scoring in flight keeps the model it already took.
+    """
+    global session, scorer, threshold, model_version
+    if watcher is None:
+        return
+    manifest = _poll_manifest()
+    if manifest is None or manifest.get('version') == model_version:
+        return
+    if not _manifest_mode_matches(manifest):
+        # the same manifest is not read again until its ETag changes
+        return
+
+    start = time.perf_counter()
     try:
-        record = event['Records'][0]
-        bucket = record['s3']['bucket']['name']
-        key = record['s3']['object']['key']
-        download_path = f"/tmp/{os.path.basename(key)}"
+        config = _artifact_json(manifest['config'])
+        new_session = _create_session(ArtifactStore(s3, MODEL_CACHE_DIR).local_path(manifest['model']))
+        new_scorer = None if SCORING_MODE == 'fcn' else _make_scorer(new_session)
+        new_threshold = config.get('threshold', threshold)
+        _warm_up(DeviceModel('default', new_session, new_scorer, new_threshold))
+    except Exception as e:
+        # the manifest is read again after the next TTL
+        watcher.etag = None
+        logger.error(f"❌ Przeładowanie modelu {manifest.get('version')} nieudane, "
+                     f"zostaje {model_version}: {e}")
+        return
+
+    previous = model_version
+    with model_lock:
+        session, scorer, threshold, model_version = (
+            new_session, new_scorer, new_threshold, manifest['version'])
+    if registry is not None:
+        registry.default_threshold = new_threshold
+    logger.info(f"🔄 Model przeładowany: {previous} -> {model_version}, próg {threshold} "
+                f"({1000 * (time.perf_counter() - start):.1f} ms)")
+
+
+def _load_registry():
+    new_registry = ModelRegistry.from_file(
+        MODEL_REGISTRY, _load_device_model,
+        store=ArtifactStore(s3, MODEL_CACHE_DIR),
+        cache=SessionCache(int(SESSION_CACHE_MB * 1024 * 1024)),
+        default_threshold=threshold)
+    logger.info(f"🗂️ Rejestr modeli: {len(new_registry.devices)} urządzeń "
+                f"({MODEL_REGISTRY}), budżet sesji {SESSION_CACHE_MB:.0f} MB")
+    return new_registry
+
+
+def _log_registry(stats_before):
+    cache = registry.cache
+    delta = {name: count - stats_before[name] for name, count in cache.stats.items()}
+    logger.info(f"🗂️ Sesje urządzeń: trafienia {delta['hits']}, chybienia {delta['misses']}, "
+                f"wczytywanie {1000 * delta['load_seconds']:.1f} ms, "
+                f"usunięte {delta['evictions']}; od startu: hit rate {100 * cache.hit_rate:.0f}%, "
+                f"w cache {len(cache)} ({cache.bytes / 2**20:.1f}/{cache.max_bytes / 2**20:.0f} MB)")
+
+
+def _initialize(warm_up=False):
+    """
+    Session, scorer, threshold and model registry (only the missing ones).
+    Runs at import with EAGER_INIT and again from the handler if anything
+    is still missing.
+    """
+    global session, scorer, threshold, model_version, registry, watcher
+    timings = {}
+    start = time.perf_counter()
 
-        logger.info(f"📥 Pobieranie: {key}")
-        s3.download_file(bucket, key, download_path)
+    manifest = None
+    if MODEL_MANIFEST and watcher is None:
+        watcher = ManifestWatcher(s3, MODEL_MANIFEST, MODEL_RELOAD_TTL)
+    if watcher is not None and session is None:
+        stage_start = time.perf_counter()
+        # unreachable manifest: start with the packaged model, retry after the TTL
+        manifest = _poll_manifest(force=True)
+        if manifest is not None and not _manifest_mode_matches(manifest):
+            manifest = None
+        timings['manifest'] = time.perf_counter() - stage_start
 
-        full_spectrogram = np.load(download_path).astype(np.float32)
+    config = {}
+    if session is None or threshold is None:
+        if manifest is not None:
+            config = _artifact_json(manifest['config'])
+        elif os.path.exists(CONFIG_PATH):
+            with open(CONFIG_PATH, 'r') as f:
+                config = json.load(f)
 
-        if full_spectrogram.ndim > 2:
-            full_spectrogram = np.squeeze(full_spectrogram)
+    if session is None:
+        stage_start = time.perf_counter()
+        if manifest is not None:
+            session = _create_session(
+                ArtifactStore(s3, MODEL_CACHE_DIR).local_path(manifest['model']))
+            model_version = manifest['version']
+        else:
+            session = _create_session(_model_path(MODEL_PATH, config))
+            model_version = PACKAGE_MODEL_VERSION
+        timings['session'] = time.perf_counter() - stage_start
 
-        batch_data = create_windows(
-            full_spectrogram, window_width=64, stride=32)
+    if SCORING_MODE != 'fcn' and (scorer is None or scorer.session is not session):
+        scorer = _make_scorer(session)
 
-        logger.info(
-            f"🧩 Utworzono batch o wymiarach: {batch_data.shape} (Liczba okien: {batch_data.shape[0]})")
+    if threshold is None:
+        threshold = config.get('threshold', 0.002)
+        logger.info(f"⚙️ Próg (Threshold): {threshold}")
 
-        # --- 3. BATCH PROCESSING ---
-        input_name = session.get_inputs()[0].name
-        output_name = session.get_outputs()[0].name
+    if MODEL_REGISTRY and registry is None:
+        stage_start = time.perf_counter()
+        registry = _load_registry()
+        timings['registry'] = time.perf_counter() - stage_start
 
-        reconstructions = session.run(
-            [output_name], {input_name: batch_data})[0]
+    if warm_up:
+        stage_start = time.perf_counter()
+        _warm_up()
+        timings['warmup'] = time.perf_counter() - stage_start
 
-        mse_per_window = np.mean(
-            np.power(batch_data - reconstructions, 2), axis=(1, 2, 3))
+    timings['total'] = time.perf_counter() - start
+    init_metrics.update(timings)
+    logger.info("⏱️ Init: " + ", ".join(
+        f"{stage} {1000 * seconds:.1f} ms" for stage, seconds in timings.items()))
 
-        final_mse = float(np.mean(mse_per_window))
 
-        logger.info(
-            f"📊 ŚREDNI MSE: {final_mse:.6f} (Max w oknie: {np.max(mse_per_window):.6f})")
+class RecordsFailedError(Exception):
+    """
+    Raised by lambda_handler after the claims of failed records were
+    released: for an async S3 invocation a returned 500 counts as success,
+    only an exception makes Lambda retry the event (completed records of
+    the retry are then skipped as duplicates). response: per-record report.
+    """
 
-        status = "HEALTHY" if final_mse <= threshold else "ANOMALY_DETECTED"
-        if status == "ANOMALY_DETECTED":
-            logger.warning(
-                f"🚨 ANOMALIA! MSE ({final_mse:.5f}) > Próg ({threshold})")
+    def __init__(self, response):
+        super().__init__(response['body'])
+        self.response = response
+
+
+def _lease_seconds(context):
+    """Claim lease of this invocation (None = the guard default)"""
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    return context.get_remaining_time_in_millis() / 1000 + LEASE_MARGIN_SECONDS
+
+
+def _claim_owner(context):
+    """Request id of this invocation as claim owner (None = the guard default)"""
+    return getattr(context, 'aws_request_id', None) if context is not None else None
+
+
+def _claim(id_key, lease_seconds=None, owner=None):
+    """
+    guard.claim that fails open: if the processed-keys table is not
+    reachable the record is processed (duplicates only cost time)
+    """
+    try:
+        return guard.claim(id_key, lease_seconds, owner)
+    except Exception as e:
+        logger.warning(f"⚠️ Idempotencja niedostępna ({id_key}): {e}")
+        return True
+
+
+def _settle_claims(done, failed, owner=None):
+    """Completed records are marked as processed, failed ones released for a retry"""
+    try:
+        guard.complete(done, owner)
+        for id_key in failed:
+            guard.release(id_key, owner)
+    except Exception as e:
+        logger.warning(f"⚠️ Idempotencja: nie zapisano stanu kluczy: {e}")
+
+
+def _fetch_record(bucket, key, id_key=None, client=None, lease_seconds=None, owner=None):
+    """
+    Runs on the download pool: DUPLICATE for an already processed object
+    version, otherwise edge result item or list of snapshots
+    """
+    if not _claim(id_key, lease_seconds, owner):
+        logger.info(f"🔁 Duplikat zdarzenia, pomijam: {key}")
+        return DUPLICATE
+    if is_result_key(key):
+        return _edge_result_item(bucket, key, client)
+    return _load_snapshots(bucket, key, client)
+
+
+def _snapshot_result(snap, mse_per_window, band_error=None, model=None):
+    """
+    Scored snapshot -> (DynamoDB item, result entry of the response),
+    classified with the threshold of model (default: the global one)
+    """
+    model = model or _default_model()
+    limit = model.threshold
+    final_mse = float(np.mean(mse_per_window))
+
+    logger.info(
+        f"📊 ŚREDNI MSE [{snap['timestamp']}]: {final_mse:.6f} (Max w oknie: {np.max(mse_per_window):.6f})")
+
+    status = classify(final_mse, limit)
+    if status == "ANOMALY_DETECTED":
+        logger.warning(
+            f"🚨 ANOMALIA! MSE ({final_mse:.5f}) > Próg ({limit})")
+
+    item = result_item(
+        device_id=snap['device_id'],
+        timestamp=snap['timestamp'],
+        mse=final_mse,
+        status=status,
+        threshold=limit,
+        source_file=snap['source_file'],
+        windows=len(mse_per_window),
+        model_version=model.version,
+        **(error_profile(mse_per_window, band_error) if ERROR_PROFILE else {}))
+    return item, {
+        'timestamp': snap['timestamp'],
+        'status': status,
+        'mse': final_mse,
+        'windows_count': len(mse_per_window)
+    }
+
+
+def _write_items(items):
+    """
+    One item -> put_item, more -> batch_writer (25 items per request,
+    duplicates of the same key within the batch keep the last one)
+    """
+    if len(items) == 1:
+        table.put_item(Item=items[0])
+        return
+    with table.batch_writer(overwrite_by_pkeys=['device_id', 'timestamp']) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def _record_body(key, results):
+    if is_result_key(key):
+        item = results[0]
+        return {'file': key, 'status': item['status'], 'mse': float(item['mse_value']),
+                'windows_count': int(item['windows_processed']), 'scored_on': 'edge'}
+    if is_bundle_key(key):
+        return {'file': key, 'snapshots': len(results), 'results': results}
+    return {'file': key, 'status': results[0]['status'],
+            'mse': results[0]['mse'],
+            'windows_count': results[0]['windows_count']}
+
+
+def _log_invocation(request_seconds):
+    """
+    Cold/warm flag, initialization done outside the request (init phase)
+    and inside it (lazy fallback), and the request time
+    """
+    global cold_start
+    in_request = init_metrics.get('in_request', 0.0)
+    outside = init_metrics.get('total', 0.0) - in_request
+    metrics.gauge('cold_start', int(cold_start))
+    for stage, seconds in init_metrics.items():
+        metrics.add_time(f"init_{stage}", seconds)
+    metrics.add_time('request', request_seconds)
+    logger.info(f"⏱️ Wywołanie: {'zimne' if cold_start else 'ciepłe'}, "
+                f"init poza żądaniem {1000 * outside:.1f} ms, "
+                f"init w żądaniu {1000 * in_request:.1f} ms, "
+                f"żądanie {1000 * request_seconds:.1f} ms")
+    cold_start = False
+    init_metrics.clear()
+    metrics.flush()
+
+
+def lambda_handler(event, context):
+    request_start = time.perf_counter()
+    try:
+        response, failed = _handle_event(event, context)
+    finally:
+        _log_invocation(time.perf_counter() - request_start)
+    if failed:
+        raise RecordsFailedError(response)
+    return response
+
+
+def _handle_event(event, context=None):
+    """
+    Returns (response, failed): failed = init or at least one record failed
+    and the event should be retried
+    """
+    logger.info("--- START LAMBDA (Deep Scan Mode) ---")
+
+    # --- 1. Model and config (normally loaded at import, see EAGER_INIT) ---
+    try:
+        if session is None or threshold is None or (MODEL_REGISTRY and registry is None) or (
+                SCORING_MODE != 'fcn' and (scorer is None or scorer.session is not session)):
+            init_metrics.clear()
+            _initialize()
+            init_metrics['in_request'] = init_metrics['total']
+    except Exception as e:
+        logger.error(f"❌ Błąd inicjalizacji: {e}")
+        metrics.count('errors', len(event.get('Records', [])) if isinstance(event, dict) else 0)
+        return {'statusCode': 500, 'body': f"Init Error: {e}"}, True
+    _maybe_reload()
+
+    # --- 2. Data processing (every record of the event) ---
+    try:
+        keys = [(r['s3']['bucket']['name'], r['s3']['object']['key'])
+                for r in event['Records']]
+        id_keys = [idempotency_key(r) for r in event['Records']]
+    except Exception as e:
+        # a retry of a malformed event cannot succeed
+        logger.error(f"❌ Niepoprawne zdarzenie: {e}")
+        return {'statusCode': 500, 'body': str(e)}, False
+    fetched, errors = {}, {}
+    stage_start = time.perf_counter()
+    timings = {}
+    stats_before = dict(guard.stats)
+    registry_before = dict(registry.cache.stats) if registry is not None else None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(DOWNLOAD_WORKERS, len(keys)))) as pool:
+        lease_seconds, owner = _lease_seconds(context), _claim_owner(context)
+        futures = {pool.submit(_fetch_record, bucket, key, id_keys[i], None,
+                               lease_seconds, owner): i
+                   for i, (bucket, key) in enumerate(keys)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                fetched[i] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Błąd rekordu {keys[i][1]}: {e}", exc_info=True)
+                errors[i] = e
+    timings['fetch'] = time.perf_counter() - stage_start
+
+    duplicates = {i for i in fetched if fetched[i] is DUPLICATE}
+    for i in duplicates:
+        del fetched[i]
+    metrics.count('records', len(keys))
+    metrics.count('duplicates', len(duplicates))
+    metrics.count('fetch_errors', len(errors))
+    delta = {name: count - stats_before[name] for name, count in guard.stats.items()}
+    logger.info(f"🔁 Idempotencja: trafienia LRU {delta['lru_hits']}, "
+                f"trafienia tabeli {delta['table_hits']}, chybienia {delta['misses']}, "
+                f"bez klucza {delta['unkeyed']} (od startu kontenera: {guard.stats})")
+
+    results = {i: [] for i in fetched}
+    items = {}
+    try:
+        # --- 3. BATCH PROCESSING: windows of all files in one scoring pass ---
+        # index map: snapshot -> record it came from
+        snapshots, owners = [], []
+        for i in sorted(fetched):
+            if is_result_key(keys[i][1]):
+                items[i] = [fetched[i]]
+                results[i].append(fetched[i])
+            else:
+                snapshots.extend(fetched[i])
+                owners.extend([i] * len(fetched[i]))
+
+        stage_start = time.perf_counter()
+        scored, score_errors = _score_records(snapshots, owners)
+        for i, pairs in scored.items():
+            items[i] = [item for item, _ in pairs]
+            results[i].extend(result for _, result in pairs)
+        metrics.count('score_errors', len(score_errors))
+        for i, e in score_errors.items():
+            logger.error(f"❌ Błąd oceny rekordu {keys[i][1]}: {e}")
+            errors[i] = e
+            del fetched[i]
+        timings['score'] = time.perf_counter() - stage_start
+        if registry is not None:
+            _log_registry(registry_before)
 
         # --- 4. Save to DYNAMODB ---
-        try:
-            filename = os.path.basename(key)
-            timestamp_str = filename.replace('.npy', '').replace('.', '-')
-
-            item = {
-                'device_id': 'test_rig_1',
-                'timestamp': timestamp_str,
-                'mse_value': str(final_mse),
-                'status': status,
-                'threshold': str(threshold),
-                'source_file': key,
-                'windows_processed': str(batch_data.shape[0]),
-                'processed_at': datetime.now().isoformat()
-            }
-            table.put_item(Item=item)
-
-        except Exception as db_error:
-            logger.error(f"⚠️ Błąd DynamoDB: {db_error}")
-
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'file': key,
-                'status': status,
-                'mse': final_mse,
-                'windows_count': batch_data.shape[0]
-            })
-        }
+        # results that did not reach DynamoDB fail their records (retried, not skipped)
+        stage_start = time.perf_counter()
+        if items:
+            try:
+                _write_items([item for i in sorted(items) for item in items[i]])
+            except Exception as db_error:
+                logger.error(f"⚠️ Błąd DynamoDB: {db_error}")
+                metrics.count('write_errors', len(items))
+                for i in items:
+                    errors[i] = db_error
+                    del fetched[i]
+        timings['write'] = time.perf_counter() - stage_start
+        for stage, seconds in timings.items():
+            metrics.add_time(stage, seconds)
+        logger.info("⏱️ Etapy: " + ", ".join(
+            f"{stage} {1000 * seconds:.1f} ms" for stage, seconds in timings.items()))
 
     except Exception as e:
         logger.error(f"❌ Critical Error: {e}", exc_info=True)
-        return {'statusCode': 500, 'body': str(e)}
+        metrics.count('errors', len(fetched) + len(errors))
+        _settle_claims([], [id_keys[i] for i in list(fetched) + list(errors)], owner)
+        return {'statusCode': 500, 'body': str(e)}, True
+
+    # failed records of every stage (fetch, scoring, DynamoDB write)
+    metrics.count('errors', len(errors))
+    _settle_claims([id_keys[i] for i in fetched], [id_keys[i] for i in errors], owner)
+
+    if len(keys) == 1:
+        # single-record event: response kept as before
+        if errors:
+            return {'statusCode': 500, 'body': str(errors[0])}, True
+        if duplicates:
+            return {'statusCode': 200, 'body': json.dumps(
+                {'file': keys[0][1], 'duplicate': True})}, False
+        return {'statusCode': 200, 'body': json.dumps(_record_body(keys[0][1], results[0]))}, False
+
+    report = [_record_body(key, results[i]) if i in fetched
+              else {'file': key, 'duplicate': True} if i in duplicates
+              else {'file': key, 'error': str(errors[i])}
+              for i, (_, key) in enumerate(keys)]
+    logger.info(f"✅ Rekordy: {len(fetched)} ok, {len(duplicates)} duplikatów, "
+                f"{len(errors)} błędów")
+    return {
+        'statusCode': 200 if fetched or duplicates else 500,
+        'body': json.dumps({'processed': len(fetched), 'duplicates': len(duplicates),
+                            'failed': len(errors), 'records': report})
+    }, bool(errors)
+
+
+if EAGER_INIT:
+    try:
+        _initialize(warm_up=WARMUP_INFERENCE)
+    except Exception as e:
+        # the handler retries the missing parts on the first request
+        logger.error(f"❌ Błąd inicjalizacji (faza init): {e}")
@@ -0,0 +1,107 @@
+"""
+One-shot migration of EchoGuardResults items from schema v1 (numbers as
+strings) to v2 (DynamoDB numbers + schema_version, src/result_schema.py).
+
+The table is read as a parallel scan (one thread per segment, server-side
+filter on the missing schema_version, projection of the key + numeric
+attributes only). Each item is updated in place with a conditional
+UpdateItem, so a result the Lambda rewrote meanwhile in v2 is left alone
+and the migration can be re-run safely.
+
+    python cloud/migrate_results.py --endpoint-url http://localhost:4566 --segments 8
+    python cloud/migrate_results.py --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.result_schema import (scan_items, upgrade_item, legacy_filter,
+                               NUMERIC_FIELDS, SCHEMA_VERSION)
+
+TABLE_NAME = "EchoGuardResults"
+KEY_FIELDS = ('device_id', 'timestamp')
+
+
+def migrate_item(table, item):
+    """
+    Conditional in-place update of one v1 item. Returns False when the
+    item was already v2 (e.g. rewritten by the Lambda during the migration).
+    """
+    upgraded = upgrade_item(item)
+    fields = [field for field in NUMERIC_FIELDS if field in upgraded]
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    values = {f":v{i}": upgraded[field] for i, field in enumerate(fields)}
+    names['#version'] = 'schema_version'
+    values[':version'] = SCHEMA_VERSION
+    assignments = [f"#f{i} = :v{i}" for i in range(len(fields))] + ["#version = :version"]
+    try:
+        table.update_item(
+            Key={field: item[field] for field in KEY_FIELDS},
+            UpdateExpression="SET " + ", ".join(assignments),
+            ConditionExpression="attribute_not_exists(#version)",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def migrate_segment(make_table, segment, total_segments, dry_run=False):
+    """
+    Scans one segment and migrates its v1 items. Returns (found, migrated).
+    Each segment gets its own Table: boto3 resources are not thread-safe.
+    """
+    table = make_table()
+    items = scan_items(table, KEY_FIELDS + tuple(NUMERIC_FIELDS), legacy_filter(),
+                       segment, total_segments)
+    if dry_run:
+        return len(items), 0
+    return len(items), sum(migrate_item(table, item) for item in items)
+
+
+def migrate(make_table, segments=4, dry_run=False):
+    """
+    Parallel scan + migration over all segments. Returns stats dict.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        results = list(pool.map(
+            lambda segment: migrate_segment(make_table, segment, segments, dry_run),
+            range(segments)))
+    return {
+        'found': sum(found for found, _ in results),
+        'migrated': sum(migrated for _, migrated in results),
+        'segments': segments,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate EchoGuardResults to the numeric schema')
+    parser.add_argument('--endpoint-url', default=os.getenv('AWS_ENDPOINT_URL'))
+    parser.add_argument('--table', default=TABLE_NAME)
+    parser.add_argument('--segments', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    def make_table():
+        return boto3.session.Session().resource(
+            'dynamodb', endpoint_url=args.endpoint_url).Table(args.table)
+
+    stats = migrate(make_table, args.segments, args.dry_run)
+    label = "do migracji" if args.dry_run else "zmigrowano"
+    print(f"✅ Elementy v1: {stats['found']}, {label}: "
+          f"{stats['found'] if args.dry_run else stats['migrated']} "
+          f"(segmenty: {stats['segments']}, {stats['seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Publishes the default model + config to S3 for hot reload: warm Lambda
+containers with MODEL_MANIFEST=s3://<bucket>/<prefix>/current.json pick
+it up within MODEL_RELOAD_TTL seconds, without build_and_deploy.py.
+
+Artifacts are immutable, stored under <prefix>/<version>/ (version =
+content hash of model + config, stored with every result), and the
+manifest is written last, so a container never sees a manifest naming
+missing files. Publishing an older model again is a rollback.
+
+    python cloud/publish_model.py --endpoint-url http://localhost:4566
+    python cloud/publish_model.py --model models/bearing_model.int8_static.onnx
+    python cloud/publish_model.py --scoring-mode fcn
+Without --model the variant selected in the config is published. The
+manifest records the scoring mode of the model ('fcn' = the dynamic-width
+bearing_model_fcn.onnx from src/model_export.py); a Lambda running the
+other SCORING_MODE refuses it.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import boto3
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.model_registry import artifact_version
+from src.ort_session import variant_path
+from src.scoring import load_model_variant
+
+MODELS_BUCKET = 'echoguard-models'
+DEFAULT_PREFIX = 'default'
+MANIFEST_NAME = 'current.json'
+MODEL_PATHS = {'windows': 'models/bearing_model.onnx',
+               'fcn': 'models/bearing_model_fcn.onnx'}
+
+
+def default_model_path(config_path, scoring_mode='windows'):
+    """Variant selected in the config, fp32 when that variant was not built"""
+    base_path = MODEL_PATHS[scoring_mode]
+    path = variant_path(base_path, load_model_variant(config_path))
+    return path if os.path.exists(path) else base_path
+
+
+def publish(s3, bucket, prefix, model_path, config_path, scoring_mode='windows'):
+    """Uploads the artifacts, then the manifest. Returns the manifest."""
+    version = artifact_version(model_path, config_path)
+    model_key = f"{prefix}/{version}/{os.path.basename(model_path)}"
+    config_key = f"{prefix}/{version}/{os.path.basename(config_path)}"
+    s3.upload_file(model_path, bucket, model_key)
+    s3.upload_file(config_path, bucket, config_key)
+
+    manifest = {
+        'version': version,
+        'model': f"s3://{bucket}/{model_key}",
+        'config': f"s3://{bucket}/{config_key}",
+        'scoring_mode': scoring_mode,
+        'published_at': datetime.now().isoformat(),
+    }
+    s3.put_object(Bucket=bucket, Key=f"{prefix}/{MANIFEST_NAME}",
+                  Body=json.dumps(manifest, indent=2).encode(),
+                  ContentType='application/json')
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish the EchoGuard model for hot reload')
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--config', default='config/model_config.json')
+    parser.add_argument('--bucket', default=MODELS_BUCKET)
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX)
+    parser.add_argument('--scoring-mode', default=os.getenv('SCORING_MODE', 'windows'),
+                        choices=sorted(MODEL_PATHS),
+                        help='SCORING_MODE of the Lambda that loads this model')
+    parser.add_argument('--endpoint-url', default=os.getenv('AWS_ENDPOINT_URL'))
+    args = parser.parse_args()
+
+    model_path = args.model or default_model_path(args.config, args.scoring_mode)
+    if not os.path.exists(model_path):
+        parser.error(f"brak modelu {model_path}"
+                     + (" (python -m src.model_export)" if args.scoring_mode == 'fcn' else ''))
+    s3 = boto3.client('s3', endpoint_url=args.endpoint_url)
+    manifest = publish(s3, args.bucket, args.prefix, model_path, args.config,
+                       args.scoring_mode)
+    print(f"✅ Opublikowano {manifest['version']} ({manifest['scoring_mode']}): "
+          f"{manifest['model']}")
+    print(f"   MODEL_MANIFEST=s3://{args.bucket}/{args.prefix}/{MANIFEST_NAME}")
+
+
+if __name__ == "__main__":
+    main()
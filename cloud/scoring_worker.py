@@ -0,0 +1,397 @@
+"""
+Long-running scoring service: the alternative to one Lambda invocation
+per uploaded object when many devices upload at the same time.
+
+Reuses cloud/lambda_handler.py as-is (session/threshold init incl. model
+variant and warm-up, download + decoding, result items, idempotency,
+DynamoDB writes); only the scheduling differs:
+
+- events (object created) come from a directory watcher (local stand-in
+  for S3 notifications) or from a LocalStack SQS queue with S3
+  notifications, and are downloaded concurrently on a thread pool;
+- downloaded snapshots of all devices wait in one pending batch that is
+  scored when max_windows windows are waiting or the oldest snapshot has
+  waited max_latency seconds (whichever comes first), so under load the
+  micro-batches of MicroBatchScorer span files of many devices, while a
+  lone upload is not held back longer than max_latency;
+- results of a scored batch go to DynamoDB in one batch_writer, while the
+  next batch is already being scored.
+
+    python cloud/scoring_worker.py --watch-dir data/incoming
+    python cloud/scoring_worker.py --sqs-queue-url http://localhost:4566/000000000000/echoguard-events \\
+        --endpoint-url http://localhost:4566
+
+Files must appear in the watched directory atomically (written elsewhere,
+then os.replace); processed files are moved to <watch-dir>/processed.
+The SQS queue receives the bucket notifications, e.g.:
+
+    awslocal sqs create-queue --queue-name echoguard-events
+    awslocal s3api put-bucket-notification-configuration --bucket echoguard-data \\
+        --notification-configuration '{"QueueConfigurations": [{"QueueArn":
+        "arn:aws:sqs:us-east-1:000000000000:echoguard-events", "Events": ["s3:ObjectCreated:*"]}]}'
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cloud.lambda_handler as lh
+from src.codec import is_bundle_key, is_quantized_key, is_result_key
+from src.idempotency import idempotency_key
+from src.preprocessing import count_windows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WINDOWS = 256
+DEFAULT_MAX_LATENCY = 0.05
+DEFAULT_FETCH_WORKERS = 8
+PROCESSED_DIR = 'processed'
+
+
+def snapshot_windows(spectrogram):
+    """Windows the scorer will cut from one snapshot (pending batch size)"""
+    return count_windows(np.squeeze(spectrogram).shape[-1])
+
+
+def is_supported_key(key):
+    return (key.endswith('.npy') or is_quantized_key(key)
+            or is_bundle_key(key) or is_result_key(key))
+
+
+class LocalDirectoryS3:
+    """
+    get_object / head_object over the files of a directory (the bucket
+    name is ignored), so lambda_handler._fetch_record reads local files
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': os.path.getsize(self._path(Key))}
+
+    def get_object(self, Bucket, Key, Range=None):
+        with open(self._path(Key), 'rb') as f:
+            if Range:
+                start, end = map(int, Range.replace('bytes=', '').split('-'))
+                f.seek(start)
+                data = f.read(end - start + 1)
+            else:
+                data = f.read()
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+
+class ScoringWorker:
+    """
+    Event queue -> download pool -> pending batch -> scoring thread ->
+    DynamoDB writer thread. Session, scorer and threshold are the globals
+    of lambda_handler (see init()).
+
+    stats: files, snapshots, windows, batches (scoring calls), duplicates,
+    errors; latencies: seconds from submit() to the stored result.
+    """
+
+    def __init__(self, max_windows=DEFAULT_MAX_WINDOWS, max_latency=DEFAULT_MAX_LATENCY,
+                 fetch_workers=DEFAULT_FETCH_WORKERS):
+        self.max_windows = max_windows
+        self.max_latency = max_latency
+        self.fetch_workers = fetch_workers
+        self.events = None
+        self.latencies = []
+        self.stats = {'files': 0, 'snapshots': 0, 'windows': 0, 'batches': 0,
+                      'duplicates': 0, 'errors': 0}
+        self._pending = deque()
+        self._pending_windows = 0
+        self._deadline = 0.0
+        self._ready = None
+        self._tasks = []
+        self._writes = set()
+        self._fetch_pool = None
+        self._score_pool = None
+        self._write_pool = None
+
+    @staticmethod
+    def init(model_path=None, config_path=None, warm_up=True):
+        """Loads the handler's session, scorer and threshold (once per process)"""
+        if model_path:
+            lh.MODEL_PATH = model_path
+        if config_path:
+            lh.CONFIG_PATH = config_path
+        lh._initialize(warm_up=warm_up)
+
+    async def start(self):
+        self.events = asyncio.Queue()
+        self._ready = asyncio.Event()
+        self._fetch_pool = ThreadPoolExecutor(self.fetch_workers)
+        # one scoring thread: the scorer owns its buffers and IOBinding
+        self._score_pool = ThreadPoolExecutor(1)
+        self._write_pool = ThreadPoolExecutor(1)
+        self._tasks = [asyncio.create_task(self._fetch_loop())
+                       for _ in range(self.fetch_workers)]
+        self._tasks.append(asyncio.create_task(self._batch_loop()))
+
+    async def submit(self, bucket, key, client=None, id_key=None, ack=None):
+        """
+        One object-created event; ack() is called once its result is stored
+        """
+        await self.events.put({'bucket': bucket, 'key': key, 'client': client,
+                               'id_key': id_key, 'ack': ack, 'arrived': time.perf_counter()})
+
+    async def drain(self):
+        """Waits until every submitted event is stored (or failed)"""
+        await self.events.join()
+
+    async def stop(self):
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for pool in (self._fetch_pool, self._score_pool, self._write_pool):
+            pool.shutdown()
+
+    def _finish(self, events, ok):
+        lh.metrics.count('records', len(events))
+        if not ok:
+            lh.metrics.count('errors', len(events))
+        now = time.perf_counter()
+        for event in events:
+            if ok:
+                self.stats['files'] += 1
+                self.latencies.append(now - event['arrived'])
+                if event['ack'] is not None:
+                    event['ack']()
+            else:
+                self.stats['errors'] += 1
+            self.events.task_done()
+
+    async def _fetch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self.events.get()
+            try:
+                fetched = await loop.run_in_executor(
+                    self._fetch_pool, lh._fetch_record, event['bucket'], event['key'],
+                    event['id_key'], event['client'])
+            except Exception as e:
+                logger.error(f"❌ Błąd rekordu {event['key']}: {e}")
+                lh._settle_claims([], [event['id_key']])
+                self._finish([event], ok=False)
+                continue
+            if fetched is lh.DUPLICATE:
+                self.stats['duplicates'] += 1
+                if event['ack'] is not None:
+                    event['ack']()
+                self.events.task_done()
+                continue
+
+            if not self._pending:
+                self._deadline = loop.time() + self.max_latency
+            windows = 0 if is_result_key(event['key']) else sum(
+                snapshot_windows(snap['spectrogram']) for snap in fetched)
+            self._pending.append((event, fetched, windows))
+            self._pending_windows += windows
+            self._ready.set()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._ready.wait()
+            while self._pending_windows < self.max_windows:
+                remaining = self._deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            # about max_windows per scoring call; the rest is due right away
+            batch, windows = [], 0
+            while self._pending and windows < self.max_windows:
+                event, fetched, count = self._pending.popleft()
+                batch.append((event, fetched))
+                windows += count
+            self._pending_windows -= windows
+            if self._pending:
+                self._deadline = loop.time()
+            else:
+                self._ready.clear()
+
+            try:
+                items, failures = await loop.run_in_executor(self._score_pool, self._score, batch)
+            except Exception as e:
+                logger.error(f"❌ Błąd oceny paczki ({len(batch)} plików): {e}", exc_info=True)
+                lh._settle_claims([], [event['id_key'] for event, _ in batch])
+                self._finish([event for event, _ in batch], ok=False)
+                lh.metrics.flush()
+                continue
+            # only the files that failed scoring are nacked, the rest is written
+            if failures:
+                failed = [batch[i][0] for i in sorted(failures)]
+                for i in sorted(failures):
+                    logger.error(f"❌ Błąd oceny {batch[i][0]['key']}: {failures[i]}")
+                lh._settle_claims([], [event['id_key'] for event in failed])
+                self._finish(failed, ok=False)
+            events = [event for i, (event, _) in enumerate(batch) if i not in failures]
+            # the next batch is scored while this one is being written
+            write = asyncio.create_task(self._write(events, items))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    def _score(self, batch):
+        """
+        Scoring thread: one scoring pass per model for all files of the
+        batch; if a file breaks it, every file is scored on its own.
+        Returns (items of the scored files, {batch index: exception}).
+        """
+        items, snapshots, owners = [], [], []
+        for i, (event, fetched) in enumerate(batch):
+            if is_result_key(event['key']):
+                items.append(fetched)
+            else:
+                snapshots.extend(fetched)
+                owners.extend([i] * len(fetched))
+        failures = {}
+        if snapshots:
+            # a newer published model is swapped in between batches
+            lh._maybe_reload()
+            scored, failures = lh._score_records(snapshots, owners)
+            for pairs in scored.values():
+                for item, result in pairs:
+                    items.append(item)
+                    self.stats['windows'] += result['windows_count']
+                self.stats['snapshots'] += len(pairs)
+            self.stats['batches'] += 1
+        return items, failures
+
+    async def _write(self, events, items):
+        loop = asyncio.get_running_loop()
+        id_keys = [event['id_key'] for event in events]
+        try:
+            if items:
+                with lh.metrics.timer('write'):
+                    await loop.run_in_executor(self._write_pool, lh._write_items, items)
+        except Exception as e:
+            logger.error(f"⚠️ Błąd DynamoDB: {e}")
+            lh._settle_claims([], id_keys)
+            self._finish(events, ok=False)
+        else:
+            lh._settle_claims(id_keys, [])
+            self._finish(events, ok=True)
+        # one EMF line per batch, written or not (stages of the files fetched meanwhile included)
+        lh.metrics.flush()
+
+
+async def watch_directory(worker, directory, poll_interval=0.2, stop=None):
+    """
+    Polls `directory`; every new supported file is one event. Stored files
+    are moved to <directory>/processed, failed ones stay (retried after a
+    restart).
+    """
+    client = LocalDirectoryS3(directory)
+    done_dir = os.path.join(directory, PROCESSED_DIR)
+    os.makedirs(done_dir, exist_ok=True)
+    seen = set()
+
+    def ack(name):
+        def move():
+            os.replace(os.path.join(directory, name), os.path.join(done_dir, name))
+            seen.discard(name)
+        return move
+
+    while stop is None or not stop.is_set():
+        for name in sorted(os.listdir(directory)):
+            if name in seen or not is_supported_key(name) \
+                    or not os.path.isfile(os.path.join(directory, name)):
+                continue
+            seen.add(name)
+            await worker.submit(directory, name, client=client, ack=ack(name))
+        await asyncio.sleep(poll_interval)
+
+
+async def consume_sqs(worker, queue_url, sqs, s3, wait_seconds=20, stop=None):
+    """
+    S3 notifications from SQS; a message is deleted once all its records
+    are stored. A failed record leaves the message to be redelivered after
+    the visibility timeout (the idempotency guard skips the stored ones).
+    """
+    loop = asyncio.get_running_loop()
+    while stop is None or not stop.is_set():
+        response = await loop.run_in_executor(None, lambda: sqs.receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=wait_seconds))
+        for message in response.get('Messages', []):
+            receipt = message['ReceiptHandle']
+            # s3:TestEvent (sent when the notification is configured) has no Records
+            records = json.loads(message['Body']).get('Records', [])
+
+            def delete(receipt=receipt):
+                sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt)
+
+            if not records:
+                delete()
+                continue
+            remaining = [len(records)]
+
+            def ack(delete=delete, remaining=remaining):
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    delete()
+
+            for record in records:
+                await worker.submit(record['s3']['bucket']['name'], record['s3']['object']['key'],
+                                    client=s3, id_key=idempotency_key(record), ack=ack)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EchoGuard long-running scoring worker')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--watch-dir')
+    source.add_argument('--sqs-queue-url')
+    parser.add_argument('--endpoint-url', default=os.getenv('AWS_ENDPOINT_URL'))
+    parser.add_argument('--model', default='models/bearing_model.onnx')
+    parser.add_argument('--config', default='config/model_config.json')
+    parser.add_argument('--max-windows', type=int, default=DEFAULT_MAX_WINDOWS)
+    parser.add_argument('--max-latency-ms', type=float, default=1000 * DEFAULT_MAX_LATENCY)
+    parser.add_argument('--fetch-workers', type=int, default=DEFAULT_FETCH_WORKERS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    if args.endpoint_url:
+        import boto3
+        lh.s3 = boto3.client('s3', endpoint_url=args.endpoint_url)
+        dynamodb = boto3.resource('dynamodb', endpoint_url=args.endpoint_url)
+        lh.table = dynamodb.Table(lh.TABLE_NAME)
+        if lh.guard.table is not None:
+            lh.guard.table = dynamodb.Table(lh.IDEMPOTENCY_TABLE)
+    ScoringWorker.init(args.model, args.config)
+    worker = ScoringWorker(args.max_windows, args.max_latency_ms / 1000, args.fetch_workers)
+
+    async def run():
+        await worker.start()
+        if args.watch_dir:
+            await watch_directory(worker, args.watch_dir)
+        else:
+            import boto3
+            sqs = boto3.client('sqs', endpoint_url=args.endpoint_url)
+            await consume_sqs(worker, args.sqs_queue_url, sqs, lh.s3)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info(f"🛑 Zatrzymano: {worker.stats}")
+
+
+if __name__ == "__main__":
+    main()
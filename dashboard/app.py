@@ -1,12 +1,19 @@
 # dashboard/app.py
+import os
+import sys
 import streamlit as st
 import boto3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import time
+from collections import OrderedDict
 from botocore.exceptions import NoCredentialsError
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.result_schema import (scan_items, projection, decode_profile,
+                               DASHBOARD_FIELDS, NUMERIC_FIELDS, PROFILE_FIELDS)
+
 # --- Config ---
 st.set_page_config(page_title="EchoGuard Dashboard", layout="wide")
 
@@ -23,18 +30,14 @@ table = dynamodb.Table(TABLE_NAME)
 
 def get_data():
     try:
-        response = table.scan()
-        data = response['Items']
-
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(
-                ExclusiveStartKey=response['LastEvaluatedKey'])
-            data.extend(response['Items'])
+        # only the plotted attributes leave DynamoDB
+        data = scan_items(table, DASHBOARD_FIELDS)
 
         df = pd.DataFrame(data)
         if not df.empty:
-            df['mse_value'] = df['mse_value'].astype(float)
-            df['threshold'] = df['threshold'].astype(float)
+            # Decimal (schema v2) or string (not yet migrated v1 items)
+            for field in ('mse_value', 'threshold'):
+                df[field] = df[field].astype(NUMERIC_FIELDS[field])
             df['datetime'] = pd.to_datetime(
                 df['timestamp'], format='%Y-%m-%d-%H-%M-%S')
             df = df.sort_values(by='datetime')
@@ -44,6 +47,67 @@ def get_data():
         return pd.DataFrame()
 
 
+# (device_id, timestamp, processed_at) -> item; backfill and edge rescoring
+# rewrite a key, which bumps processed_at. Misses are not cached (the
+# profile may not be written yet) and the oldest entries are evicted.
+PROFILE_CACHE_SIZE = 256
+_profile_cache = OrderedDict()
+
+
+def get_profiles(df, last_n=30):
+    """
+    Error profiles (float16 attributes) of the last_n results, fetched by
+    key only for what is on screen; items without a profile are skipped
+    """
+    expression, names = projection(PROFILE_FIELDS)
+    profiles = []
+    for _, row in df.tail(last_n).iterrows():
+        processed_at = row.get('processed_at')
+        # NaN for items written before processed_at existed
+        key = (row['device_id'], row['timestamp'],
+               processed_at if isinstance(processed_at, str) else None)
+        item = _profile_cache.get(key)
+        if item is None:
+            response = table.get_item(Key={'device_id': key[0], 'timestamp': key[1]},
+                                      ProjectionExpression=expression,
+                                      ExpressionAttributeNames=names)
+            item = response.get('Item', {})
+            if 'window_mse' not in item:
+                continue
+            _profile_cache[key] = item
+            while len(_profile_cache) > PROFILE_CACHE_SIZE:
+                _profile_cache.popitem(last=False)
+        _profile_cache.move_to_end(key)
+        profiles.append((row['timestamp'], item))
+    return profiles
+
+
+def profile_heatmaps(profiles):
+    """
+    Heatmaps files x windows (per-window MSE) and files x mel bands
+    """
+    labels = [timestamp for timestamp, _ in profiles]
+    windows = [decode_profile(item['window_mse']) for _, item in profiles]
+    width = max(len(w) for w in windows)
+    window_z = [list(w) + [None] * (width - len(w)) for w in windows]
+
+    window_fig = go.Figure(go.Heatmap(z=window_z, y=labels, colorscale='Inferno',
+                                      colorbar=dict(title='MSE')))
+    window_fig.update_layout(title='Błąd w oknach (gdzie w pliku jest anomalia)',
+                             xaxis_title='Okno', template='plotly_dark', height=400)
+
+    band_fig = None
+    bands = [decode_profile(item['band_error']) for _, item in profiles if 'band_error' in item]
+    if bands:
+        band_fig = go.Figure(go.Heatmap(
+            z=[list(b) for b in bands],
+            y=[t for t, item in profiles if 'band_error' in item],
+            colorscale='Inferno', colorbar=dict(title='MSE')))
+        band_fig.update_layout(title='Błąd w pasmach mel', xaxis_title='Pasmo mel',
+                               template='plotly_dark', height=400)
+    return window_fig, band_fig
+
+
 # --- UI ---
 st.title("🛡️ EchoGuard: Predictive Maintenance Dashboard")
 
@@ -52,6 +116,7 @@ col1.metric("Status Systemu", "ONLINE", "LocalStack")
 
 chart_placeholder = st.empty()
 metrics_placeholder = st.empty()
+profile_placeholder = st.empty()
 
 if st.checkbox("🔴 Włącz Live Monitoring", value=True):
     while True:
@@ -105,6 +170,17 @@ if st.checkbox("🔴 Włącz Live Monitoring", value=True):
                 width="stretch",
                 key=f"live_chart_{time.time()}"
             )
+
+            profiles = get_profiles(df)
+            if profiles:
+                window_fig, band_fig = profile_heatmaps(profiles)
+                with profile_placeholder.container():
+                    p1, p2 = st.columns(2)
+                    p1.plotly_chart(window_fig, width="stretch",
+                                    key=f"window_heatmap_{time.time()}")
+                    if band_fig is not None:
+                        p2.plotly_chart(band_fig, width="stretch",
+                                        key=f"band_heatmap_{time.time()}")
         else:
             chart_placeholder.warning("Oczekiwanie na dane w DynamoDB...")
 
@@ -6,16 +6,32 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 import time
-import numpy as np
-import boto3
 
-from src.data_loader import load_bearing_data, compute_melspec
+from src.data_loader import list_bearing_files
+from src.feature_cache import cached_features, feature_params_from_config
+from src.codec import encode_payload
+from src.metrics import Metrics
+from edge.uploader import S3Uploader, SnapshotBundler, make_s3_client
+from edge.edge_inference import EdgeScorer
 
 # --- KONFIGURACJA ---
-s3 = boto3.client('s3', endpoint_url='http://localhost:4566',
-                  aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1')
+UPLOAD_WORKERS = int(os.getenv('EDGE_UPLOAD_WORKERS', '4'))
+# > 1: send snapshots as bundles (one Lambda invocation per bundle)
+BUNDLE_SIZE = int(os.getenv('EDGE_BUNDLE_SIZE', '1'))
+BUNDLE_SECONDS = float(os.getenv('EDGE_BUNDLE_SECONDS', '60'))
+s3 = make_s3_client(max_pool_connections=UPLOAD_WORKERS)
 BUCKET_NAME = 'echoguard-data'
 DATA_DIR = 'data/raw/2nd_test'
+# 'uint8' / 'float16' = compact EGQ format (src/codec.py), 'npy' = raw float
+UPLINK_FORMAT = os.getenv('EDGE_UPLINK_FORMAT', 'uint8')
+# 1 = score on the device, upload result records (+ spectrogram on anomaly)
+EDGE_INFERENCE = os.getenv('EDGE_INFERENCE', '0') == '1'
+# edge mode: also upload the spectrogram of every N-th healthy snapshot (0 = never)
+SAMPLE_EVERY = int(os.getenv('EDGE_SAMPLE_EVERY', '0'))
+# 'windows' / 'fcn' (whole-spectrogram pass, see src/model_export.py)
+SCORING_MODE = os.getenv('EDGE_SCORING_MODE', 'windows')
+# 1 = one EMF metrics line per file (src/metrics.py; aggregate with python -m src.metrics)
+METRICS_ENABLED = os.getenv('EDGE_METRICS', '0') == '1'
 
 
 def run_simulation(interval=0.5):
@@ -23,41 +39,71 @@ def run_simulation(interval=0.5):
     Simulates machine behavior throughout its entire lifecycle.
     interval: Time in seconds between sending consecutive files.
     """
-    files = sorted(os.listdir(DATA_DIR))
-    files = [f for f in files if not f.endswith(
-        '.pdf') and not f.endswith('.doc')]
+    files = list_bearing_files(DATA_DIR)
 
     print(f"🚀 Rozpoczynam symulację. Do przetworzenia: {len(files)} plików.")
     print(f"⏱️ Interwał wysyłania: {interval}s")
 
-    for i, filename in enumerate(files):
-        file_path = os.path.join(DATA_DIR, filename)
-
-        try:
-            # 1. Edge Processing
-            df = load_bearing_data(filename, DATA_DIR)
-            melspec = compute_melspec(df)
-
-            # Normalization
-            NORM_MIN, NORM_MAX = -80.0, 0.0
-            norm_mel = (melspec - NORM_MIN) / (NORM_MAX - NORM_MIN)
-            norm_mel = np.clip(norm_mel, 0, 1)
-
-            # 2. Save to .npy and upload
-            npy_filename = f"{filename}.npy"
-            np.save(npy_filename, norm_mel)
-
-            # Upload to S3 (triggers Lambdę)
-            s3.upload_file(npy_filename, BUCKET_NAME, npy_filename)
-
-            os.remove(npy_filename)
-
-            print(f"[{i+1}/{len(files)}] 📡 Wysłano: {filename} -> S3")
-
-        except Exception as e:
-            print(f"❌ Błąd przy pliku {filename}: {e}")
-
-        time.sleep(interval)
+    # n_mels / hop / normalization taken from config/model_config.json
+    feature_params = feature_params_from_config()
+    scorer = (EdgeScorer(sample_every=SAMPLE_EVERY, scoring_mode=SCORING_MODE)
+              if EDGE_INFERENCE else None)
+    metrics = Metrics(dimensions={'Simulator': 'advanced'}, enabled=METRICS_ENABLED)
+
+    def on_uploaded(key, error):
+        if error is not None:
+            print(f"❌ Błąd wysyłania {key}: {error}")
+
+    with S3Uploader(BUCKET_NAME, s3, max_workers=UPLOAD_WORKERS) as uploader, \
+            SnapshotBundler(uploader, max_snapshots=BUNDLE_SIZE, max_age_s=BUNDLE_SECONDS,
+                            callback=on_uploaded) as bundler:
+        for i, filename in enumerate(files):
+            file_path = os.path.join(DATA_DIR, filename)
+
+            try:
+                # 1. Edge Processing (replays hit the on-disk feature cache)
+                with metrics.timer('features'):
+                    norm_mel = cached_features(file_path, feature_params)
+
+                # 2. Edge mode: score locally, the result record goes up always,
+                #    the spectrogram only on anomaly / sampling
+                send_spectrogram = True
+                if scorer is not None:
+                    with metrics.timer('inference'):
+                        record, send_spectrogram = scorer.score(filename, norm_mel)
+                    metrics.count('windows', record['windows'])
+                    uploader.submit(scorer.result_key(filename),
+                                    scorer.result_payload(record), on_uploaded)
+                    print(f"[{i+1}/{len(files)}] 🧠 {record['status']} "
+                          f"(MSE: {record['mse']:.6f})")
+
+                # 3. Serialize in memory and queue the upload (triggers Lambdę);
+                #    the next file is processed while this one is being sent
+                if send_spectrogram and BUNDLE_SIZE > 1:
+                    bundler.add(filename, norm_mel)
+                elif send_spectrogram:
+                    with metrics.timer('encode'):
+                        payload, suffix = encode_payload(norm_mel, UPLINK_FORMAT)
+                    metrics.count('bytes_uploaded', len(payload), 'Bytes')
+                    # blocks only while the upload queue is full
+                    with metrics.timer('enqueue'):
+                        uploader.submit(f"{filename}{suffix}", payload, on_uploaded)
+
+                print(f"[{i+1}/{len(files)}] 📡 W kolejce: {filename} -> S3 "
+                      f"(kolejka: {uploader.queue_depth})")
+
+            except Exception as e:
+                print(f"❌ Błąd przy pliku {filename}: {e}")
+                metrics.count('errors')
+
+            metrics.flush()
+
+            if (i + 1) % 50 == 0:
+                print(uploader.report())
+
+            time.sleep(interval)
+
+    print(uploader.report())
 
 
 if __name__ == "__main__":
@@ -9,26 +9,35 @@ sys.path.append(os.path.abspath(os.path.join('..', 'src')))
 
 import time
 import numpy as np
-import boto3
-from data_loader import load_bearing_data, compute_melspec
+from data_loader import load_bearing_data_cached, compute_melspec
+from codec import encode_payload
+from uploader import S3Uploader, make_s3_client
+from edge_inference import EdgeScorer
+from metrics import Metrics
 from botocore.exceptions import NoCredentialsError
 
 
-s3 = boto3.client('s3',
-                  endpoint_url='http://localhost:4566',
-                  aws_access_key_id='test',
-                  aws_secret_access_key='test',
-                  region_name='us-east-1')
+s3 = make_s3_client()
 
 BUCKET_NAME = 'echoguard-data'
+# 'uint8' / 'float16' = compact EGQ format (src/codec.py), 'npy' = raw float
+UPLINK_FORMAT = os.getenv('EDGE_UPLINK_FORMAT', 'uint8')
+# 1 = score on the device and upload only the result record (+ spectrogram on anomaly)
+EDGE_INFERENCE = os.getenv('EDGE_INFERENCE', '0') == '1'
+# 1 = EMF metrics line per file (src/metrics.py)
+metrics = Metrics(dimensions={'Simulator': 'device'},
+                  enabled=os.getenv('EDGE_METRICS', '0') == '1')
 
 
 def process_and_upload(file_path):
     print(f"\n[EDGE] 📡 Przetwarzanie pliku: {file_path}")
 
     try:
-        df = load_bearing_data(file_path, '')
-        melspec = compute_melspec(df)
+        with metrics.timer('load'):
+            df = load_bearing_data_cached(
+                os.path.basename(file_path), os.path.dirname(file_path))
+        with metrics.timer('features'):
+            melspec = compute_melspec(df, backend='numpy')
 
         NORM_MIN = -80.0
         NORM_MAX = 0.0
@@ -37,17 +46,34 @@ def process_and_upload(file_path):
         norm_mel = np.clip(norm_mel, 0, 1)
 
         filename = os.path.basename(file_path)
-        npy_filename = f"{filename}.npy"
-        np.save(npy_filename, norm_mel)
-
-        print(f"[EDGE] ☁️ Wysyłanie do S3: {npy_filename}...")
-        s3.upload_file(npy_filename, BUCKET_NAME, npy_filename)
+        uploads = []
+        send_spectrogram = True
+        if EDGE_INFERENCE:
+            scorer = EdgeScorer()
+            with metrics.timer('inference'):
+                record, send_spectrogram = scorer.score(filename, norm_mel)
+            metrics.count('windows', record['windows'])
+            print(f"[EDGE] 🧠 Wynik lokalny: {record['status']} (MSE: {record['mse']:.6f})")
+            uploads.append((scorer.result_key(filename), scorer.result_payload(record)))
+
+        if send_spectrogram:
+            with metrics.timer('encode'):
+                payload, suffix = encode_payload(norm_mel, UPLINK_FORMAT)
+            uploads.append((f"{filename}{suffix}", payload))
+
+        with S3Uploader(BUCKET_NAME, s3, max_workers=1) as uploader:
+            for object_name, payload in uploads:
+                print(f"[EDGE] ☁️ Wysyłanie do S3: {object_name}...")
+                with metrics.timer('upload'):
+                    uploader.submit(object_name, payload).result()
+                metrics.count('bytes_uploaded', len(payload), 'Bytes')
         print("[EDGE] ✅ Sukces! Dane w chmurze.")
-
-        os.remove(npy_filename)
+        print(f"[EDGE] {uploader.report()}")
 
     except Exception as e:
         print(f"[EDGE] ❌ Błąd: {e}")
+        metrics.count('errors')
+    metrics.flush()
 
 
 if __name__ == "__main__":
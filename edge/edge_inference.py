@@ -0,0 +1,86 @@
+"""
+On-device scoring for the edge simulators.
+
+The autoencoder runs next to the sensor with the same model, threshold and
+windowing as the Lambda (src/scoring.py). Only a small JSON result record
+is uploaded per snapshot; the full spectrogram follows only when it is
+needed in the cloud: on anomaly, or every sample_every-th snapshot so the
+dashboard/retraining still sees healthy data.
+"""
+import os
+
+import numpy as np
+
+try:
+    from src.ort_session import create_session, variant_path
+    from src.scoring import (load_threshold, load_model_variant,
+                             score_spectrogram, score_spectrogram_fcn, classify)
+    from src.codec import encode_result, RESULT_SUFFIX
+except ImportError:
+    from ort_session import create_session, variant_path
+    from scoring import (load_threshold, load_model_variant,
+                         score_spectrogram, score_spectrogram_fcn, classify)
+    from codec import encode_result, RESULT_SUFFIX
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model.onnx')
+FCN_MODEL_PATH = os.path.join(project_root, 'models', 'bearing_model_fcn.onnx')
+CONFIG_PATH = os.path.join(project_root, 'config', 'model_config.json')
+
+
+class EdgeScorer:
+    """
+    sample_every: upload the spectrogram of every N-th healthy snapshot
+    (0 = only anomalies); anomalies are always uploaded and do not advance
+    the count.
+    scoring_mode: 'windows' or 'fcn' (one pass over the whole spectrogram,
+    about half the FLOPs; uses the dynamic-width model).
+    Without model_path the precision variant comes from "model_variant"
+    in the config (src/model_optimization.py builds them).
+    """
+
+    def __init__(self, model_path=None, config_path=CONFIG_PATH,
+                 device_id='test_rig_1', sample_every=0, session=None,
+                 scoring_mode='windows'):
+        if model_path is None:
+            model_path = FCN_MODEL_PATH if scoring_mode == 'fcn' else MODEL_PATH
+            model_path = variant_path(model_path, load_model_variant(config_path))
+        self.session = session or create_session(model_path)
+        self._score = score_spectrogram_fcn if scoring_mode == 'fcn' else score_spectrogram
+        self.threshold = load_threshold(config_path)
+        self.device_id = device_id
+        self.sample_every = sample_every
+        self.healthy_scored = 0
+
+    def score(self, timestamp, spectrogram):
+        """
+        Returns (result record dict, upload_spectrogram flag)
+        """
+        window_mse = self._score(self.session, spectrogram)
+        mse = float(np.mean(window_mse))
+        status = classify(mse, self.threshold)
+
+        sampled = False
+        if status == "HEALTHY":
+            self.healthy_scored += 1
+            sampled = self.sample_every > 0 and self.healthy_scored % self.sample_every == 0
+
+        record = {
+            'timestamp': timestamp,
+            'device_id': self.device_id,
+            'mse': mse,
+            'max_window_mse': float(np.max(window_mse)),
+            'status': status,
+            'threshold': self.threshold,
+            'windows': len(window_mse),
+        }
+        return record, status != "HEALTHY" or sampled
+
+    @staticmethod
+    def result_key(timestamp):
+        return f"{timestamp}{RESULT_SUFFIX}"
+
+    @staticmethod
+    def result_payload(record):
+        return encode_result(record)
@@ -0,0 +1,211 @@
+"""
+In-memory, concurrent S3 uploads for the edge simulators.
+
+Payloads are sent straight from memory with put_object (no temp file on
+disk) over a pooled boto3 client. Uploads run on a bounded thread pool:
+submit() returns immediately while the pool has room, so feature
+extraction of the next snapshot overlaps with the upload of the previous
+one, and blocks (backpressure) once max_pending uploads are queued.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+try:
+    from src.codec import encode_bundle, BUNDLE_SUFFIX
+except ImportError:
+    from codec import encode_bundle, BUNDLE_SUFFIX
+
+LOCALSTACK_ENDPOINT = 'http://localhost:4566'
+
+
+def make_s3_client(max_pool_connections=10, endpoint_url=LOCALSTACK_ENDPOINT):
+    """
+    S3 client whose HTTP connection pool matches the upload concurrency
+    """
+    return boto3.client('s3', endpoint_url=endpoint_url,
+                        aws_access_key_id='test', aws_secret_access_key='test',
+                        region_name='us-east-1',
+                        config=Config(max_pool_connections=max_pool_connections,
+                                      retries={'max_attempts': 3, 'mode': 'standard'}))
+
+
+class S3Uploader:
+    def __init__(self, bucket, s3_client=None, max_workers=4, max_pending=16):
+        self.bucket = bucket
+        self.s3 = s3_client or make_s3_client(max_pool_connections=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='s3-upload')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.max_queue_depth = 0
+        self.uploaded = 0
+        self.failed = 0
+        self.bytes_sent = 0
+        self._upload_seconds = 0.0
+        self._started = time.perf_counter()
+
+    def submit(self, key, payload, callback=None):
+        """
+        Queues payload (bytes) for upload under key. Returns a Future.
+        callback(key, error) is called from the upload thread when done.
+        """
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._pending)
+        return self._executor.submit(self._upload, key, payload, callback)
+
+    def _upload(self, key, payload, callback):
+        start = time.perf_counter()
+        error = None
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=key, Body=payload)
+        except Exception as e:
+            error = e
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self._upload_seconds += elapsed
+                if error is None:
+                    self.uploaded += 1
+                    self.bytes_sent += len(payload)
+                else:
+                    self.failed += 1
+            self._slots.release()
+        if callback is not None:
+            callback(key, error)
+        if error is not None:
+            raise error
+
+    @property
+    def queue_depth(self):
+        with self._lock:
+            return self._pending
+
+    def stats(self):
+        with self._lock:
+            wall = time.perf_counter() - self._started
+            done = self.uploaded + self.failed
+            return {
+                'uploaded': self.uploaded,
+                'failed': self.failed,
+                'bytes_sent': self.bytes_sent,
+                'queue_depth': self._pending,
+                'max_queue_depth': self.max_queue_depth,
+                'objects_per_s': self.uploaded / wall if wall > 0 else 0.0,
+                'mb_per_s': self.bytes_sent / wall / 1e6 if wall > 0 else 0.0,
+                'avg_upload_ms': 1000 * self._upload_seconds / done if done else 0.0,
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"📊 Upload: {s['uploaded']} ok / {s['failed']} błędów, "
+                f"{s['objects_per_s']:.1f} obj/s, {s['mb_per_s']:.2f} MB/s, "
+                f"śr. {s['avg_upload_ms']:.0f} ms, kolejka {s['queue_depth']} "
+                f"(max {s['max_queue_depth']})")
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotBundler:
+    """
+    Groups snapshots into one bundle object (src/codec.py) uploaded every
+    max_snapshots snapshots or max_age_s seconds, whichever comes first.
+    Lambda then scores the whole bundle in a single invocation.
+
+    The age limit is enforced by a timer armed when a bundle opens, so a
+    partial bundle goes up even if no further snapshot arrives; upload
+    errors of a timer flush reach the caller only through callback.
+    """
+
+    def __init__(self, uploader, device_id='test_rig_1', max_snapshots=10,
+                 max_age_s=60.0, dtype='uint8', callback=None):
+        self.uploader = uploader
+        self.device_id = device_id
+        self.max_snapshots = max_snapshots
+        self.max_age_s = max_age_s
+        self.dtype = dtype
+        self.callback = callback
+        self._snapshots = []
+        self._manifest = []
+        self._opened_at = None
+        self._timer = None
+        # bumped on every flush, a stale timer must not flush the next bundle
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.bundles_sent = 0
+
+    def add(self, timestamp, spectrogram):
+        """
+        Adds a snapshot; returns the Future of the bundle upload if it was flushed.
+        """
+        with self._lock:
+            if not self._snapshots:
+                self._opened_at = time.monotonic()
+                self._arm_timer()
+            self._snapshots.append(spectrogram)
+            self._manifest.append({'timestamp': timestamp, 'device_id': self.device_id,
+                                   'source': timestamp})
+            full = (len(self._snapshots) >= self.max_snapshots
+                    or time.monotonic() - self._opened_at >= self.max_age_s)
+            bundle = self._take() if full else None
+        return self._submit(bundle)
+
+    def flush(self):
+        with self._lock:
+            bundle = self._take()
+        return self._submit(bundle)
+
+    def _arm_timer(self):
+        self._timer = threading.Timer(self.max_age_s, self._flush_expired,
+                                      args=(self._generation,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_expired(self, generation):
+        with self._lock:
+            bundle = self._take() if generation == self._generation else None
+        self._submit(bundle)
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._snapshots:
+            return None
+        bundle = (self._snapshots, self._manifest)
+        self._snapshots, self._manifest = [], []
+        self._generation += 1
+        self.bundles_sent += 1
+        return bundle
+
+    def _submit(self, bundle):
+        if bundle is None:
+            return None
+        snapshots, manifest = bundle
+        payload = encode_bundle(snapshots, manifest, dtype=self.dtype)
+        key = (f"{self.device_id}_{manifest[0]['timestamp']}"
+               f"_{len(snapshots)}{BUNDLE_SUFFIX}")
+        return self.uploader.submit(key, payload, self.callback)
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -2,6 +2,8 @@
 echo "--- INICJALIZACJA ECHOGUARD ---"
 
 awslocal s3 mb s3://echoguard-data
+# published models for hot reload (cloud/publish_model.py)
+awslocal s3 mb s3://echoguard-models
 
 echo "--- GOTOWE! Bucket 'echoguard-data' utworzony. ---"
 
@@ -14,4 +16,17 @@ awslocal dynamodb create-table \
     --key-schema \
         AttributeName=device_id,KeyType=HASH \
         AttributeName=timestamp,KeyType=RANGE \
-    --billing-mode PAY_PER_REQUEST
\ No newline at end of file
+    --billing-mode PAY_PER_REQUEST
+
+echo "Tworzenie tabeli przetworzonych obiektów (idempotencja)..."
+awslocal dynamodb create-table \
+    --table-name EchoGuardProcessed \
+    --attribute-definitions \
+        AttributeName=idempotency_key,AttributeType=S \
+    --key-schema \
+        AttributeName=idempotency_key,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST
+
+awslocal dynamodb update-time-to-live \
+    --table-name EchoGuardProcessed \
+    --time-to-live-specification Enabled=true,AttributeName=expires_at
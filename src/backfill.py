@@ -0,0 +1,376 @@
+"""
+Offline re-scoring of history (e.g. after retraining) without re-uploading
+every file through S3 and the Lambda.
+
+Inputs are raw IMS files (features from the feature cache, extracted on a
+miss) or uploaded-format spectrograms (<timestamp>.npy). Files are split
+into shards scored on a process pool; every worker holds one inference
+backend with cpus // workers intra-op threads and scores a whole shard in
+one MicroBatchScorer pass (the Lambda's windowing and MSE). Results go in
+bulk to DynamoDB (batch_writer, the Lambda's v2 items) or to Parquet
+(one part file per shard).
+
+A file that cannot be read or scored is skipped (reported in the stats
+and by the CLI); the other files and shards go on. With a checkpoint file
+the paths of every written shard are appended to it, and a rerun with the
+same checkpoint scores only the rest (failed files included).
+
+Backends: ort (fp32), ort-int8 / ort-fp16 (variants built by
+src/model_optimization.py) and numpy: onnx.reference, a pure NumPy
+evaluator of the same graph, slow, for tests and for checking the ORT
+backends.
+
+    python -m src.backfill --data-dir data/raw/2nd_test --workers 4 --dynamodb \\
+        --endpoint-url http://localhost:4566
+    python -m src.backfill --spectrogram-dir data/exported --backend ort-int8 --parquet out/ \\
+        --checkpoint out/done.txt
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+try:
+    from .feature_cache import (cached_features, extract_features, feature_params_from_config,
+                                DEFAULT_FEATURE_CACHE_DIR)
+    from .data_loader import list_bearing_files
+    from .model_registry import artifact_version
+    from .ort_session import create_session, variant_path, available_cpus
+    from .result_schema import result_item, error_profile, encode_profile
+    from .scoring import MicroBatchScorer, load_threshold, classify, check_spectrogram
+except ImportError:
+    from feature_cache import (cached_features, extract_features, feature_params_from_config,
+                               DEFAULT_FEATURE_CACHE_DIR)
+    from data_loader import list_bearing_files
+    from model_registry import artifact_version
+    from ort_session import create_session, variant_path, available_cpus
+    from result_schema import result_item, error_profile, encode_profile
+    from scoring import MicroBatchScorer, load_threshold, classify, check_spectrogram
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'bearing_model.onnx')
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config', 'model_config.json')
+DEFAULT_DEVICE_ID = 'test_rig_1'
+DEFAULT_SHARD_SIZE = 16
+DEFAULT_BATCH_SIZE = 32
+TABLE_NAME = 'EchoGuardResults'
+
+
+class ReferenceSession:
+    """
+    onnx.reference evaluator behind the InferenceSession methods the
+    scorer uses (get_inputs / get_outputs / run)
+    """
+
+    def __init__(self, model_path):
+        from onnx.reference import ReferenceEvaluator
+        self.evaluator = ReferenceEvaluator(model_path)
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.evaluator.input_names]
+
+    def get_outputs(self):
+        return [SimpleNamespace(name=name) for name in self.evaluator.output_names]
+
+    def run(self, output_names, feed):
+        return self.evaluator.run(output_names, feed)
+
+
+def _ort_session(model_path, threads):
+    return create_session(model_path, intra_op_threads=threads)
+
+
+def _reference_session(model_path, threads):
+    return ReferenceSession(model_path)
+
+
+# backend name -> (precision variant of the model, factory(model_path, intra-op threads))
+BACKENDS = {
+    'ort': ('fp32', _ort_session),
+    'ort-int8': ('int8_static', _ort_session),
+    'ort-fp16': ('fp16', _ort_session),
+    'numpy': ('fp32', _reference_session),
+}
+
+
+def backend_model_path(backend, model_path):
+    """Model file a backend runs (its precision variant of model_path)"""
+    variant, _ = BACKENDS[backend]
+    path = variant_path(model_path, variant)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Brak modelu {variant}: {path} (python -m src.model_optimization)")
+    return path
+
+
+# per-process state of pool workers (set by _init_worker)
+_worker = {}
+
+
+def _init_worker(backend, model_path, threads, batch_size, feature_params, cache_dir):
+    _, factory = BACKENDS[backend]
+    _worker['scorer'] = MicroBatchScorer(factory(model_path, threads), batch_size)
+    _worker['feature_params'] = feature_params
+    _worker['cache_dir'] = cache_dir
+
+
+def _load_spectrogram(path):
+    """Uploaded-format .npy as-is; a raw IMS file through the feature cache"""
+    if path.endswith('.npy'):
+        return check_spectrogram(np.squeeze(np.load(path)))
+    if _worker['cache_dir'] is None:
+        return check_spectrogram(extract_features(path, _worker['feature_params']))
+    return check_spectrogram(np.asarray(
+        cached_features(path, _worker['feature_params'], _worker['cache_dir'])))
+
+
+def _score_shard(shard):
+    """
+    Pool worker: list of paths -> ([(path, per-window MSE)], [(path, error)]).
+    Unreadable files are skipped; if the shared scoring pass fails, the
+    files are scored one by one.
+    """
+    loaded, skipped = [], []
+    for path in shard:
+        try:
+            loaded.append((path, _load_spectrogram(path)))
+        except Exception as e:
+            skipped.append((path, f"{type(e).__name__}: {e}"))
+    if not loaded:
+        return [], skipped
+
+    scorer = _worker['scorer']
+    try:
+        return list(zip([path for path, _ in loaded],
+                        scorer.score([spectrogram for _, spectrogram in loaded]))), skipped
+    except Exception:
+        scored = []
+        for path, spectrogram in loaded:
+            try:
+                scored.append((path, scorer.score([spectrogram])[0]))
+            except Exception as e:
+                skipped.append((path, f"{type(e).__name__}: {e}"))
+        return scored, skipped
+
+
+def read_checkpoint(path):
+    """Paths already written by an earlier run (empty without a checkpoint)"""
+    if path is None or not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+
+def append_checkpoint(path, paths):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.writelines(f"{p}\n" for p in paths)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def timestamp_from_path(path):
+    """'.../2004.02.12.10.32.39[.npy]' -> '2004-02-12-10-32-39' (as the Lambda stores it)"""
+    name = os.path.basename(path)
+    if name.endswith('.npy'):
+        name = name[:-len('.npy')]
+    return name.replace('.', '-')
+
+
+def list_inputs(data_dir=None, spectrogram_dir=None, files=None):
+    """Paths to score: raw IMS files of data_dir or *.npy of spectrogram_dir"""
+    if spectrogram_dir:
+        paths = sorted(glob.glob(os.path.join(spectrogram_dir, '*.npy')))
+    else:
+        paths = [os.path.join(data_dir, name) for name in list_bearing_files(data_dir)]
+    return paths[:files]
+
+
+class DynamoSink:
+    """Backfilled results as the Lambda's items, one batch_writer per shard"""
+
+    def __init__(self, table, profile=True):
+        self.table = table
+        self.profile = profile
+
+    def write(self, results, shard_index):
+        with self.table.batch_writer(overwrite_by_pkeys=['device_id', 'timestamp']) as batch:
+            for result in results:
+                window_mse = result.pop('window_mse')
+                batch.put_item(Item=result_item(
+                    **result, **(error_profile(window_mse) if self.profile else {})))
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    """
+    One part-<n>.parquet per shard in output_dir (needs pyarrow); numbering
+    continues after the parts already there, so a resumed run adds parts
+    """
+
+    def __init__(self, output_dir):
+        import pandas as pd
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Zapis Parquet wymaga pakietu pyarrow (pip install pyarrow)")
+        self.pd = pd
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.offset = len(glob.glob(os.path.join(output_dir, 'part-*.parquet')))
+
+    def write(self, results, shard_index):
+        rows = []
+        for result in results:
+            window_mse = result.pop('window_mse')
+            rows.append({**result, 'mse_max': float(window_mse.max()),
+                         'mse_p95': float(np.percentile(window_mse, 95)),
+                         'window_mse': encode_profile(window_mse)})
+        self.pd.DataFrame(rows).to_parquet(
+            os.path.join(self.output_dir, f"part-{self.offset + shard_index:05d}.parquet"),
+            index=False)
+
+    def close(self):
+        pass
+
+
+def backfill(paths, sink=None, backend='ort', model_path=DEFAULT_MODEL_PATH,
+             config_path=DEFAULT_CONFIG_PATH, workers=None, shard_size=DEFAULT_SHARD_SIZE,
+             batch_size=DEFAULT_BATCH_SIZE, device_id=DEFAULT_DEVICE_ID,
+             cache_dir=DEFAULT_FEATURE_CACHE_DIR, checkpoint=None):
+    """
+    Scores paths on `workers` processes and hands every shard's results to
+    sink.write (None = results discarded, e.g. for benchmarks).
+    checkpoint: text file of written paths; listed paths are not scored again.
+    Returns stats dict ('skipped': [(path, error)] of files not scored).
+    """
+    done = read_checkpoint(checkpoint)
+    resumed = len(paths)
+    paths = [path for path in paths if path not in done]
+    resumed -= len(paths)
+    workers = workers or available_cpus()
+    threads = max(1, available_cpus() // workers)
+    threshold = load_threshold(config_path)
+    model_path = backend_model_path(backend, model_path)
+    version = artifact_version(model_path, config_path)
+    init_args = (backend, model_path, threads, batch_size,
+                 feature_params_from_config(config_path), cache_dir)
+    shards = [paths[i:i + shard_size] for i in range(0, len(paths), shard_size)]
+
+    start = time.perf_counter()
+    windows = files = 0
+    skipped = []
+    pool = None
+    if workers <= 1:
+        _init_worker(*init_args)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=init_args)
+        futures = [pool.submit(_score_shard, shard) for shard in shards]
+    try:
+        # results are written while the pool scores the next shards
+        for shard_index, shard in enumerate(shards):
+            try:
+                scored, shard_skipped = (_score_shard(shard) if pool is None
+                                         else futures[shard_index].result())
+            except Exception as e:
+                # e.g. a crashed worker process: the shard is left for the next run
+                scored, shard_skipped = [], [(path, f"{type(e).__name__}: {e}") for path in shard]
+            skipped.extend(shard_skipped)
+            results = []
+            for path, window_mse in scored:
+                mse = float(np.mean(window_mse))
+                results.append({
+                    'device_id': device_id, 'timestamp': timestamp_from_path(path),
+                    'mse': mse, 'status': classify(mse, threshold), 'threshold': threshold,
+                    'source_file': os.path.basename(path), 'windows': len(window_mse),
+                    'scored_on': 'backfill', 'backend': backend, 'model_version': version,
+                    'window_mse': window_mse})
+            if not results:
+                continue
+            if sink is not None:
+                try:
+                    sink.write(results, shard_index)
+                except Exception as e:
+                    skipped.extend((path, f"{type(e).__name__}: {e}") for path, _ in scored)
+                    continue
+            files += len(results)
+            windows += sum(result['windows'] for result in results)
+            if checkpoint is not None:
+                append_checkpoint(checkpoint, [path for path, _ in scored])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if sink is not None:
+            sink.close()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'files': files,
+        'windows': windows,
+        'shards': len(shards),
+        'skipped': skipped,
+        'resumed': resumed,
+        'workers': workers,
+        'threads': threads,
+        'seconds': elapsed,
+        'files_per_s': files / elapsed if elapsed > 0 else float('inf'),
+        'windows_per_s': windows / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline re-scoring of history')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data-dir', help='raw IMS files (e.g. data/raw/2nd_test)')
+    source.add_argument('--spectrogram-dir', help='<timestamp>.npy spectrograms')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--dynamodb', action='store_true')
+    output.add_argument('--parquet', metavar='OUTPUT_DIR')
+    output.add_argument('--dry-run', action='store_true', help='score only, nothing is written')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='ort')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--files', type=int, default=None)
+    parser.add_argument('--device-id', default=DEFAULT_DEVICE_ID)
+    parser.add_argument('--cache-dir', default=DEFAULT_FEATURE_CACHE_DIR)
+    parser.add_argument('--no-feature-cache', action='store_true')
+    parser.add_argument('--checkpoint', default=None,
+                        help='file of written paths; a rerun skips them (resume)')
+    parser.add_argument('--table', default=TABLE_NAME)
+    parser.add_argument('--endpoint-url', default=os.getenv('AWS_ENDPOINT_URL'))
+    args = parser.parse_args()
+
+    paths = list_inputs(args.data_dir, args.spectrogram_dir, args.files)
+    sink = None
+    if args.dynamodb:
+        import boto3
+        sink = DynamoSink(boto3.resource('dynamodb', endpoint_url=args.endpoint_url)
+                          .Table(args.table))
+    elif args.parquet:
+        sink = ParquetSink(args.parquet)
+
+    stats = backfill(paths, sink, args.backend, args.model, args.config, args.workers,
+                     args.shard_size, args.batch_size, args.device_id,
+                     None if args.no_feature_cache else args.cache_dir, args.checkpoint)
+    print(f"✅ Plików: {stats['files']} ({stats['windows']} okien, {stats['shards']} shardów), "
+          f"backend: {args.backend}, procesy: {stats['workers']} x {stats['threads']} wątków")
+    print(f"⏱️ Czas: {stats['seconds']:.2f}s ({stats['files_per_s']:.1f} plików/s, "
+          f"{stats['windows_per_s']:.0f} okien/s)")
+    if stats['resumed']:
+        print(f"⏭️ Pominięte z checkpointu: {stats['resumed']}")
+    for path, error in stats['skipped']:
+        print(f"⚠️ Pominięty plik {path}: {error}")
+    if stats['skipped']:
+        print(f"❌ Nieocenione pliki: {len(stats['skipped'])} (ponów z tym samym --checkpoint)")
+
+
+if __name__ == "__main__":
+    main()
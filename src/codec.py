@@ -0,0 +1,190 @@
+"""
+Compact wire format for normalised spectrograms (edge -> S3 -> Lambda).
+
+Layout: 16-byte header + payload
+    magic 'EGQ1' | version u8 | dtype u8 | compression u8 | pad | rows u32 | cols u32
+dtype: float32 / float16 / uint8 (value * 255, valid because spectrograms
+are normalised to [0, 1]). compression: none / zlib / lz4 (optional package).
+
+Only numpy + stdlib are needed, so this module ships in the Lambda package.
+"""
+import io
+import json
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b'EGQ1'
+VERSION = 1
+QUANTIZED_SUFFIX = '.egq'
+NPY_MAGIC = b'\x93NUMPY'
+
+_HEADER = struct.Struct('<4sBBBxII')
+_DTYPES = {'float32': 0, 'float16': 1, 'uint8': 2}
+_DTYPE_NAMES = {code: name for name, code in _DTYPES.items()}
+_COMPRESSIONS = {'none': 0, 'zlib': 1, 'lz4': 2}
+_COMPRESSION_NAMES = {code: name for name, code in _COMPRESSIONS.items()}
+UINT8_SCALE = 255.0
+UPLINK_FORMATS = ('npy', 'float16', 'uint8')
+
+
+def _compress(payload, compression, level):
+    if compression == 'none':
+        return payload
+    if compression == 'zlib':
+        return zlib.compress(payload, level)
+    if compression == 'lz4':
+        if lz4_frame is None:
+            raise ValueError("Kompresja lz4 wymaga pakietu 'lz4'")
+        return lz4_frame.compress(payload)
+    raise ValueError(f"Nieznana kompresja: {compression}")
+
+
+def _decompress(payload, compression):
+    if compression == 'none':
+        return payload
+    if compression == 'zlib':
+        return zlib.decompress(payload)
+    if compression == 'lz4':
+        if lz4_frame is None:
+            raise ValueError("Dekompresja lz4 wymaga pakietu 'lz4'")
+        return lz4_frame.decompress(payload)
+    raise ValueError(f"Nieznana kompresja: {compression}")
+
+
+def quantize(spectrogram, dtype='uint8'):
+    spectrogram = np.asarray(spectrogram)
+    if dtype == 'uint8':
+        scaled = np.clip(spectrogram, 0.0, 1.0) * UINT8_SCALE
+        return np.rint(scaled).astype(np.uint8)
+    if dtype in ('float16', 'float32'):
+        return spectrogram.astype(dtype)
+    raise ValueError(f"Nieznany typ: {dtype}")
+
+
+def dequantize(values):
+    if values.dtype == np.uint8:
+        return values.astype(np.float32) / np.float32(UINT8_SCALE)
+    return values.astype(np.float32, copy=False)
+
+
+def encode_spectrogram(spectrogram, dtype='uint8', compression='zlib', level=6):
+    """
+    (n_mels, frames) spectrogram in [0, 1] -> bytes in the EGQ format
+    """
+    spectrogram = np.squeeze(np.asarray(spectrogram))
+    if spectrogram.ndim != 2:
+        raise ValueError(f"Oczekiwano macierzy 2D, otrzymano {spectrogram.shape}")
+
+    values = np.ascontiguousarray(quantize(spectrogram, dtype))
+    payload = _compress(values.tobytes(), compression, level)
+    rows, cols = values.shape
+    header = _HEADER.pack(MAGIC, VERSION, _DTYPES[dtype],
+                          _COMPRESSIONS[compression], rows, cols)
+    return header + payload
+
+
+def decode_spectrogram(data):
+    """
+    EGQ (or plain .npy) bytes -> float32 (n_mels, frames) spectrogram
+    """
+    data = memoryview(data)
+    if bytes(data[:len(NPY_MAGIC)]) == NPY_MAGIC:
+        return np.load(io.BytesIO(data), allow_pickle=False).astype(np.float32)
+
+    if len(data) < _HEADER.size:
+        raise ValueError("Za krótki nagłówek EGQ")
+    magic, version, dtype_code, compression_code, rows, cols = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Nieznany format danych (brak nagłówka EGQ ani NPY)")
+    if version != VERSION:
+        raise ValueError(f"Nieobsługiwana wersja EGQ: {version}")
+
+    if dtype_code not in _DTYPE_NAMES:
+        raise ValueError(f"Nieznany kod typu EGQ: {dtype_code}")
+    if compression_code not in _COMPRESSION_NAMES:
+        raise ValueError(f"Nieznany kod kompresji EGQ: {compression_code}")
+    dtype = _DTYPE_NAMES[dtype_code]
+    payload = _decompress(data[_HEADER.size:], _COMPRESSION_NAMES[compression_code])
+    values = np.frombuffer(payload, dtype=dtype, count=rows * cols).reshape(rows, cols)
+    return dequantize(values)
+
+
+def is_quantized_key(key):
+    return key.endswith(QUANTIZED_SUFFIX)
+
+
+def encode_payload(spectrogram, uplink_format='uint8', compression='zlib'):
+    """
+    Serializes a snapshot for upload. Returns (bytes, key suffix).
+    'npy' keeps the legacy raw float .npy object.
+    """
+    if uplink_format == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(spectrogram))
+        return buffer.getvalue(), '.npy'
+    if uplink_format not in UPLINK_FORMATS:
+        raise ValueError(f"Nieznany format uplinku: {uplink_format}")
+    return encode_spectrogram(spectrogram, uplink_format, compression), QUANTIZED_SUFFIX
+
+
+BUNDLE_SUFFIX = '.bundle.npz'
+_BUNDLE_MANIFEST = 'manifest'
+
+
+def encode_bundle(snapshots, manifest, dtype='uint8', compress=True):
+    """
+    Several snapshots in one .npz object.
+    manifest: one dict per snapshot (timestamp, device_id, source, ...),
+    stored as JSON next to the (optionally uint8/float16) arrays.
+    """
+    if len(snapshots) != len(manifest):
+        raise ValueError("Liczba snapshotów i wpisów manifestu musi być równa")
+    arrays = {f"snap_{i:05d}": quantize(np.squeeze(s), dtype)
+              for i, s in enumerate(snapshots)}
+    arrays[_BUNDLE_MANIFEST] = np.frombuffer(
+        json.dumps(list(manifest)).encode('utf-8'), dtype=np.uint8)
+
+    buffer = io.BytesIO()
+    (np.savez_compressed if compress else np.savez)(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_bundle(source):
+    """
+    Bundle bytes (or a seekable file object) -> list of (manifest entry, float32 spectrogram)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with np.load(source, allow_pickle=False) as bundle:
+        manifest = json.loads(bundle[_BUNDLE_MANIFEST].tobytes().decode('utf-8'))
+        return [(entry, dequantize(bundle[f"snap_{i:05d}"]))
+                for i, entry in enumerate(manifest)]
+
+
+def is_bundle_key(key):
+    return key.endswith(BUNDLE_SUFFIX)
+
+
+RESULT_SUFFIX = '.result.json'
+
+
+def encode_result(record):
+    """
+    Compact result record of a snapshot scored on the device
+    """
+    return json.dumps(record, separators=(',', ':')).encode('utf-8')
+
+
+def decode_result(data):
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+def is_result_key(key):
+    return key.endswith(RESULT_SUFFIX)
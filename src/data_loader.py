@@ -1,12 +1,40 @@
-import librosa.display
-from scipy.fft import fft, fftfreq
 import os
+import sys
+import hashlib
+import importlib.util
 import pandas as pd
-import librosa
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from .preprocessing import create_windows
+
+try:
+    from .features import melspectrogram, power_to_db, melspectrogram_batch, power_to_db_batch
+except ImportError:
+    from features import melspectrogram, power_to_db, melspectrogram_batch, power_to_db_batch
+
+
+def _lazy_import(name):
+    """
+    Module imported on first attribute access (None if not installed).
+    librosa pulls in numba/scipy/sklearn and costs seconds at startup,
+    so the edge only pays for it when the librosa backend is really used.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+librosa = _lazy_import('librosa')
 DEFAULT_DATA_DIR = '../data/raw/2nd_test'
+BEARING_COLUMNS = ['Bearing_1', 'Bearing_2', 'Bearing_3', 'Bearing_4']
+CACHE_DIR_ENV = 'ECHOGUARD_CACHE_DIR'
+SKIPPED_EXTENSIONS = ('.pdf', '.doc')
 
 
 def load_bearing_data(filemane, data_dir=DEFAULT_DATA_DIR):
@@ -15,18 +43,142 @@ def load_bearing_data(filemane, data_dir=DEFAULT_DATA_DIR):
     """
     file_path = os.path.join(data_dir, filemane)
     df = pd.read_csv(file_path, sep='\t', header=None)
-    df.columns = ['Bearing_1', 'Bearing_2', 'Bearing_3', 'Bearing_4']
+    df.columns = BEARING_COLUMNS
     return df
 
 
-def compute_melspec(df, colum_name='Bearing_1', sr=20000):
+def list_bearing_files(data_dir=DEFAULT_DATA_DIR):
+    """
+    Sorted IMS snapshot names in a directory (documentation files skipped)
+    """
+    return sorted(f for f in os.listdir(data_dir)
+                  if not f.endswith(SKIPPED_EXTENSIONS)
+                  and os.path.isfile(os.path.join(data_dir, f)))
+
+
+def _cache_dir_for(data_dir, cache_dir):
+    if cache_dir is None:
+        cache_dir = os.getenv(CACHE_DIR_ENV) or os.path.join(
+            data_dir or '.', '.npy_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _file_key(file_path):
+    """Cache key from absolute path + mtime + size, so edited files are re-parsed."""
+    st = os.stat(file_path)
+    raw = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _parse_ims_file(file_path):
+    df = pd.read_csv(file_path, sep='\t', header=None)
+    return np.ascontiguousarray(df.values, dtype=np.float32)
+
+
+def _atomic_save(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def load_bearing_array(filemane, data_dir=DEFAULT_DATA_DIR, cache_dir=None):
+    """
+    Reads a single file as a read-only float32 memmap (samples, 4).
+    The text file is parsed once; later calls map the .npy sidecar.
+    """
+    file_path = os.path.join(data_dir, filemane)
+    cache_dir = _cache_dir_for(data_dir, cache_dir)
+    sidecar = os.path.join(
+        cache_dir, f"{os.path.basename(file_path)}-{_file_key(file_path)}.npy")
+
+    if not os.path.exists(sidecar):
+        _atomic_save(sidecar, _parse_ims_file(file_path))
+
+    return np.load(sidecar, mmap_mode='r')
+
+
+def load_bearing_data_cached(filemane, data_dir=DEFAULT_DATA_DIR, cache_dir=None):
+    """
+    Same as load_bearing_data, but the DataFrame is a zero-copy view of the memmap
+    """
+    array = load_bearing_array(filemane, data_dir, cache_dir)
+    return pd.DataFrame(array, columns=BEARING_COLUMNS, copy=False)
+
+
+def load_directory_memmap(data_dir=DEFAULT_DATA_DIR, cache_dir=None, files=None):
+    """
+    Loads a whole test directory (e.g. 2nd_test) into one contiguous
+    float32 memmap of shape (files, samples, 4).
+    Returns (memmap, file_names). The stack is rebuilt when any file changes.
+    """
+    if files is None:
+        files = list_bearing_files(data_dir)
+    if not files:
+        raise ValueError(f"Brak plików w katalogu: {data_dir}")
+
+    cache_dir = _cache_dir_for(data_dir, cache_dir)
+    digest = hashlib.sha1()
+    for name in files:
+        digest.update(_file_key(os.path.join(data_dir, name)).encode())
+    dir_name = os.path.basename(os.path.normpath(data_dir)) or 'data'
+    stack_path = os.path.join(
+        cache_dir, f"{dir_name}-stack-{digest.hexdigest()[:16]}.npy")
+
+    if os.path.exists(stack_path):
+        return np.load(stack_path, mmap_mode='r'), list(files)
+
+    first = load_bearing_array(files[0], data_dir, cache_dir)
+    tmp_path = f"{stack_path}.{os.getpid()}.tmp"
+    stack = np.lib.format.open_memmap(
+        tmp_path, mode='w+', dtype=np.float32, shape=(len(files),) + first.shape)
+    for i, name in enumerate(files):
+        array = load_bearing_array(name, data_dir, cache_dir)
+        if array.shape != first.shape:
+            del stack
+            os.remove(tmp_path)
+            raise ValueError(
+                f"Niezgodny kształt pliku {name}: {array.shape} != {first.shape}")
+        stack[i] = array
+    stack.flush()
+    del stack
+    os.replace(tmp_path, stack_path)
+
+    return np.load(stack_path, mmap_mode='r'), list(files)
+
+
+def compute_melspec(df, colum_name='Bearing_1', sr=20000, backend='librosa'):
+    """
+    backend='numpy' uses src.features (no librosa import, same result
+    within features.MELSPEC_DB_TOLERANCE dB). Falls back to it when
+    librosa is not installed.
+    """
     signal = df[colum_name].values
+    if backend == 'numpy' or librosa is None:
+        melspec = melspectrogram(signal, sr=sr, n_mels=128, fmax=10000, hop_length=128)
+        return power_to_db(melspec)
+
     melspec = librosa.feature.melspectrogram(
         y=signal, sr=sr, n_mels=128, fmax=10000, hop_length=128)
     melspec_db = librosa.power_to_db(melspec, ref=np.max)
     return melspec_db
 
 
+def compute_melspec_multichannel(df, columns=None, sr=20000):
+    """
+    compute_melspec for all bearings at once (one batched STFT).
+    Returns a (channels, 128, T) float32 tensor in dB, each channel
+    referenced to its own maximum like compute_melspec.
+    """
+    if columns is None:
+        columns = list(df.columns)
+    signals = np.asarray(df[columns].values, dtype=np.float32).T
+    melspec = melspectrogram_batch(
+        signals, sr=sr, n_mels=128, fmax=10000, hop_length=128)
+    return power_to_db_batch(melspec)
+
+
 # def creadte_dataset_windows(melspec, window_size=64, stride=32):
 #     n_mels, time_steps = melspec.shape
 #     windows = []
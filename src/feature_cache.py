@@ -0,0 +1,191 @@
+"""
+Bulk feature extraction with a content-addressed on-disk cache.
+
+Each IMS file becomes a normalised mel-spectrogram (the array the edge
+uploads). Results are stored under a key derived from the file content
+hash and the feature parameters, so a cache entry is reused for any copy
+of the same file and invalidated whenever n_mels / hop / normalisation
+change in config/model_config.json.
+
+    python -m src.feature_cache data/raw/2nd_test --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from .data_loader import load_bearing_data, list_bearing_files
+    from .features import (melspectrogram, power_to_db, normalize_melspec,
+                           DEFAULT_SR, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH,
+                           DEFAULT_N_MELS, DEFAULT_FMAX)
+except ImportError:
+    from data_loader import load_bearing_data, list_bearing_files
+    from features import (melspectrogram, power_to_db, normalize_melspec,
+                          DEFAULT_SR, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH,
+                          DEFAULT_N_MELS, DEFAULT_FMAX)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config', 'model_config.json')
+DEFAULT_FEATURE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', 'features')
+# bump when the extraction code changes in a way that alters the output
+FEATURE_VERSION = 1
+
+DEFAULT_FEATURE_PARAMS = {
+    'column': 'Bearing_1',
+    'sr': DEFAULT_SR,
+    'n_fft': DEFAULT_N_FFT,
+    'hop_length': DEFAULT_HOP_LENGTH,
+    'n_mels': DEFAULT_N_MELS,
+    'fmax': DEFAULT_FMAX,
+    'norm_min': -80.0,
+    'norm_max': 0.0,
+}
+
+
+def load_model_config(config_path=DEFAULT_CONFIG_PATH):
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def feature_params_from_config(config_path=DEFAULT_CONFIG_PATH, **overrides):
+    """
+    Default feature parameters updated with matching keys from the model config
+    """
+    config = load_model_config(config_path)
+    params = dict(DEFAULT_FEATURE_PARAMS)
+    params.update({k: config[k] for k in DEFAULT_FEATURE_PARAMS if k in config})
+    params.update(overrides)
+    return params
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_digest, params):
+    payload = json.dumps({'v': FEATURE_VERSION, 'file': content_digest,
+                          'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.npy")
+
+
+def extract_features(file_path, params):
+    """
+    IMS file -> normalised (n_mels, frames) float32 spectrogram
+    """
+    df = load_bearing_data(os.path.basename(file_path), os.path.dirname(file_path))
+    melspec = melspectrogram(df[params['column']].values, sr=params['sr'],
+                             n_fft=params['n_fft'], hop_length=params['hop_length'],
+                             n_mels=params['n_mels'], fmax=params['fmax'])
+    melspec_db = power_to_db(melspec)
+    return normalize_melspec(
+        melspec_db, params['norm_min'], params['norm_max']).astype(np.float32)
+
+
+def _ensure_cached(file_path, params, cache_dir):
+    """Returns (cache file, hit). Runs inside pool workers."""
+    path = cache_path(cache_dir, cache_key(file_digest(file_path), params))
+    if os.path.exists(path):
+        return path, True
+
+    features = extract_features(file_path, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, features)
+    os.replace(tmp_path, path)
+    return path, False
+
+
+def _ensure_cached_star(args):
+    return _ensure_cached(*args)
+
+
+def cached_features(file_path, params=None, cache_dir=DEFAULT_FEATURE_CACHE_DIR):
+    """
+    Normalised spectrogram for one file, computed only on a cache miss
+    """
+    if params is None:
+        params = feature_params_from_config()
+    path, _ = _ensure_cached(file_path, params, cache_dir)
+    return np.load(path, mmap_mode='r')
+
+
+def build_feature_cache(data_dir, cache_dir=DEFAULT_FEATURE_CACHE_DIR,
+                        params=None, workers=None, files=None):
+    """
+    Extracts features for every file of a directory over a process pool.
+    Returns (cache paths in file order, stats dict).
+    """
+    if params is None:
+        params = feature_params_from_config()
+    if files is None:
+        files = list_bearing_files(data_dir)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    jobs = [(os.path.join(data_dir, name), params, cache_dir) for name in files]
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [_ensure_cached(*job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_ensure_cached_star, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    hits = sum(1 for _, hit in results if hit)
+    stats = {
+        'files': len(files),
+        'hits': hits,
+        'misses': len(files) - hits,
+        'workers': workers,
+        'seconds': elapsed,
+        'files_per_s': len(files) / elapsed if elapsed > 0 else float('inf'),
+    }
+    return [path for path, _ in results], stats
+
+
+def load_feature_set(data_dir, cache_dir=DEFAULT_FEATURE_CACHE_DIR,
+                     params=None, workers=None, files=None):
+    """
+    Cached spectrograms of a whole directory as memmaps, in file order
+    """
+    paths, _ = build_feature_cache(data_dir, cache_dir, params, workers, files)
+    return [np.load(path, mmap_mode='r') for path in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk feature extraction to the feature cache')
+    parser.add_argument('data_dir')
+    parser.add_argument('--cache-dir', default=DEFAULT_FEATURE_CACHE_DIR)
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--column', default=None)
+    args = parser.parse_args()
+
+    overrides = {'column': args.column} if args.column else {}
+    params = feature_params_from_config(args.config, **overrides)
+    _, stats = build_feature_cache(args.data_dir, args.cache_dir, params, args.workers)
+
+    print(f"✅ Plików: {stats['files']} (cache hit: {stats['hits']}, "
+          f"nowe: {stats['misses']}), procesy: {stats['workers']}")
+    print(f"⏱️ Czas: {stats['seconds']:.2f}s ({stats['files_per_s']:.1f} plików/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Librosa-free mel-spectrogram path (NumPy + scipy.fft only).
+
+Matches librosa.feature.melspectrogram + librosa.power_to_db(ref=np.max)
+with the defaults used by compute_melspec (Slaney mel scale and norm,
+centred zero-padded STFT, periodic Hann) to within MELSPEC_DB_TOLERANCE dB.
+"""
+import functools
+import numpy as np
+import scipy.fft
+
+DEFAULT_SR = 20000
+DEFAULT_N_FFT = 2048
+DEFAULT_HOP_LENGTH = 128
+DEFAULT_N_MELS = 128
+DEFAULT_FMAX = 10000
+MELSPEC_DB_TOLERANCE = 1e-3
+
+# Slaney mel scale: linear below 1 kHz, logarithmic above
+_F_SP = 200.0 / 3
+_MIN_LOG_HZ = 1000.0
+_MIN_LOG_MEL = _MIN_LOG_HZ / _F_SP
+_LOGSTEP = np.log(6.4) / 27.0
+
+
+def hz_to_mel(frequencies):
+    frequencies = np.asanyarray(frequencies, dtype=np.float64)
+    mels = frequencies / _F_SP
+    log_region = frequencies >= _MIN_LOG_HZ
+    mels = np.where(log_region, _MIN_LOG_MEL + np.log(
+        np.maximum(frequencies, _MIN_LOG_HZ) / _MIN_LOG_HZ) / _LOGSTEP, mels)
+    return mels
+
+
+def mel_to_hz(mels):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    freqs = _F_SP * mels
+    log_region = mels >= _MIN_LOG_MEL
+    freqs = np.where(log_region, _MIN_LOG_HZ * np.exp(
+        _LOGSTEP * (mels - _MIN_LOG_MEL)), freqs)
+    return freqs
+
+
+def mel_filterbank(sr=DEFAULT_SR, n_fft=DEFAULT_N_FFT, n_mels=DEFAULT_N_MELS,
+                   fmin=0.0, fmax=DEFAULT_FMAX):
+    """
+    Triangular Slaney-normalised filterbank, same as librosa.filters.mel defaults.
+    Returns (n_mels, n_fft // 2 + 1) float32.
+    """
+    if fmax is None:
+        fmax = sr / 2.0
+    fft_freqs = np.fft.rfftfreq(n_fft, d=1.0 / sr)
+    mel_f = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+    upper = ramps[2:] / fdiff[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+
+    enorm = 2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels])
+    weights *= enorm[:, np.newaxis]
+    return weights.astype(np.float32)
+
+
+@functools.lru_cache(maxsize=16)
+def melspec_plan(sr=DEFAULT_SR, n_fft=DEFAULT_N_FFT, n_mels=DEFAULT_N_MELS,
+                 fmax=DEFAULT_FMAX, hop_length=DEFAULT_HOP_LENGTH):
+    """
+    Hann window and mel filterbank, built once per parameter set.
+    Returned arrays are read-only because they are shared between calls.
+    """
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+              ).astype(np.float32)
+    mel_basis = mel_filterbank(sr=sr, n_fft=n_fft, n_mels=n_mels, fmax=fmax)
+    # (n_fft // 2 + 1, n_mels), so the projection is a plain matmul on frames
+    mel_basis_t = np.ascontiguousarray(mel_basis.T)
+
+    window.setflags(write=False)
+    mel_basis_t.setflags(write=False)
+    return window, mel_basis_t
+
+
+def melspectrogram_batch(signals, sr=DEFAULT_SR, n_fft=DEFAULT_N_FFT,
+                         hop_length=DEFAULT_HOP_LENGTH, n_mels=DEFAULT_N_MELS,
+                         fmax=DEFAULT_FMAX):
+    """
+    Mel power spectrogram for many channels in one batched STFT.
+    signals: (channels, samples) -> (channels, n_mels, frames) float32.
+    Framing matches librosa (center=True, zero padding, periodic Hann).
+    """
+    signals = np.asarray(signals, dtype=np.float32)
+    if signals.ndim == 1:
+        signals = signals[np.newaxis, :]
+
+    window, mel_basis_t = melspec_plan(sr, n_fft, n_mels, fmax, hop_length)
+
+    pad = n_fft // 2
+    padded = np.pad(signals, ((0, 0), (pad, pad)), mode='constant')
+    # (channels, frames, n_fft) strided view, no copy until the window multiply
+    frames = np.lib.stride_tricks.sliding_window_view(
+        padded, n_fft, axis=-1)[:, ::hop_length]
+
+    melspec = frames_to_mel(frames, window, mel_basis_t)
+    return np.ascontiguousarray(melspec.transpose(0, 2, 1), dtype=np.float32)
+
+
+def frames_to_mel(frames, window, mel_basis_t):
+    """
+    (..., n_fft) signal frames -> (..., n_mels) mel power
+    """
+    spectrum = scipy.fft.rfft(frames * window, axis=-1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    return np.matmul(power, mel_basis_t)
+
+
+def melspectrogram(signal, sr=DEFAULT_SR, n_fft=DEFAULT_N_FFT,
+                   hop_length=DEFAULT_HOP_LENGTH, n_mels=DEFAULT_N_MELS,
+                   fmax=DEFAULT_FMAX):
+    """
+    Single-channel mel power spectrogram: (n_mels, frames) float32
+    """
+    return melspectrogram_batch(np.asarray(signal)[np.newaxis, :], sr=sr,
+                                n_fft=n_fft, hop_length=hop_length,
+                                n_mels=n_mels, fmax=fmax)[0]
+
+
+def power_to_db(melspec, amin=1e-10, top_db=80.0):
+    """
+    Equivalent of librosa.power_to_db(S, ref=np.max)
+    """
+    return power_to_db_batch(melspec, amin=amin, top_db=top_db)
+
+
+def power_to_db_batch(melspec, amin=1e-10, top_db=80.0):
+    """
+    librosa.power_to_db(S, ref=np.max) applied independently to every channel
+    """
+    melspec = np.asarray(melspec)
+    log_spec = 10.0 * np.log10(np.maximum(amin, melspec))
+    ref = np.max(melspec, axis=(-2, -1), keepdims=True)
+    log_spec -= 10.0 * np.log10(np.maximum(amin, ref))
+    if top_db is not None:
+        log_spec = np.maximum(
+            log_spec, log_spec.max(axis=(-2, -1), keepdims=True) - top_db)
+    return log_spec.astype(np.float32, copy=False)
+
+
+def normalize_melspec(melspec_db, norm_min=-80.0, norm_max=0.0):
+    """
+    dB spectrogram -> [0, 1], the scaling the model was trained on
+    (norm_min / norm_max from config/model_config.json)
+    """
+    norm_mel = (melspec_db - norm_min) / (norm_max - norm_min)
+    return np.clip(norm_mel, 0, 1)
@@ -0,0 +1,158 @@
+"""
+Duplicate S3 event short-circuit for the Lambda.
+
+S3 notifications are at-least-once (and LocalStack replays them), so the
+same object version can arrive several times. An object version is
+identified by bucket/key + versionId (or the ETag when the bucket is not
+versioned). Before anything is downloaded:
+
+1. in-container LRU of recently completed keys -> duplicate, no I/O;
+2. conditional put into a small processed-keys table ("claim"): it fails
+   when another invocation already processed or is processing the key.
+   A claim that was never completed (crash/timeout) expires after
+   lease_seconds so the event can be retried. The lease must end before
+   the retry arrives (Lambda retries an async event after ~1 and ~2
+   minutes): the handler passes its remaining time plus a small margin.
+   The claim records its owner (the Lambda request id), and complete and
+   release only touch a claim they still own: an invocation that
+   outlived its lease must not drop or finish the claim of its successor.
+
+Records without versionId/ETag are always processed (a re-upload under
+the same key could not be told apart from a replay).
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+DEFAULT_CACHE_SIZE = 1024
+# function timeout (60 s, build_and_deploy.py) + margin
+DEFAULT_LEASE_SECONDS = 70
+# processed-keys items expire via the DynamoDB TTL attribute 'expires_at'
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def idempotency_key(record):
+    """
+    S3 event record -> 'bucket/key#version' or None when the event carries
+    neither versionId nor eTag
+    """
+    s3 = record['s3']
+    obj = s3['object']
+    version = obj.get('versionId') or obj.get('eTag')
+    if not version:
+        return None
+    return f"{s3['bucket']['name']}/{obj['key']}#{version}"
+
+
+class IdempotencyGuard:
+    """
+    table: processed-keys DynamoDB Table (hash key 'idempotency_key') or
+    None for the in-container LRU only. Thread-safe (the Lambda claims
+    keys from its download pool).
+    """
+
+    def __init__(self, table=None, cache_size=DEFAULT_CACHE_SIZE,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 owner=None):
+        self.table = table
+        # default owner of claims (per guard); the Lambda passes its request id
+        self.owner = owner or uuid.uuid4().hex
+        self.cache_size = cache_size
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'lru_hits': 0, 'table_hits': 0, 'misses': 0, 'unkeyed': 0,
+                      'lost_claims': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key):
+        with self._lock:
+            self._recent[key] = True
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+
+    def claim(self, key, lease_seconds=None, owner=None):
+        """
+        True = first time, process it; False = duplicate, skip it.
+        lease_seconds: how long the claim blocks other invocations
+        (default: the guard's lease_seconds); owner: claim owner passed
+        again to complete/release (default: the guard's owner)
+        """
+        if key is None:
+            self._count('unkeyed')
+            return True
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                self.stats['lru_hits'] += 1
+                return False
+        if self.table is not None:
+            now = int(time.time())
+            try:
+                self.table.put_item(
+                    Item={'idempotency_key': key, 'status': IN_PROGRESS,
+                          'owner': owner or self.owner,
+                          'lease_until': now + int(lease_seconds or self.lease_seconds),
+                          'expires_at': now + self.ttl_seconds},
+                    ConditionExpression=("attribute_not_exists(idempotency_key) OR "
+                                         "(#status = :in_progress AND lease_until < :now)"),
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues={':in_progress': IN_PROGRESS, ':now': now})
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                # completed or still in progress elsewhere; only a completed
+                # key goes to the LRU (a failed claim may be released later)
+                self._count('table_hits')
+                return False
+        self._count('misses')
+        return True
+
+    def complete(self, keys, owner=None):
+        """
+        Marks keys claimed by owner as processed (table + LRU); a claim
+        taken over by another invocation is left to it (counted in
+        stats['lost_claims'])
+        """
+        keys = [key for key in keys if key is not None]
+        for key in keys:
+            self._remember(key)
+        if self.table is None:
+            return
+        expires_at = int(time.time()) + self.ttl_seconds
+        for key in keys:
+            try:
+                self.table.put_item(
+                    Item={'idempotency_key': key, 'status': COMPLETED, 'expires_at': expires_at},
+                    ConditionExpression='#owner = :owner',
+                    ExpressionAttributeNames={'#owner': 'owner'},
+                    ExpressionAttributeValues={':owner': owner or self.owner})
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                self._count('lost_claims')
+
+    def release(self, key, owner=None):
+        """Drops owner's claim of a record that failed, so a retry is processed"""
+        if key is None or self.table is None:
+            return
+        try:
+            self.table.delete_item(Key={'idempotency_key': key},
+                                   ConditionExpression='#status = :in_progress AND #owner = :owner',
+                                   ExpressionAttributeNames={'#status': 'status', '#owner': 'owner'},
+                                   ExpressionAttributeValues={':in_progress': IN_PROGRESS,
+                                                              ':owner': owner or self.owner})
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            self._count('lost_claims')
@@ -0,0 +1,227 @@
+"""
+Per-stage timers and counters emitted as CloudWatch Embedded Metric Format
+(EMF): one JSON line per invocation on stdout, which CloudWatch Logs turns
+into metrics without PutMetricData calls.
+
+    metrics = Metrics(dimensions={'Function': 'EchoGuardProcessor'})
+    with metrics.timer('download'):
+        ...
+    metrics.count('bytes_downloaded', len(body), 'Bytes')
+    metrics.flush()          # one EMF line, counters reset
+
+Timers and counters add up until flush (thread-safe, e.g. downloads on a
+pool); a stage timed on several threads reports their summed time. flush
+adds the peak RSS of the process. Disabled, timer() returns a shared no-op
+context manager and the other calls return at once.
+
+Local logs (CloudWatch export, simulator output) -> p50/p95/p99 per metric:
+
+    python -m src.metrics lambda.log [--by cold_start]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_NAMESPACE = 'EchoGuard'
+EMF_MARKER = '"_aws"'
+PERCENTILES = (50, 95, 99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process [MB] (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def _print_line(line):
+    print(line, flush=True)
+
+
+class Metrics:
+    """
+    dimensions: CloudWatch dimensions of every metric (keep them few,
+    each combination is a separate metric series).
+    emit: callable taking the JSON line (default: print to stdout; the
+    Lambda runtime prefixes logger lines, which breaks EMF parsing).
+    """
+
+    def __init__(self, namespace=DEFAULT_NAMESPACE, dimensions=None, enabled=True, emit=None):
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self.enabled = enabled
+        self.emit = emit or _print_line
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.timings = {}
+        self.values = {}
+        self.properties = {}
+
+    def timer(self, stage):
+        """Context manager adding its duration to stage (reported as <stage>_ms)"""
+        return _Timer(self, stage) if self.enabled else NULL_TIMER
+
+    def add_time(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1, unit='Count'):
+        if not self.enabled:
+            return
+        with self._lock:
+            total, _ = self.values.get(name, (0, unit))
+            self.values[name] = (total + value, unit)
+
+    def gauge(self, name, value, unit='None'):
+        """Last value wins (flags, sizes)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.values[name] = (value, unit)
+
+    def set_property(self, name, value):
+        """Searchable field of the log line, not a metric"""
+        if self.enabled:
+            self.properties[name] = value
+
+    def record(self):
+        """Current state as an EMF document"""
+        fields = {f"{stage}_ms": (1000 * seconds, 'Milliseconds')
+                  for stage, seconds in self.timings.items()}
+        fields.update(self.values)
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [sorted(self.dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit}
+                                for name, (_, unit) in fields.items()],
+                }],
+            },
+            **self.dimensions,
+            **self.properties,
+        }
+        document.update({name: value for name, (value, _) in fields.items()})
+        return document
+
+    def flush(self):
+        """Emits one EMF line and starts the next invocation; None when disabled"""
+        if not self.enabled:
+            return None
+        rss = peak_rss_mb()
+        with self._lock:
+            if rss is not None:
+                self.values['peak_rss_mb'] = (rss, 'Megabytes')
+            document = self.record()
+            self.reset()
+        self.emit(json.dumps(document, separators=(',', ':'), default=str))
+        return document
+
+
+def parse_emf_lines(lines):
+    """EMF documents among log lines (runtime prefixes before the JSON are skipped)"""
+    documents = []
+    for line in lines:
+        if EMF_MARKER not in line:
+            continue
+        start = line.find('{')
+        try:
+            documents.append(json.loads(line[start:]))
+        except ValueError:
+            continue
+    return documents
+
+
+def aggregate(documents, by=None):
+    """
+    {group: {metric: {'count', 'p50', 'p95', 'p99'}}}; group = value of
+    the field `by` (e.g. cold_start) or 'all'
+    """
+    import numpy as np
+
+    samples = {}
+    for document in documents:
+        group = str(document.get(by, '-')) if by else 'all'
+        for directive in document['_aws']['CloudWatchMetrics']:
+            for metric in directive['Metrics']:
+                value = document.get(metric['Name'])
+                if isinstance(value, (int, float)):
+                    samples.setdefault(group, {}).setdefault(metric['Name'], []).append(value)
+
+    summary = {}
+    for group, metrics in samples.items():
+        summary[group] = {}
+        for name, values in sorted(metrics.items()):
+            p = np.percentile(values, PERCENTILES)
+            summary[group][name] = {'count': len(values),
+                                    **{f"p{q}": float(v) for q, v in zip(PERCENTILES, p)}}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='p50/p95/p99 of EMF metrics in log files')
+    parser.add_argument('logs', nargs='*', help='log files (default: stdin)')
+    parser.add_argument('--by', default=None, help='group by a field, e.g. cold_start')
+    args = parser.parse_args()
+
+    lines = []
+    for path in args.logs:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines.extend(f)
+    if not args.logs:
+        lines = sys.stdin.readlines()
+
+    documents = parse_emf_lines(lines)
+    print(f"📊 Rekordy EMF: {len(documents)}")
+    for group, metrics in sorted(aggregate(documents, args.by).items()):
+        if args.by:
+            print(f"\n{args.by} = {group}")
+        print(f"{'metryka':<24}{'n':>7}{'p50':>12}{'p95':>12}{'p99':>12}")
+        for name, row in metrics.items():
+            print(f"{name:<24}{row['count']:>7}{row['p50']:>12.2f}{row['p95']:>12.2f}"
+                  f"{row['p99']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
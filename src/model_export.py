@@ -0,0 +1,114 @@
+"""
+Fully-convolutional export of the bearing autoencoder.
+
+The tf2onnx export (models/bearing_model.onnx) hard-codes the 128x64 window
+in its Reshape/Tile shapes, although the network itself is only
+Conv/MaxPool/UpSampling. This rebuilds the same layers from the exported
+weights with a dynamic time axis, so a whole spectrogram (width divisible
+by 8, three 2x2 poolings) is reconstructed in one pass.
+
+    python -m src.model_export models/bearing_model.onnx models/bearing_model_fcn.onnx
+
+Needs the 'onnx' package (build time only; the Lambda only loads the file).
+"""
+import argparse
+import os
+
+import numpy as np
+import onnx
+from onnx import helper, numpy_helper, TensorProto
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'bearing_model.onnx')
+DEFAULT_FCN_MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'bearing_model_fcn.onnx')
+FCN_INPUT = 'spectrogram'
+FCN_OUTPUT = 'reconstruction'
+# width of the FCN input has to be divisible by 2 ** number of poolings
+WIDTH_MULTIPLE = 8
+
+# layer order of notebooks/02_model_training.ipynb after each Conv
+_ENCODER_CONVS = 3
+_DECODER_CONVS = 3
+
+
+def conv_weights(model):
+    """
+    (weight, bias) of every Conv node, in graph order
+    """
+    initializers = {init.name: numpy_helper.to_array(init)
+                    for init in model.graph.initializer}
+    return [(initializers[node.input[1]], initializers[node.input[2]])
+            for node in model.graph.node if node.op_type == 'Conv']
+
+
+def build_fcn_model(weights, n_mels=128, opset=16):
+    """
+    NCHW graph (N, 1, n_mels, W) -> (N, 1, n_mels, W) with dynamic N and W
+    """
+    if len(weights) != _ENCODER_CONVS + 1 + _DECODER_CONVS:
+        raise ValueError(f"Oczekiwano 7 warstw Conv, znaleziono {len(weights)}")
+
+    nodes, initializers = [], []
+    scales = numpy_helper.from_array(np.array([1, 1, 2, 2], dtype=np.float32), 'up_scales')
+    initializers.append(scales)
+    current = FCN_INPUT
+
+    def conv(i, activation):
+        nonlocal current
+        w, b = weights[i]
+        initializers.extend([numpy_helper.from_array(w.astype(np.float32), f'conv{i}_w'),
+                             numpy_helper.from_array(b.astype(np.float32), f'conv{i}_b')])
+        nodes.append(helper.make_node('Conv', [current, f'conv{i}_w', f'conv{i}_b'],
+                                      [f'conv{i}'], kernel_shape=list(w.shape[2:]),
+                                      pads=[w.shape[2] // 2, w.shape[3] // 2] * 2))
+        nodes.append(helper.make_node(activation, [f'conv{i}'], [f'act{i}']))
+        current = f'act{i}'
+
+    for i in range(_ENCODER_CONVS):
+        conv(i, 'Relu')
+        nodes.append(helper.make_node('MaxPool', [current], [f'pool{i}'],
+                                      kernel_shape=[2, 2], strides=[2, 2]))
+        current = f'pool{i}'
+
+    conv(_ENCODER_CONVS, 'Relu')
+    for i in range(_ENCODER_CONVS + 1, len(weights)):
+        # UpSampling2D (nearest) == Resize nearest/asymmetric/floor with scale 2
+        nodes.append(helper.make_node('Resize', [current, '', 'up_scales'], [f'up{i}'],
+                                      mode='nearest',
+                                      coordinate_transformation_mode='asymmetric',
+                                      nearest_mode='floor'))
+        current = f'up{i}'
+        conv(i, 'Relu' if i < len(weights) - 1 else 'Sigmoid')
+
+    nodes.append(helper.make_node('Identity', [current], [FCN_OUTPUT]))
+
+    graph = helper.make_graph(
+        nodes, 'bearing_autoencoder_fcn',
+        [helper.make_tensor_value_info(FCN_INPUT, TensorProto.FLOAT,
+                                       ['batch', 1, n_mels, 'time'])],
+        [helper.make_tensor_value_info(FCN_OUTPUT, TensorProto.FLOAT,
+                                       ['batch', 1, n_mels, 'time'])],
+        initializers)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', opset)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    return model
+
+
+def export_fcn(model_path=DEFAULT_MODEL_PATH, output_path=DEFAULT_FCN_MODEL_PATH):
+    model = build_fcn_model(conv_weights(onnx.load(model_path)))
+    onnx.save(model, output_path)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the autoencoder with a dynamic time axis')
+    parser.add_argument('model_path', nargs='?', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('output_path', nargs='?', default=DEFAULT_FCN_MODEL_PATH)
+    args = parser.parse_args()
+
+    print(f"✅ Zapisano model FCN: {export_fcn(args.model_path, args.output_path)}")
+
+
+if __name__ == "__main__":
+    main()
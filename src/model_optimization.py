@@ -0,0 +1,172 @@
+"""
+Reduced-precision variants of the bearing autoencoder.
+
+int8_dynamic: weights int8, activations quantized per batch at run time
+int8_static:  weights and activations int8 (QDQ), activation ranges
+              calibrated on windows of healthy snapshots (start of the
+              run-to-failure test, before any wear shows up)
+fp16:         float16 weights and compute, float32 inputs/outputs
+
+Files are written next to the model as <model>.<variant>.onnx; the variant
+used by the Lambda and the edge is "model_variant" in
+config/model_config.json. benchmarks/model_variants.py compares them.
+
+    python -m src.model_optimization --data-dir data/raw/2nd_test --healthy-files 100
+
+Needs 'onnx' and onnxruntime's quantization tools (build time only).
+"""
+import argparse
+import os
+
+import numpy as np
+import onnx
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod,
+                                      QuantFormat, QuantType,
+                                      quantize_dynamic, quantize_static)
+from onnxruntime.transformers.float16 import convert_float_to_float16
+
+try:
+    from .ort_session import MODEL_VARIANTS, variant_path
+    from .preprocessing import create_windows
+except ImportError:
+    from ort_session import MODEL_VARIANTS, variant_path
+    from preprocessing import create_windows
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'bearing_model.onnx')
+# the first files of 2nd_test are long before the outer race failure
+DEFAULT_HEALTHY_FILES = 100
+DEFAULT_CALIBRATION_WINDOWS = 512
+CALIBRATION_BATCH = 32
+
+
+def calibration_windows(spectrograms, max_windows=DEFAULT_CALIBRATION_WINDOWS, seed=0):
+    """
+    (N, n_mels, 64, 1) windows sampled evenly at random from the spectrograms
+    """
+    windows = np.concatenate([create_windows(s) for s in spectrograms])
+    if len(windows) > max_windows:
+        rng = np.random.default_rng(seed)
+        windows = windows[np.sort(rng.choice(len(windows), max_windows, replace=False))]
+    return windows
+
+
+def healthy_spectrograms(data_dir, n_files=DEFAULT_HEALTHY_FILES):
+    """
+    Cached spectrograms of the first n_files of a run-to-failure test
+    """
+    try:
+        from .data_loader import list_bearing_files
+        from .feature_cache import load_feature_set
+    except ImportError:
+        from data_loader import list_bearing_files
+        from feature_cache import load_feature_set
+    files = list_bearing_files(data_dir)[:n_files]
+    return load_feature_set(data_dir, files=files)
+
+
+class WindowCalibrationReader(CalibrationDataReader):
+    """
+    Feeds calibration windows in the layout of the model input:
+    NHWC (N, 128, 64, 1) for the window model, NCHW for the FCN model.
+    """
+
+    def __init__(self, model_path, windows, batch_size=CALIBRATION_BATCH):
+        graph_input = onnx.load(model_path).graph.input[0]
+        dims = graph_input.type.tensor_type.shape.dim
+        if dims[1].dim_value == 1:
+            windows = windows.transpose(0, 3, 1, 2)
+        self.input_name = graph_input.name
+        self.batches = [np.ascontiguousarray(windows[i:i + batch_size], dtype=np.float32)
+                        for i in range(0, len(windows), batch_size)]
+        self._next = 0
+
+    def get_next(self):
+        if self._next >= len(self.batches):
+            return None
+        batch = self.batches[self._next]
+        self._next += 1
+        return {self.input_name: batch}
+
+    def rewind(self):
+        self._next = 0
+
+
+def quantize_int8_dynamic(model_path, output_path):
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+    return output_path
+
+
+def quantize_int8_static(model_path, output_path, windows,
+                         method=CalibrationMethod.MinMax):
+    """
+    QDQ model, per-channel int8 weights, uint8 activations
+    """
+    quantize_static(model_path, output_path, WindowCalibrationReader(model_path, windows),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    calibrate_method=method)
+    return output_path
+
+
+def convert_fp16(model_path, output_path):
+    model = convert_float_to_float16(onnx.load(model_path), keep_io_types=True)
+    onnx.save(model, output_path)
+    return output_path
+
+
+def build_variants(model_path=DEFAULT_MODEL_PATH, windows=None, variants=None):
+    """
+    Writes every requested variant next to model_path. int8_static needs
+    calibration windows. Returns {variant: path}.
+    """
+    if variants is None:
+        variants = [v for v in MODEL_VARIANTS if v != 'fp32']
+    paths = {}
+    for variant in variants:
+        if variant == 'fp32':
+            continue
+        output_path = variant_path(model_path, variant)
+        if variant == 'int8_dynamic':
+            quantize_int8_dynamic(model_path, output_path)
+        elif variant == 'int8_static':
+            if windows is None:
+                raise ValueError("Kwantyzacja statyczna wymaga okien kalibracyjnych")
+            quantize_int8_static(model_path, output_path, windows)
+        elif variant == 'fp16':
+            convert_fp16(model_path, output_path)
+        else:
+            raise ValueError(f"Nieznany wariant modelu: {variant}")
+        paths[variant] = output_path
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build INT8 / FP16 variants of the autoencoder')
+    parser.add_argument('model_paths', nargs='*', default=[DEFAULT_MODEL_PATH])
+    parser.add_argument('--data-dir', default=None,
+                        help='run-to-failure test for static calibration (e.g. data/raw/2nd_test)')
+    parser.add_argument('--healthy-files', type=int, default=DEFAULT_HEALTHY_FILES)
+    parser.add_argument('--calibration-windows', type=int, default=DEFAULT_CALIBRATION_WINDOWS)
+    parser.add_argument('--variants', nargs='+', default=None,
+                        choices=[v for v in MODEL_VARIANTS if v != 'fp32'])
+    args = parser.parse_args()
+
+    variants = args.variants or [v for v in MODEL_VARIANTS if v != 'fp32']
+    windows = None
+    if 'int8_static' in variants:
+        if args.data_dir is None:
+            print("⚠️ Brak --data-dir: pomijam int8_static (kalibracja na zdrowych danych)")
+            variants = [v for v in variants if v != 'int8_static']
+        else:
+            windows = calibration_windows(healthy_spectrograms(args.data_dir, args.healthy_files),
+                                          args.calibration_windows)
+            print(f"⚙️ Kalibracja: {len(windows)} okien z {args.healthy_files} zdrowych plików")
+
+    for model_path in args.model_paths:
+        for variant, path in build_variants(model_path, windows, variants).items():
+            print(f"✅ {variant:<13} {path} ({os.path.getsize(path) / 1024:.0f} kB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Per-device model registry: device id (S3 key prefix) -> model artifact +
+config, so the machines of one fleet can run different models and
+thresholds.
+
+model_registry.json (MODEL_REGISTRY of the Lambda):
+
+    {"default": {"model": "bearing_model.onnx", "config": "model_config.json"},
+     "devices": {
+        "rig_7": {"model": "s3://echoguard-models/rig_7/bearing_model.onnx",
+                  "config": "s3://echoguard-models/rig_7/model_config.json"},
+        "press_2": {"threshold": 0.004}}}
+
+A device entry overrides fields of the default one; "threshold" overrides
+the one in the config. An entry that keeps the default model and config
+(e.g. only a threshold) runs on the caller's default model: it shares
+its session and follows its hot reloads. Locations are package-relative
+paths or s3:// URIs (an S3 entry names the exact artifact, precision
+variant included). S3 objects are downloaded once into cache_dir; /tmp
+survives between invocations of a warm container. Results of a device
+carry the entry's "version" or, without one, the content hash of its
+model + config (artifact_version), as for a published default model.
+
+Loaded models sit in an LRU bounded by their estimated memory: ONNX file
+size x SESSION_MEMORY_FACTOR (weights + the prepacked copies onnxruntime
+makes) plus the scorer buffers. Devices sharing an artifact share one
+session. Devices without an entry return None (the caller's default model).
+
+The default model can also be published to S3 (cloud/publish_model.py):
+immutable artifacts under <prefix>/<version>/ plus a small manifest
+(current.json) naming them, written last. ManifestWatcher lets a warm
+container notice a new manifest with one HEAD per ttl seconds.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+DEFAULT_CACHE_DIR = '/tmp/echoguard-models'
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+SESSION_MEMORY_FACTOR = 2
+DEFAULT_THRESHOLD = 0.002
+DEFAULT_RELOAD_TTL = 60.0
+S3_SCHEME = 's3://'
+
+# version: stored with every result scored by the model
+DeviceModel = namedtuple('DeviceModel', 'name session scorer threshold version',
+                         defaults=(None,))
+
+
+def artifact_version(*paths):
+    """Content hash of model + config files (12 hex chars)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def parse_s3_uri(location):
+    """'s3://bucket/key' -> (bucket, key); None for a local path"""
+    if not location.startswith(S3_SCHEME):
+        return None
+    bucket, _, key = location[len(S3_SCHEME):].partition('/')
+    return bucket, key
+
+
+def device_from_key(key, default=None):
+    """'rig_7/2004.02.12.10.32.39.npy' -> 'rig_7'; a key without prefix -> default"""
+    prefix, separator, _ = key.partition('/')
+    return prefix if separator and prefix else default
+
+
+class ArtifactStore:
+    """
+    Local path of a model/config location; S3 objects are fetched once
+    (written to a .part file and renamed, so a crash leaves no torn file)
+    """
+
+    def __init__(self, s3_client=None, cache_dir=DEFAULT_CACHE_DIR):
+        self.s3 = s3_client
+        self.cache_dir = cache_dir
+        self.stats = {'downloads': 0, 'bytes': 0, 'download_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def local_path(self, location):
+        parsed = parse_s3_uri(location)
+        if parsed is None:
+            return location
+        bucket, key = parsed
+        path = os.path.join(self.cache_dir, bucket, key)
+        with self._lock:
+            if not os.path.exists(path):
+                start = time.perf_counter()
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.s3.download_file(bucket, key, f"{path}.part")
+                os.replace(f"{path}.part", path)
+                self.stats['downloads'] += 1
+                self.stats['bytes'] += os.path.getsize(path)
+                self.stats['download_seconds'] += time.perf_counter() - start
+        return path
+
+
+class SessionCache:
+    """
+    LRU of loaded models bounded by max_bytes of estimated memory. The
+    newest entry is kept even when it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'load_seconds': 0.0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def get(self, key, load):
+        """Cached value of key; load() -> (value, nbytes) on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._entries[key][0]
+
+            self.stats['misses'] += 1
+            start = time.perf_counter()
+            value, nbytes = load()
+            self.stats['load_seconds'] += time.perf_counter() - start
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.bytes -= freed
+                self.stats['evictions'] += 1
+            return value
+
+
+class ModelRegistry:
+    """
+    load_model(model_path, config) -> (session, scorer or None) is supplied
+    by the caller (lambda_handler: precision variant, optimized artifact,
+    micro-batch scorer), so this module does not depend on onnxruntime.
+    """
+
+    def __init__(self, registry, load_model, store=None, cache=None,
+                 default_threshold=DEFAULT_THRESHOLD):
+        self.default = registry.get('default', {})
+        self.devices = registry.get('devices', {})
+        self.load_model = load_model
+        self.store = store or ArtifactStore()
+        self.cache = cache or SessionCache()
+        self.default_threshold = default_threshold
+        self._configs = {}
+        self._versions = {}
+
+    @classmethod
+    def from_file(cls, location, load_model, store=None, **kwargs):
+        store = store or ArtifactStore()
+        with open(store.local_path(location), 'r') as f:
+            return cls(json.load(f), load_model, store=store, **kwargs)
+
+    def entry(self, device_id):
+        return {**self.default, **self.devices.get(device_id, {})}
+
+    def config(self, location):
+        """Parsed config of a location (read once)"""
+        if location not in self._configs:
+            with open(self.store.local_path(location), 'r') as f:
+                self._configs[location] = json.load(f)
+        return self._configs[location]
+
+    def version(self, location, config_location=None):
+        """artifact_version of the fetched model + config (hashed once)"""
+        key = (location, config_location)
+        if key not in self._versions:
+            paths = [self.store.local_path(location)]
+            if config_location:
+                paths.append(self.store.local_path(config_location))
+            self._versions[key] = artifact_version(*paths)
+        return self._versions[key]
+
+    def _load(self, location, config):
+        path = self.store.local_path(location)
+        session, scorer = self.load_model(path, config)
+        nbytes = SESSION_MEMORY_FACTOR * os.path.getsize(path)
+        if scorer is not None:
+            nbytes += scorer.buffer_bytes
+        return (session, scorer), nbytes
+
+    def uses_default_model(self, device_id):
+        entry = self.entry(device_id)
+        return (entry.get('model') == self.default.get('model')
+                and entry.get('config') == self.default.get('config'))
+
+    def resolve(self, device_id, default=None):
+        """
+        DeviceModel of a registered device, None for the default model.
+        default: the caller's current default DeviceModel; a device on the
+        default model gets it with only its threshold applied.
+        """
+        if device_id not in self.devices:
+            return None
+        entry = self.entry(device_id)
+        if default is not None and self.uses_default_model(device_id):
+            return default._replace(name=device_id,
+                                    threshold=entry.get('threshold', default.threshold))
+        config = self.config(entry['config']) if entry.get('config') else {}
+        threshold = entry.get('threshold', config.get('threshold', self.default_threshold))
+        location = entry['model']
+        key = (location, config.get('model_variant', 'fp32'))
+        session, scorer = self.cache.get(key, lambda: self._load(location, config))
+        version = entry.get('version') or self.version(location, entry.get('config'))
+        return DeviceModel(location, session, scorer, threshold, version)
+
+
+class ManifestWatcher:
+    """
+    Rate-limited change check of a published manifest: at most one HEAD
+    per ttl seconds, the manifest itself is only read when its ETag changed.
+    """
+
+    def __init__(self, s3_client, location, ttl=DEFAULT_RELOAD_TTL, clock=time.monotonic):
+        self.s3 = s3_client
+        self.bucket, self.key = parse_s3_uri(location)
+        self.ttl = ttl
+        self.clock = clock
+        self.etag = None
+        self.checked_at = None
+        self.stats = {'checks': 0, 'changes': 0}
+
+    def poll(self, force=False):
+        """The manifest (dict) when it changed since the last poll, else None"""
+        now = self.clock()
+        if not force and self.checked_at is not None and now - self.checked_at < self.ttl:
+            return None
+        self.checked_at = now
+        self.stats['checks'] += 1
+        if self.s3.head_object(Bucket=self.bucket, Key=self.key)['ETag'] == self.etag:
+            return None
+        response = self.s3.get_object(Bucket=self.bucket, Key=self.key)
+        manifest = json.loads(response['Body'].read())
+        self.etag = response['ETag']
+        self.stats['changes'] += 1
+        return manifest
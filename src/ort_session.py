@@ -0,0 +1,121 @@
+"""
+ONNX Runtime session factory with explicit SessionOptions.
+
+Defaults are chosen for Lambda: thread counts follow the vCPU share of
+the function (memory-proportional, ~1 vCPU per 1769 MB) instead of the
+host core count, no spinning threads, sequential execution.
+
+Graph optimization can be done once at build time (optimize_model): the
+Lambda then loads the optimized artifact and skips (part of) the
+optimization work on every cold start.
+
+    python -m src.ort_session models/bearing_model.onnx dist/bearing_model.opt.onnx
+"""
+import argparse
+import os
+
+import onnxruntime as ort
+
+OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+# level to load an artifact with, by the level it was optimized at:
+# 'extended' artifacts are portable but still need the layout (NCHWc)
+# passes at load time; 'all' artifacts are tied to the build CPU.
+RUNTIME_LEVEL_FOR_ARTIFACT = {'extended': 'all', 'all': 'disable'}
+OPTIMIZED_SUFFIX = '.opt.onnx'
+# precision variants built by src/model_optimization.py, "model_variant" in the config
+MODEL_VARIANTS = ('fp32', 'int8_dynamic', 'int8_static', 'fp16')
+LAMBDA_MB_PER_VCPU = 1769
+
+
+def available_cpus():
+    """
+    CPUs this process can actually use. On Lambda the share is derived
+    from the configured memory size, not from the host cores.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    memory_mb = os.getenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE')
+    if memory_mb:
+        cpus = min(cpus, max(1, round(int(memory_mb) / LAMBDA_MB_PER_VCPU)))
+    return cpus
+
+
+def session_options(optimization_level='all', intra_op_threads=None,
+                    inter_op_threads=1, enable_mem_arena=True,
+                    sequential=True, allow_spinning=False):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = OPTIMIZATION_LEVELS[optimization_level]
+    options.intra_op_num_threads = intra_op_threads or available_cpus()
+    options.inter_op_num_threads = inter_op_threads
+    options.enable_mem_pattern = True
+    options.enable_cpu_mem_arena = enable_mem_arena
+    options.execution_mode = (ort.ExecutionMode.ORT_SEQUENTIAL if sequential
+                              else ort.ExecutionMode.ORT_PARALLEL)
+    # a spinning thread pool only burns the (fractional) vCPU between runs
+    options.add_session_config_entry(
+        'session.intra_op.allow_spinning', '1' if allow_spinning else '0')
+    return options
+
+
+def create_session(model_path, **options):
+    """
+    CPU InferenceSession with session_options(**options)
+    """
+    return ort.InferenceSession(model_path, sess_options=session_options(**options),
+                                providers=['CPUExecutionProvider'])
+
+
+def optimized_path(model_path):
+    root, _ = os.path.splitext(model_path)
+    return f"{root}{OPTIMIZED_SUFFIX}"
+
+
+def variant_path(model_path, variant='fp32'):
+    """
+    models/bearing_model.onnx + 'int8_static' -> models/bearing_model.int8_static.onnx
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Nieznany wariant modelu: {variant}")
+    if variant == 'fp32':
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{variant}{ext}"
+
+
+def optimize_model(model_path, output_path=None, optimization_level='extended'):
+    """
+    Runs the graph optimizer once and saves the result
+    ('.ort' output path = ORT flatbuffer format)
+    """
+    output_path = output_path or optimized_path(model_path)
+    options = session_options(optimization_level, intra_op_threads=1)
+    options.optimized_model_filepath = output_path
+    if output_path.endswith('.ort'):
+        options.add_session_config_entry('session.save_model_format', 'ORT')
+    ort.InferenceSession(model_path, sess_options=options,
+                         providers=['CPUExecutionProvider'])
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-optimize an ONNX model for fast session start')
+    parser.add_argument('model_path')
+    parser.add_argument('output_path', nargs='?', default=None)
+    parser.add_argument('--level', default='extended', choices=list(RUNTIME_LEVEL_FOR_ARTIFACT))
+    args = parser.parse_args()
+
+    path = optimize_model(args.model_path, args.output_path, args.level)
+    print(f"✅ Zoptymalizowany model: {path} "
+          f"(ładować z poziomem '{RUNTIME_LEVEL_FOR_ARTIFACT[args.level]}')")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,78 @@
 import numpy as np
 
 
-def create_windows(data, window_width=64, stride=32):
+def _as_2d(data, window_width):
     """
-    Tworzy okna z danych spektrogramu.
-    Obsługuje padding dla krótkich sygnałów.
+    Spektrogram (n_mels, time_steps) z paddingiem zerami do szerokości okna.
     """
     # Upewnij się, że dane są 2D (n_mels, time_steps)
     if data.ndim > 2:
         data = np.squeeze(data)
 
     n_mels, time_steps = data.shape
-    windows = []
 
     # Jeśli sygnał jest krótszy niż okno, dodaj padding (zera)
     if time_steps < window_width:
         pad_width = window_width - time_steps
         data = np.pad(data, ((0, 0), (0, pad_width)), mode='constant')
-        time_steps = window_width
 
-    # Sliding window
-    for start in range(0, time_steps - window_width + 1, stride):
-        end = start + window_width
-        window = data[:, start:end]
-        windows.append(window)
+    return data
+
+
+def _has_tail(time_steps, window_width, stride):
+    return time_steps > window_width and (time_steps - window_width) % stride != 0
+
+
+def count_windows(time_steps, window_width=64, stride=32, include_tail=False):
+    """
+    Liczba okien, które create_windows zwróci dla danej długości spektrogramu.
+    """
+    time_steps = max(time_steps, window_width)
+    count = (time_steps - window_width) // stride + 1
+    if include_tail and _has_tail(time_steps, window_width, stride):
+        count += 1
+    return count
+
+
+def window_view(data, window_width=64, stride=32):
+    """
+    Okna jako widok (Batch, H, W, 1) tylko do odczytu - bez kopiowania danych
+    (poza paddingiem krótkich sygnałów). Typ danych pozostaje bez zmian.
+    """
+    data = _as_2d(data, window_width)
+
+    # (n_mels, n_okien, W) -> (Batch, H, W, 1)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        data, window_width, axis=1)[:, ::stride]
+    return windows.transpose(1, 0, 2)[..., np.newaxis]
+
+
+def create_windows(data, window_width=64, stride=32, include_tail=False, out=None):
+    """
+    Tworzy okna z danych spektrogramu.
+    Obsługuje padding dla krótkich sygnałów.
+
+    include_tail: dodaje okno wyrównane do końca sygnału, gdy ostatnie
+    kolumny nie mieszczą się w pełnym kroku (domyślnie są pomijane).
+    out: prealokowany bufor float32 (>= N, H, W, 1); okna są kopiowane
+    bezpośrednio do niego, zwracany jest widok out[:N].
+    """
+    data = _as_2d(data, window_width)
+    n_mels, time_steps = data.shape
+
+    windows = window_view(data, window_width, stride)
+    n_windows = count_windows(time_steps, window_width, stride, include_tail)
 
-    # (Batch_Size, Height, Width)
-    windows = np.array(windows)
+    if out is None:
+        out = np.empty((n_windows, n_mels, window_width, 1), dtype=np.float32)
+    elif out.shape[0] < n_windows or out.shape[1:] != (n_mels, window_width, 1):
+        raise ValueError(
+            f"Bufor {out.shape} za mały dla {n_windows} okien ({n_mels}, {window_width}, 1)")
+    out = out[:n_windows]
 
-    # Dodaj kanał (Batch, H, W, 1) - wymagane przez CNN/ONNX
-    if windows.ndim == 3:
-        windows = np.expand_dims(windows, axis=-1)
+    # Jedyna kopia: widok strided -> bufor float32 (z konwersją typu)
+    out[:len(windows)] = windows
+    if n_windows > len(windows):
+        out[-1, :, :, 0] = data[:, -window_width:]
 
-    return windows.astype(np.float32)
+    return out
@@ -0,0 +1,167 @@
+"""
+DynamoDB item schema of the EchoGuardResults table.
+
+v1 (legacy): mse_value / threshold / windows_processed stored as strings,
+so every reader had to scan whole items and convert client-side.
+v2: the same attributes as DynamoDB numbers (Decimal in boto3) plus
+schema_version, so FilterExpression / ProjectionExpression work
+server-side (e.g. Attr('mse_value').gt(threshold)).
+
+Error profile (optional): the per-window MSE vector and the per-mel-band
+mean error as little-endian float16 Binary attributes (2 bytes/value),
+plus mse_max / mse_p95 / mse_argmax, so the dashboard can show where in
+a file the error sits without re-downloading and re-scoring it.
+
+Needs numpy + boto3 only; the module ships in the Lambda.
+cloud/migrate_results.py rewrites v1 items in place.
+"""
+import math
+import numbers
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+from boto3.dynamodb.conditions import Attr
+
+SCHEMA_VERSION = 2
+NUMERIC_FIELDS = {'mse_value': float, 'threshold': float, 'windows_processed': int}
+# what the dashboard plots (processed_at: rescoring a key changes it, which
+# invalidates its cached profile); everything else stays on the server
+DASHBOARD_FIELDS = ('device_id', 'timestamp', 'mse_value', 'threshold', 'status',
+                    'processed_at')
+PROFILE_FIELDS = ('window_mse', 'band_error', 'profile_pool', 'mse_argmax')
+PROFILE_DTYPE = np.dtype('<f2')
+# keeps the item far below the 400 KB DynamoDB limit (64 KB of profile);
+# longer profiles are max-pooled, so a local peak survives
+MAX_PROFILE_WINDOWS = 32768
+
+
+def to_decimal(value):
+    """
+    float/int/numeric string -> Decimal accepted by DynamoDB (shortest
+    repr, so 0.1 stays 0.1 and not the binary expansion)
+    """
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, numbers.Integral):
+        return Decimal(int(value))
+    if isinstance(value, str):
+        try:
+            return Decimal(int(value))
+        except ValueError:
+            pass
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"DynamoDB nie przyjmuje wartości {value}")
+    return Decimal(repr(value))
+
+
+def result_item(device_id, timestamp, mse, status, threshold, source_file,
+                windows, processed_at=None, **extra):
+    """
+    One scored snapshot as a v2 item
+    """
+    item = {
+        'device_id': device_id,
+        'timestamp': timestamp,
+        'mse_value': to_decimal(mse),
+        'status': status,
+        'threshold': to_decimal(threshold),
+        'source_file': source_file,
+        'windows_processed': to_decimal(int(windows)),
+        'processed_at': processed_at or datetime.now().isoformat(),
+        'schema_version': SCHEMA_VERSION,
+    }
+    item.update(extra)
+    return item
+
+
+def encode_profile(values):
+    """float vector -> float16 bytes (values clipped to the float16 range)"""
+    limit = np.finfo(PROFILE_DTYPE).max
+    return np.clip(np.asarray(values, dtype=np.float32), -limit, limit).astype(PROFILE_DTYPE).tobytes()
+
+
+def decode_profile(data):
+    """
+    float16 Binary attribute (bytes or boto3 Binary) -> float32 vector
+    """
+    data = getattr(data, 'value', data)
+    return np.frombuffer(bytes(data), dtype=PROFILE_DTYPE).astype(np.float32)
+
+
+def error_profile(window_mse, band_error=None, max_windows=MAX_PROFILE_WINDOWS):
+    """
+    Summary stats + compact profile attributes of one scored snapshot.
+    Profiles longer than max_windows are max-pooled by profile_pool.
+    """
+    window_mse = np.asarray(window_mse, dtype=np.float32)
+    attributes = {
+        'mse_max': to_decimal(window_mse.max()),
+        'mse_p95': to_decimal(np.percentile(window_mse, 95)),
+        'mse_argmax': int(window_mse.argmax()),
+    }
+    pool = -(-len(window_mse) // max_windows)
+    if pool > 1:
+        padded = np.zeros(pool * -(-len(window_mse) // pool), dtype=np.float32)
+        padded[:len(window_mse)] = window_mse
+        window_mse = padded.reshape(-1, pool).max(axis=1)
+    attributes['profile_pool'] = pool
+    attributes['window_mse'] = encode_profile(window_mse)
+    if band_error is not None:
+        attributes['band_error'] = encode_profile(band_error)
+    return attributes
+
+
+def is_current(item):
+    return int(item.get('schema_version', 1)) >= SCHEMA_VERSION
+
+
+def upgrade_item(item):
+    """
+    v1 item -> v2 item (numeric attributes converted); v2 items are returned as-is
+    """
+    if is_current(item):
+        return item
+    upgraded = dict(item)
+    for field in NUMERIC_FIELDS:
+        if field in upgraded:
+            upgraded[field] = to_decimal(upgraded[field])
+    upgraded['schema_version'] = SCHEMA_VERSION
+    return upgraded
+
+
+def projection(fields):
+    """
+    (ProjectionExpression, ExpressionAttributeNames); every name goes
+    through a placeholder because 'timestamp' and 'status' are reserved words
+    """
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    return ", ".join(names), names
+
+
+def scan_items(table, fields=None, filter_expression=None, segment=None, total_segments=None):
+    """
+    Every item of a (parallel) scan, following LastEvaluatedKey. fields and
+    filter_expression are evaluated by DynamoDB, not client-side.
+    """
+    kwargs = {}
+    if fields:
+        kwargs['ProjectionExpression'], kwargs['ExpressionAttributeNames'] = projection(fields)
+    if filter_expression is not None:
+        kwargs['FilterExpression'] = filter_expression
+    if total_segments:
+        kwargs.update(Segment=segment, TotalSegments=total_segments)
+
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def legacy_filter():
+    """Items still in the v1 schema"""
+    return Attr('schema_version').not_exists()
@@ -0,0 +1,172 @@
+"""
+In-memory S3 ingestion for the Lambda (no download_file -> /tmp -> np.load).
+
+- .npy: the header is parsed from the first bytes of the get_object stream
+  and the float32 payload is read straight into the final array
+  (socket -> array, no intermediate buffer or file).
+- other objects: streamed into a reused per-thread bytearray.
+- large objects (bundles): S3RangeReader, a seekable file object backed by
+  ranged GETs, so np.load/zipfile only fetch the parts they read.
+
+Only numpy + stdlib are needed, so this module ships in the Lambda package.
+"""
+import io
+import struct
+import threading
+
+import numpy as np
+
+NPY_MAGIC = b'\x93NUMPY'
+# objects at least this large are read with ranged GETs instead of whole
+RANGE_THRESHOLD = 64 << 20
+RANGE_BLOCK_SIZE = 8 << 20
+
+_local = threading.local()
+
+
+def _read_exact(stream, view):
+    """Fills the whole memoryview from a file-like stream"""
+    done = 0
+    while done < len(view):
+        n = stream.readinto(view[done:])
+        if not n:
+            raise EOFError(f"Strumień zakończony po {done} z {len(view)} bajtów")
+        done += n
+    return done
+
+
+def reusable_buffer(size):
+    """
+    Per-thread bytearray of at least size bytes, reused between objects
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(max(size, 1 << 20))
+        _local.buffer = buffer
+    return memoryview(buffer)[:size]
+
+
+def read_npy_header(stream):
+    """
+    Reads the .npy preamble from a stream. Returns (shape, fortran_order, dtype).
+    """
+    prefix = stream.read(10)
+    if len(prefix) < 10 or prefix[:6] != NPY_MAGIC:
+        raise ValueError("Brak nagłówka NPY")
+    major = prefix[6]
+    if major == 1:
+        header_len = struct.unpack('<H', prefix[8:10])[0]
+    else:
+        prefix += stream.read(2)
+        header_len = struct.unpack('<I', prefix[8:12])[0]
+
+    header = io.BytesIO(prefix + stream.read(header_len))
+    version = np.lib.format.read_magic(header)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(header)
+    return np.lib.format.read_array_header_2_0(header)
+
+
+def read_npy_stream(stream):
+    """
+    .npy stream -> float32 array. float32 payloads are read directly into
+    the result; other dtypes go through the reused buffer and one astype.
+    """
+    shape, fortran_order, dtype = read_npy_header(stream)
+    if dtype.hasobject:
+        raise ValueError("Tablice obiektów nie są obsługiwane")
+    order = 'F' if fortran_order else 'C'
+    count = int(np.prod(shape, dtype=np.int64))
+
+    if dtype == np.float32:
+        array = np.empty(shape, dtype=np.float32, order=order)
+        _read_exact(stream, memoryview(array.reshape(-1, order='A')).cast('B'))
+        return array
+
+    view = reusable_buffer(count * dtype.itemsize)
+    _read_exact(stream, view)
+    values = np.frombuffer(view, dtype=dtype, count=count)
+    return values.reshape(shape, order=order).astype(np.float32)
+
+
+def read_object(s3_client, bucket, key):
+    """
+    Whole object -> memoryview of the reused per-thread buffer
+    (valid until the next read_object call on the same thread)
+    """
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    view = reusable_buffer(response['ContentLength'])
+    _read_exact(response['Body'], view)
+    return view
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Read-only seekable file object over an S3 object, fetched lazily in
+    blocks of block_size with ranged GETs (the last block is kept).
+    """
+
+    def __init__(self, s3_client, bucket, key, size=None, block_size=RANGE_BLOCK_SIZE):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        if size is None:
+            size = s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.size = size
+        self.block_size = block_size
+        self._pos = 0
+        self._block_start = -1
+        self._block = b''
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"Nieobsługiwany whence: {whence}")
+        return self._pos
+
+    def _fetch(self, start, end):
+        response = self.s3.get_object(Bucket=self.bucket, Key=self.key,
+                                      Range=f"bytes={start}-{end - 1}")
+        data = response['Body'].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        return data
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        if self._pos >= self.size or not len(view):
+            return 0
+        end = min(self._pos + len(view), self.size)
+
+        in_block = self._block_start <= self._pos < self._block_start + len(self._block)
+        if not in_block:
+            if end - self._pos >= self.block_size:
+                # large read: fetch exactly the requested range, do not cache
+                data = self._fetch(self._pos, end)
+                view[:len(data)] = data
+                self._pos += len(data)
+                return len(data)
+            self._block_start = self._pos
+            self._block = self._fetch(self._pos, min(self._pos + self.block_size, self.size))
+
+        offset = self._pos - self._block_start
+        n = min(end - self._pos, len(self._block) - offset)
+        view[:n] = self._block[offset:offset + n]
+        self._pos += n
+        return n
@@ -0,0 +1,296 @@
+"""
+Reconstruction-error scoring shared by the Lambda handler and the edge.
+
+Only numpy is imported here (the ONNX session is passed in), so the module
+ships in the Lambda package next to preprocessing.py.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    from .preprocessing import create_windows, count_windows, window_view
+except ImportError:
+    from preprocessing import create_windows, count_windows, window_view
+
+DEFAULT_THRESHOLD = 0.002
+# input height (mel bands) of the exported models
+MODEL_N_MELS = 128
+WINDOW_WIDTH = 64
+WINDOW_STRIDE = 32
+# time axis of the fully-convolutional model must divide by 2 ** poolings
+FCN_WIDTH_MULTIPLE = 8
+SCORING_MODES = ('windows', 'fcn')
+DEFAULT_MICRO_BATCH = 8
+MICRO_BATCH_CANDIDATES = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def load_threshold(config_path, default=DEFAULT_THRESHOLD):
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            return json.load(f).get('threshold', default)
+    return default
+
+
+def load_model_variant(config_path, default='fp32'):
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            return json.load(f).get('model_variant', default)
+    return default
+
+
+def check_spectrogram(spectrogram, n_mels=MODEL_N_MELS):
+    """
+    (n_mels, frames) spectrogram as-is, anything else -> ValueError, so a
+    bad upload fails on its own instead of inside a shared micro-batch
+    """
+    if spectrogram.ndim != 2 or spectrogram.shape[0] != n_mels or spectrogram.shape[1] == 0:
+        raise ValueError(f"Niepoprawny kształt spektrogramu {spectrogram.shape}, "
+                         f"oczekiwano ({n_mels}, ramki)")
+    return spectrogram
+
+
+def reconstruction_mse(batch_data, reconstructions):
+    """
+    Per-window MSE of a (N, H, W, C) batch
+    """
+    return np.mean(np.power(batch_data - reconstructions, 2), axis=(1, 2, 3))
+
+
+def score_windows(session, batch_data):
+    """
+    Runs the autoencoder over a window batch, returns the per-window MSE
+    """
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+
+    reconstructions = session.run(
+        [output_name], {input_name: batch_data})[0]
+
+    return reconstruction_mse(batch_data, reconstructions)
+
+
+def score_spectrogram(session, spectrogram):
+    """
+    Normalised (n_mels, frames) spectrogram -> per-window MSE
+    """
+    batch_data = create_windows(
+        spectrogram, window_width=WINDOW_WIDTH, stride=WINDOW_STRIDE)
+    return score_windows(session, batch_data)
+
+
+def iter_window_batches(spectrograms, batch_size=DEFAULT_MICRO_BATCH, buffer=None,
+                        window_width=WINDOW_WIDTH, stride=WINDOW_STRIDE):
+    """
+    Windows of one or more spectrograms in micro-batches of at most
+    batch_size, copied from strided views into one reusable float32 buffer
+    (a batch may span several spectrograms). Yielded arrays are views of
+    the buffer, valid until the next step.
+    """
+    views = [window_view(spectrogram, window_width, stride) for spectrogram in spectrograms]
+    if buffer is None:
+        buffer = np.empty((batch_size,) + views[0].shape[1:], dtype=np.float32)
+
+    fill = 0
+    for view in views:
+        start = 0
+        while start < len(view):
+            n = min(batch_size - fill, len(view) - start)
+            buffer[fill:fill + n] = view[start:start + n]
+            fill += n
+            start += n
+            if fill == batch_size:
+                yield buffer
+                fill = 0
+    if fill:
+        yield buffer[:fill]
+
+
+class MicroBatchScorer:
+    """
+    Window scoring in fixed-size micro-batches. Input and reconstruction
+    buffers are allocated once, so peak memory is O(batch_size) whatever
+    the spectrogram length. onnxruntime sessions run with IOBinding
+    directly on those buffers; MSE statistics are accumulated per batch.
+    """
+
+    def __init__(self, session, batch_size=DEFAULT_MICRO_BATCH, n_mels=128,
+                 window_width=WINDOW_WIDTH, stride=WINDOW_STRIDE):
+        self.session = session
+        self.batch_size = batch_size
+        self.n_mels = n_mels
+        self.window_width = window_width
+        self.stride = stride
+        shape = (batch_size, n_mels, window_width, 1)
+        self._input = np.empty(shape, dtype=np.float32)
+        self._output = np.empty(shape, dtype=np.float32)
+        self._input_name = session.get_inputs()[0].name
+        self._output_name = session.get_outputs()[0].name
+        self._binding = self._io_binding()
+        self.reset_stats()
+
+    def _io_binding(self):
+        try:
+            import onnxruntime
+        except ImportError:
+            return None
+        if not isinstance(self.session, onnxruntime.InferenceSession):
+            return None
+        return self.session.io_binding()
+
+    @property
+    def buffer_bytes(self):
+        return self._input.nbytes + self._output.nbytes
+
+    def reset_stats(self):
+        self.windows = 0
+        self.batches = 0
+        self.mse_sum = 0.0
+        self.max_mse = 0.0
+        # time in session.run / in score() overall (the rest is windowing + MSE)
+        self.inference_seconds = 0.0
+        self.score_seconds = 0.0
+
+    @property
+    def mean_mse(self):
+        return self.mse_sum / self.windows if self.windows else 0.0
+
+    def _reconstruct(self, batch):
+        """Reconstruction of batch (leading slice of the input buffer) into the output buffer"""
+        output = self._output[:len(batch)]
+        if self._binding is None:
+            output[...] = self.session.run(
+                [self._output_name], {self._input_name: batch})[0]
+            return output
+
+        self._binding.bind_input(self._input_name, 'cpu', 0, np.float32,
+                                 list(batch.shape), batch.ctypes.data)
+        self._binding.bind_output(self._output_name, 'cpu', 0, np.float32,
+                                  list(output.shape), output.ctypes.data)
+        self.session.run_with_iobinding(self._binding)
+        return output
+
+    def score_batch(self, batch, band_out=None):
+        """
+        Per-window MSE of one micro-batch; the output buffer is reused for the error.
+        band_out: optional (len(batch), n_mels) array for the per-band mean error.
+        """
+        start = time.perf_counter()
+        error = self._reconstruct(batch)
+        self.inference_seconds += time.perf_counter() - start
+        np.subtract(batch, error, out=error)
+        np.square(error, out=error)
+        if band_out is not None:
+            error.reshape(len(batch), self.n_mels, -1).mean(axis=2, out=band_out)
+        mse = error.reshape(len(batch), -1).mean(axis=1)
+
+        self.windows += len(mse)
+        self.batches += 1
+        self.mse_sum += float(mse.sum(dtype=np.float64))
+        self.max_mse = max(self.max_mse, float(mse.max()))
+        return mse
+
+    def score(self, spectrograms, band_errors=False):
+        """
+        Per-window MSE array of every spectrogram (one pass over micro-batches).
+        band_errors=True also returns the per-mel-band mean error of every
+        spectrogram (averaged over its windows): (window_mse list, band list).
+        """
+        start = time.perf_counter()
+        counts = [count_windows(np.squeeze(s).shape[-1], self.window_width, self.stride)
+                  for s in spectrograms]
+        splits = np.cumsum(counts)[:-1]
+        window_mse = np.empty(sum(counts), dtype=np.float32)
+        window_band = (np.empty((sum(counts), self.n_mels), dtype=np.float32)
+                       if band_errors else None)
+
+        done = 0
+        for batch in iter_window_batches(spectrograms, self.batch_size, self._input,
+                                         self.window_width, self.stride):
+            band_out = window_band[done:done + len(batch)] if band_errors else None
+            window_mse[done:done + len(batch)] = self.score_batch(batch, band_out)
+            done += len(batch)
+        self.score_seconds += time.perf_counter() - start
+        if not band_errors:
+            return np.split(window_mse, splits)
+        return (np.split(window_mse, splits),
+                [band.mean(axis=0) for band in np.split(window_band, splits)])
+
+
+def tune_micro_batch(session, candidates=MICRO_BATCH_CANDIDATES, n_windows=256,
+                     repeat=3, n_mels=128):
+    """
+    Measures windows/s of every micro-batch size on random data.
+    Returns (best batch size, [{batch_size, windows_per_s, buffer_mb}, ...]).
+    """
+    frames = WINDOW_WIDTH + (n_windows - 1) * WINDOW_STRIDE
+    spectrogram = np.random.default_rng(0).random((n_mels, frames), dtype=np.float32)
+
+    report = []
+    for batch_size in candidates:
+        scorer = MicroBatchScorer(session, batch_size, n_mels)
+        scorer.score([spectrogram[:, :WINDOW_WIDTH]])  # warm-up
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scorer.score([spectrogram])
+            best = min(best, time.perf_counter() - start)
+        report.append({'batch_size': batch_size,
+                       'windows_per_s': n_windows / best,
+                       'buffer_mb': scorer.buffer_bytes / 1e6})
+
+    best = max(report, key=lambda row: row['windows_per_s'])
+    return best['batch_size'], report
+
+
+def error_map(session, spectrogram):
+    """
+    One pass of the fully-convolutional model (src/model_export.py) over
+    the whole spectrogram. Returns the per-pixel squared error
+    (n_mels, time_steps), time_steps padded to at least WINDOW_WIDTH.
+    """
+    spectrogram = np.squeeze(spectrogram)
+    n_mels, time_steps = spectrogram.shape
+    time_steps = max(time_steps, WINDOW_WIDTH)
+    padded_width = -(-time_steps // FCN_WIDTH_MULTIPLE) * FCN_WIDTH_MULTIPLE
+
+    batch_data = np.zeros((1, 1, n_mels, padded_width), dtype=np.float32)
+    batch_data[0, 0, :, :spectrogram.shape[1]] = spectrogram
+
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    reconstruction = session.run([output_name], {input_name: batch_data})[0]
+
+    errors = np.square(batch_data[0, 0] - reconstruction[0, 0])
+    return errors[:, :time_steps]
+
+
+def windowed_mse(errors, window_width=WINDOW_WIDTH, stride=WINDOW_STRIDE):
+    """
+    Per-window MSE of an error map: sliding mean over time (cumulative sum),
+    same window positions as create_windows
+    """
+    column_error = errors.mean(axis=0, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(column_error)))
+    n_windows = count_windows(errors.shape[1], window_width, stride)
+    starts = np.arange(n_windows) * stride
+    window_mse = (cumulative[starts + window_width] - cumulative[starts]) / window_width
+    return window_mse.astype(np.float32)
+
+
+def score_spectrogram_fcn(session, spectrogram, band_errors=False):
+    """
+    Normalised (n_mels, frames) spectrogram -> per-window MSE, computed
+    from a single whole-spectrogram pass instead of overlapping windows.
+    band_errors=True also returns the per-mel-band mean error.
+    """
+    errors = error_map(session, spectrogram)
+    if band_errors:
+        return windowed_mse(errors), errors.mean(axis=1).astype(np.float32)
+    return windowed_mse(errors)
+
+
+def classify(mse, threshold):
+    return "HEALTHY" if mse <= threshold else "ANOMALY_DETECTED"
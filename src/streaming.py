@@ -0,0 +1,145 @@
+"""
+Incremental mel-spectrogram for continuous sensor feeds.
+
+Samples arrive in chunks of any size. Only the STFT frames completed by a
+chunk are computed; the last n_fft - hop samples are carried over to the
+next push. Mel frames go into a fixed-size ring buffer, from which a
+normalised (n_mels, frames) matrix can be taken at any time and passed to
+create_windows or an uploader.
+"""
+import numpy as np
+
+try:
+    from .features import (melspec_plan, frames_to_mel, normalize_melspec,
+                           DEFAULT_SR, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH,
+                           DEFAULT_N_MELS, DEFAULT_FMAX)
+except ImportError:
+    from features import (melspec_plan, frames_to_mel, normalize_melspec,
+                          DEFAULT_SR, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH,
+                          DEFAULT_N_MELS, DEFAULT_FMAX)
+
+
+class StreamingMelspec:
+    """
+    Streaming equivalent of compute_melspec + normalisation.
+
+    Feeding a whole snapshot with push() and then calling flush() gives the
+    same frames as the batch path (librosa centring: n_fft // 2 zeros on
+    both sides of a segment).
+    max_frames: length of the rolling window (161 frames = one IMS snapshot).
+    """
+
+    def __init__(self, sr=DEFAULT_SR, n_fft=DEFAULT_N_FFT,
+                 hop_length=DEFAULT_HOP_LENGTH, n_mels=DEFAULT_N_MELS,
+                 fmax=DEFAULT_FMAX, max_frames=161,
+                 norm_min=-80.0, norm_max=0.0, amin=1e-10, top_db=80.0):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.max_frames = max_frames
+        self.norm_min = norm_min
+        self.norm_max = norm_max
+        self.amin = amin
+        self.top_db = top_db
+        self._window, self._mel_basis_t = melspec_plan(
+            sr, n_fft, n_mels, fmax, hop_length)
+
+        # samples not yet consumed by a full frame (< n_fft after each push)
+        self._carry = np.zeros(n_fft // 2, dtype=np.float32)
+        # ring buffer of mel power frames, one row per frame
+        self._ring = np.zeros((max_frames, n_mels), dtype=np.float32)
+        self._head = 0
+        self._count = 0
+        self.frames_emitted = 0
+
+    def push(self, chunk):
+        """
+        Appends samples; returns the number of new STFT frames computed.
+        """
+        chunk = np.asarray(chunk, dtype=np.float32).ravel()
+        buf = np.concatenate((self._carry, chunk))
+        if len(buf) < self.n_fft:
+            self._carry = buf
+            return 0
+
+        n_new = (len(buf) - self.n_fft) // self.hop_length + 1
+        frames = np.lib.stride_tricks.sliding_window_view(
+            buf, self.n_fft)[:n_new * self.hop_length:self.hop_length]
+        self._append(frames_to_mel(frames, self._window, self._mel_basis_t))
+
+        self._carry = buf[n_new * self.hop_length:].copy()
+        return n_new
+
+    def flush(self):
+        """
+        Ends the current segment: emits the right-padded tail frames and
+        starts the next push() with fresh left padding.
+        """
+        pad = self.n_fft // 2
+        n_new = 0
+        if len(self._carry) > pad:
+            buf = np.concatenate((self._carry, np.zeros(pad, dtype=np.float32)))
+            n_new = (len(buf) - self.n_fft) // self.hop_length + 1
+            if n_new > 0:
+                frames = np.lib.stride_tricks.sliding_window_view(
+                    buf, self.n_fft)[:n_new * self.hop_length:self.hop_length]
+                self._append(frames_to_mel(frames, self._window, self._mel_basis_t))
+        self._carry = np.zeros(pad, dtype=np.float32)
+        return max(n_new, 0)
+
+    def _append(self, mel_frames):
+        n = len(mel_frames)
+        if n >= self.max_frames:
+            self._ring[:] = mel_frames[-self.max_frames:]
+            self._head = 0
+        else:
+            end = self._head + n
+            if end <= self.max_frames:
+                self._ring[self._head:end] = mel_frames
+            else:
+                split = self.max_frames - self._head
+                self._ring[self._head:] = mel_frames[:split]
+                self._ring[:end - self.max_frames] = mel_frames[split:]
+            self._head = end % self.max_frames
+        self._count = min(self._count + n, self.max_frames)
+        self.frames_emitted += n
+
+    def __len__(self):
+        return self._count
+
+    def melspec(self):
+        """
+        Mel power of the retained frames, oldest first: (n_mels, frames)
+        """
+        if self._count < self.max_frames:
+            frames = self._ring[:self._count]
+        else:
+            frames = np.roll(self._ring, -self._head, axis=0)
+        return np.ascontiguousarray(frames.T)
+
+    def melspec_db(self):
+        """
+        dB relative to the loudest retained frame (ref=np.max, like compute_melspec)
+        """
+        melspec = self.melspec()
+        if melspec.size == 0:
+            return melspec
+        log_spec = 10.0 * np.log10(np.maximum(self.amin, melspec))
+        log_spec -= 10.0 * np.log10(max(self.amin, float(melspec.max())))
+        if self.top_db is not None:
+            log_spec = np.maximum(log_spec, log_spec.max() - self.top_db)
+        return log_spec.astype(np.float32, copy=False)
+
+    def normalized(self):
+        """
+        Rolling normalised mel matrix in [0, 1], ready for create_windows
+        """
+        return normalize_melspec(
+            self.melspec_db(), self.norm_min, self.norm_max).astype(np.float32, copy=False)
+
+    def reset(self):
+        self._carry = np.zeros(self.n_fft // 2, dtype=np.float32)
+        self._ring[:] = 0
+        self._head = 0
+        self._count = 0
+        self.frames_emitted = 0
@@ -146,9 +146,9 @@ def test_e2e_corrupted_file(aws_clients):
 
 #*--- Test 5 ---
 def test_e2e_subfolder_file(aws_clients):
-    """Sprawdza czy Trigger S3 działa poprawnie dla plików w podfolderach."""
+    """Sprawdza czy Trigger S3 działa dla plików w podfolderach, a urządzeniem jest pierwszy segment klucza."""
     s3, dynamodb = aws_clients
-    file_key = f'sensors/zone_a/e2e_05_{int(time.time())}.npy'
+    file_key = f'rig_e2e/zone_a/e2e_05_{int(time.time())}.npy'
     local_path = create_temp_npy()
 
     try:
@@ -164,7 +164,7 @@ def test_e2e_subfolder_file(aws_clients):
                 break
 
         assert found_item is not None
-        assert found_item['device_id'] == 'test_rig_1'
+        assert found_item['device_id'] == 'rig_e2e'
     finally:
         if os.path.exists(local_path):
             os.remove(local_path)
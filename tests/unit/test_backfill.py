@@ -0,0 +1,107 @@
+import pytest
+import os
+import numpy as np
+from unittest.mock import MagicMock
+from src.backfill import backfill, timestamp_from_path, list_inputs, DynamoSink, ParquetSink
+
+
+class ListSink:
+    def __init__(self):
+        self.shards = {}
+        self.closed = False
+
+    def write(self, results, shard_index):
+        self.shards[shard_index] = results
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def spectrogram_dir(tmp_path):
+    '''Trzy spektrogramy w formacie uploadu, 100 ramek = 2 okna'''
+    rng = np.random.default_rng(0)
+    for minute in range(3):
+        np.save(tmp_path / f"2004.02.12.10.{minute:02d}.00.npy",
+                rng.random((128, 100), dtype=np.float32))
+    return tmp_path
+
+#*--- Test 1 ---
+def test_timestamp_from_path():
+    '''Nazwa pliku IMS lub .npy -> timestamp zapisywany przez Lambdę'''
+    assert timestamp_from_path('/data/2004.02.12.10.32.39') == '2004-02-12-10-32-39'
+    assert timestamp_from_path('out/2004.02.12.10.32.39.npy') == '2004-02-12-10-32-39'
+
+#*--- Test 2 ---
+def test_numpy_backend_matches_ort(spectrogram_dir):
+    '''Referencyjny backend NumPy daje te same MSE co ORT; wyniki w shardach'''
+    paths = list_inputs(spectrogram_dir=str(spectrogram_dir))
+    by_backend = {}
+    for backend in ('ort', 'numpy'):
+        sink = ListSink()
+        stats = backfill(paths, sink, backend=backend, workers=1, shard_size=2)
+        assert stats['files'] == 3 and stats['windows'] == 6 and stats['shards'] == 2
+        assert sink.closed
+        by_backend[backend] = [r for i in sorted(sink.shards) for r in sink.shards[i]]
+
+    for ort_result, numpy_result in zip(by_backend['ort'], by_backend['numpy']):
+        assert numpy_result['timestamp'] == ort_result['timestamp']
+        assert numpy_result['mse'] == pytest.approx(ort_result['mse'], rel=1e-4)
+        assert numpy_result['scored_on'] == 'backfill'
+    assert [r['timestamp'] for r in by_backend['ort']] == [
+        '2004-02-12-10-00-00', '2004-02-12-10-01-00', '2004-02-12-10-02-00']
+
+#*--- Test 3 ---
+def test_dynamo_sink_writes_result_items(spectrogram_dir):
+    '''Jeden batch_writer na shard, elementy w schemacie Lambdy z profilem błędu'''
+    table = MagicMock()
+    writer = table.batch_writer.return_value.__enter__.return_value
+    paths = list_inputs(spectrogram_dir=str(spectrogram_dir))
+
+    backfill(paths, DynamoSink(table), workers=1, shard_size=2, device_id='rig_7')
+
+    assert table.batch_writer.call_count == 2
+    items = [c.kwargs['Item'] for c in writer.put_item.call_args_list]
+    assert len(items) == 3
+    assert all(item['device_id'] == 'rig_7' for item in items)
+    assert all(item['windows_processed'] == 2 and item['backend'] == 'ort' for item in items)
+    assert all('window_mse' in item and 'model_version' in item for item in items)
+
+#*--- Test 4 ---
+def test_parquet_sink_part_per_shard(spectrogram_dir, tmp_path_factory):
+    '''Parquet: plik part-NNNNN na shard (wymaga pyarrow)'''
+    pytest.importorskip('pyarrow')
+    import pandas as pd
+    output_dir = tmp_path_factory.mktemp('parquet')
+    paths = list_inputs(spectrogram_dir=str(spectrogram_dir))
+
+    backfill(paths, ParquetSink(str(output_dir)), workers=1, shard_size=2)
+
+    assert sorted(os.listdir(output_dir)) == ['part-00000.parquet', 'part-00001.parquet']
+    frame = pd.read_parquet(output_dir)
+    assert len(frame) == 3
+    assert {'mse', 'mse_max', 'mse_p95', 'status', 'model_version'} <= set(frame.columns)
+
+#*--- Test 5 ---
+def test_bad_files_skipped_and_run_resumes(spectrogram_dir, tmp_path_factory):
+    '''Zły kształt i uszkodzony plik są pomijane, reszta shardów zapisana; checkpoint wznawia przebieg'''
+    np.save(spectrogram_dir / '2004.02.12.10.03.00.npy', np.zeros((64, 100), dtype=np.float32))
+    (spectrogram_dir / '2004.02.12.10.04.00.npy').write_bytes(b'not a numpy file')
+    checkpoint = str(tmp_path_factory.mktemp('state') / 'done.txt')
+    paths = list_inputs(spectrogram_dir=str(spectrogram_dir))
+
+    sink = ListSink()
+    stats = backfill(paths, sink, workers=2, shard_size=2, checkpoint=checkpoint)
+
+    assert stats['files'] == 3
+    assert sorted(os.path.basename(p) for p, _ in stats['skipped']) == [
+        '2004.02.12.10.03.00.npy', '2004.02.12.10.04.00.npy']
+    assert 'kształt' in dict(stats['skipped'])[paths[3]]
+    assert sum(len(results) for results in sink.shards.values()) == 3
+
+    # wznowienie: zapisane pliki pominięte, ponawiane tylko nieudane
+    (spectrogram_dir / '2004.02.12.10.04.00.npy').unlink()
+    np.save(spectrogram_dir / '2004.02.12.10.03.00.npy', np.zeros((128, 100), dtype=np.float32))
+    stats = backfill(paths[:4], ListSink(), workers=1, shard_size=2, checkpoint=checkpoint)
+    assert stats['resumed'] == 3
+    assert stats['files'] == 1 and stats['skipped'] == []
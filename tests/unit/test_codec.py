@@ -0,0 +1,115 @@
+import io
+import numpy as np
+import pytest
+from src.codec import (encode_spectrogram, decode_spectrogram, encode_payload,
+                       encode_bundle, decode_bundle, is_bundle_key,
+                       is_quantized_key, lz4_frame, QUANTIZED_SUFFIX)
+
+
+@pytest.fixture
+def spectrogram():
+    return np.random.default_rng(0).random((128, 161)).astype(np.float32)
+
+
+#*--- Test 1 ---
+@pytest.mark.parametrize('dtype, tolerance', [('float32', 0), ('float16', 1e-3), ('uint8', 0.5 / 255 + 1e-6)])
+@pytest.mark.parametrize('compression', ['none', 'zlib'])
+def test_roundtrip(spectrogram, dtype, tolerance, compression):
+    '''Sprawdza czy kodowanie i dekodowanie zachowuje dane w granicach kwantyzacji'''
+    payload = encode_spectrogram(spectrogram, dtype=dtype, compression=compression)
+    result = decode_spectrogram(payload)
+
+    assert result.dtype == np.float32
+    assert result.shape == spectrogram.shape
+    assert np.max(np.abs(result - spectrogram)) <= tolerance
+
+
+#*--- Test 2 ---
+def test_uint8_is_compact(spectrogram):
+    '''Sprawdza czy format uint8 zajmuje ~4x mniej niż float32 .npy'''
+    payload = encode_spectrogram(spectrogram, dtype='uint8', compression='none')
+    npy_payload, _ = encode_payload(spectrogram, 'npy')
+
+    assert len(payload) == 16 + 128 * 161
+    assert len(payload) < len(npy_payload) / 3.9
+
+
+#*--- Test 3 ---
+def test_decode_plain_npy(spectrogram):
+    '''Sprawdza czy dekoder rozpoznaje po nagłówku zwykły plik .npy'''
+    buffer = io.BytesIO()
+    np.save(buffer, spectrogram.astype(np.float64))
+
+    result = decode_spectrogram(buffer.getvalue())
+
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, spectrogram)
+
+
+#*--- Test 4 ---
+def test_decode_rejects_unknown_header(spectrogram):
+    '''Sprawdza czy nieznany nagłówek lub kod typu/kompresji powoduje ValueError'''
+    with pytest.raises(ValueError):
+        decode_spectrogram(b'XXXX' + bytes(100))
+
+    data = bytearray(encode_spectrogram(spectrogram, 'uint8', 'zlib'))
+    for offset, message in ((5, 'typu'), (6, 'kompresji')):
+        corrupted = bytearray(data)
+        corrupted[offset] = 9
+        with pytest.raises(ValueError, match=message):
+            decode_spectrogram(bytes(corrupted))
+
+
+#*--- Test 5 ---
+def test_uint8_clips_out_of_range():
+    '''Sprawdza czy wartości spoza [0, 1] są obcinane przy kwantyzacji uint8'''
+    data = np.array([[-0.5, 0.0, 0.5, 1.0, 1.5]] * 2, dtype=np.float32)
+    result = decode_spectrogram(encode_spectrogram(data, dtype='uint8'))
+
+    np.testing.assert_allclose(result[0], [0.0, 0.0, 128 / 255, 1.0, 1.0], atol=1e-6)
+
+
+#*--- Test 6 ---
+def test_encode_payload_suffix(spectrogram):
+    '''Sprawdza czy sufiks klucza odpowiada formatowi'''
+    _, npy_suffix = encode_payload(spectrogram, 'npy')
+    _, egq_suffix = encode_payload(spectrogram, 'uint8')
+
+    assert npy_suffix == '.npy'
+    assert egq_suffix == QUANTIZED_SUFFIX
+    assert is_quantized_key(f'2004.02.12.10.32.39{egq_suffix}')
+    assert not is_quantized_key('2004.02.12.10.32.39.npy')
+    with pytest.raises(ValueError):
+        encode_payload(spectrogram, 'int4')
+
+
+#*--- Test 7 ---
+@pytest.mark.skipif(lz4_frame is None, reason='brak pakietu lz4')
+def test_lz4_roundtrip(spectrogram):
+    '''Sprawdza kompresję lz4 (opcjonalna zależność)'''
+    result = decode_spectrogram(encode_spectrogram(spectrogram, compression='lz4'))
+    assert np.max(np.abs(result - spectrogram)) <= 0.5 / 255 + 1e-6
+
+
+#*--- Test 8 ---
+def test_bundle_roundtrip(spectrogram):
+    '''Sprawdza czy paczka wielu snapshotów zachowuje manifest i dane'''
+    snapshots = [spectrogram, spectrogram[:, :100] * 0.5]
+    manifest = [{'timestamp': '2004.02.12.10.32.39', 'device_id': 'rig_a'},
+                {'timestamp': '2004.02.12.10.42.39', 'device_id': 'rig_b'}]
+
+    result = decode_bundle(encode_bundle(snapshots, manifest))
+
+    assert [entry for entry, _ in result] == manifest
+    assert result[1][1].shape == (128, 100)
+    assert result[0][1].dtype == np.float32
+    for (_, decoded), original in zip(result, snapshots):
+        assert np.max(np.abs(decoded - original)) <= 0.5 / 255 + 1e-6
+
+
+#*--- Test 9 ---
+def test_bundle_manifest_length_mismatch(spectrogram):
+    '''Sprawdza czy niezgodna długość manifestu powoduje ValueError'''
+    with pytest.raises(ValueError):
+        encode_bundle([spectrogram], [])
+    assert is_bundle_key('rig_2004.02.12.10.32.39_10.bundle.npz')
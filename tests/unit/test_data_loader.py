@@ -3,7 +3,10 @@ import pandas as pd
 import numpy as np
 import os 
 from unittest.mock import patch, MagicMock
-from src.data_loader import load_bearing_data, compute_melspec
+from src.data_loader import (load_bearing_data, compute_melspec, load_bearing_array,
+                             load_bearing_data_cached, load_directory_memmap,
+                             compute_melspec_multichannel)
+from src.features import MELSPEC_DB_TOLERANCE
 
 #*--- Test 1 ---
 @patch('src.data_loader.pd.read_csv')
@@ -78,3 +81,123 @@ def test_compute_melspec_custom_column(mock_melspec, mock_power_to_db):
     passed_signal = kwargs['y']
 
     assert np.mean(passed_signal) == 1.0
+
+
+def _write_ims_file(path, n_samples=256):
+    '''Zapisuje mały plik w formacie IMS (4 kolumny, tabulatory)'''
+    data = np.random.rand(n_samples, 4)
+    np.savetxt(path, data, delimiter='\t', fmt='%.6f')
+    return data
+
+
+#*--- Test 5 ---
+def test_load_bearing_array_matches_csv(tmp_path):
+    '''Sprawdza czy memmap z cache ma te same wartości co pd.read_csv'''
+    expected = _write_ims_file(tmp_path / '2004.02.12.10.32.39')
+
+    result = load_bearing_array('2004.02.12.10.32.39', str(tmp_path))
+
+    assert isinstance(result, np.memmap)
+    assert result.dtype == np.float32
+    assert result.shape == (256, 4)
+    np.testing.assert_allclose(result, expected, atol=1e-6)
+
+
+#*--- Test 6 ---
+def test_load_bearing_array_parses_once(tmp_path):
+    '''Sprawdza czy drugi odczyt nie parsuje ponownie pliku tekstowego'''
+    _write_ims_file(tmp_path / 'f1')
+    load_bearing_array('f1', str(tmp_path))
+
+    with patch('src.data_loader.pd.read_csv') as mock_read_csv:
+        load_bearing_array('f1', str(tmp_path))
+        mock_read_csv.assert_not_called()
+
+
+#*--- Test 7 ---
+def test_load_bearing_array_invalidated_by_mtime(tmp_path):
+    '''Sprawdza czy zmiana pliku (mtime) wymusza ponowne parsowanie'''
+    path = tmp_path / 'f1'
+    _write_ims_file(path)
+    load_bearing_array('f1', str(tmp_path))
+
+    new_data = _write_ims_file(path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    result = load_bearing_array('f1', str(tmp_path))
+    np.testing.assert_allclose(result, new_data, atol=1e-6)
+
+
+#*--- Test 8 ---
+def test_load_bearing_data_cached_columns(tmp_path):
+    '''Sprawdza czy wersja z cache zwraca DataFrame z poprawnymi kolumnami'''
+    _write_ims_file(tmp_path / 'f1')
+    result = load_bearing_data_cached('f1', str(tmp_path))
+
+    assert list(result.columns) == ['Bearing_1', 'Bearing_2', 'Bearing_3', 'Bearing_4']
+    assert len(result) == 256
+
+
+#*--- Test 9 ---
+def test_load_directory_memmap(tmp_path):
+    '''Sprawdza czy cały katalog trafia do jednego memmapu (pliki, próbki, 4)'''
+    expected = [_write_ims_file(tmp_path / name) for name in ('a', 'b', 'c')]
+    (tmp_path / 'Readme.pdf').write_text('doc')
+
+    stack, files = load_directory_memmap(str(tmp_path))
+
+    assert files == ['a', 'b', 'c']
+    assert stack.shape == (3, 256, 4)
+    assert stack.dtype == np.float32
+    np.testing.assert_allclose(stack[1], expected[1], atol=1e-6)
+
+
+#*--- Test 10 ---
+def test_load_directory_memmap_shape_mismatch(tmp_path):
+    '''Sprawdza czy pliki o różnej długości powodują ValueError'''
+    _write_ims_file(tmp_path / 'a', n_samples=256)
+    _write_ims_file(tmp_path / 'b', n_samples=128)
+
+    with pytest.raises(ValueError):
+        load_directory_memmap(str(tmp_path))
+
+
+#*--- Test 11 ---
+def test_compute_melspec_multichannel_matches_single():
+    '''Sprawdza czy tryb wielokanałowy daje to samo co compute_melspec dla każdej kolumny'''
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(0, 0.1, (4096, 4)),
+                      columns=['Bearing_1', 'Bearing_2', 'Bearing_3', 'Bearing_4'])
+
+    result = compute_melspec_multichannel(df)
+
+    assert result.shape == (4, 128, 33)
+    assert result.dtype == np.float32
+    for channel, column in enumerate(df.columns):
+        np.testing.assert_allclose(result[channel], compute_melspec(df, column), atol=1e-3)
+
+
+#*--- Test 12 ---
+def test_compute_melspec_numpy_backend():
+    '''Sprawdza czy backend NumPy daje ten sam wynik co librosa (w tolerancji)'''
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'Bearing_1': rng.normal(0, 0.1, 20480)})
+
+    result = compute_melspec(df, backend='numpy')
+
+    assert result.shape == (128, 161)
+    np.testing.assert_allclose(result, compute_melspec(df), atol=MELSPEC_DB_TOLERANCE)
+
+
+#*--- Test 13 ---
+def test_data_loader_import_is_light():
+    '''Sprawdza czy import data_loader nie ładuje librosa, sklearn ani matplotlib'''
+    import subprocess
+    import sys
+    code = ("import sys, src.data_loader; "
+            "print(any(m in sys.modules for m in ('librosa.core', 'sklearn', 'matplotlib')))")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+
+    assert out.decode().strip() == 'False'
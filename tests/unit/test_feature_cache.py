@@ -0,0 +1,86 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.feature_cache import (build_feature_cache, cached_features, cache_key,
+                               extract_features, feature_params_from_config,
+                               DEFAULT_FEATURE_PARAMS)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    '''Katalog z trzema małymi plikami w formacie IMS'''
+    directory = tmp_path / 'raw'
+    directory.mkdir()
+    rng = np.random.default_rng(0)
+    for name in ('2004.02.12.10.32.39', '2004.02.12.10.42.39', '2004.02.12.10.52.39'):
+        np.savetxt(directory / name, rng.normal(0, 0.1, (4096, 4)), delimiter='\t', fmt='%.5f')
+    return directory
+
+
+#*--- Test 1 ---
+def test_build_feature_cache_hits_on_second_run(data_dir, tmp_path):
+    '''Sprawdza czy drugie uruchomienie korzysta wyłącznie z cache'''
+    cache_dir = str(tmp_path / 'features')
+    params = dict(DEFAULT_FEATURE_PARAMS)
+
+    paths, stats = build_feature_cache(str(data_dir), cache_dir, params, workers=2)
+    assert stats['misses'] == 3 and stats['hits'] == 0
+    assert all(os.path.exists(p) for p in paths)
+
+    _, stats = build_feature_cache(str(data_dir), cache_dir, params, workers=2)
+    assert stats['hits'] == 3 and stats['misses'] == 0
+
+
+#*--- Test 2 ---
+def test_cached_features_are_normalized_spectrograms(data_dir, tmp_path):
+    '''Sprawdza czy w cache jest znormalizowany spektrogram (128, T) w zakresie [0, 1]'''
+    params = dict(DEFAULT_FEATURE_PARAMS)
+    file_path = str(data_dir / '2004.02.12.10.32.39')
+
+    result = cached_features(file_path, params, str(tmp_path / 'features'))
+
+    assert result.shape == (128, 33)
+    assert result.dtype == np.float32
+    assert result.min() >= 0 and result.max() <= 1
+    np.testing.assert_allclose(result, extract_features(file_path, params))
+
+
+#*--- Test 3 ---
+def test_cache_is_content_addressed(data_dir, tmp_path):
+    '''Sprawdza czy kopia tego samego pliku pod inną nazwą trafia w cache'''
+    params = dict(DEFAULT_FEATURE_PARAMS)
+    cache_dir = str(tmp_path / 'features')
+    cached_features(str(data_dir / '2004.02.12.10.32.39'), params, cache_dir)
+
+    copy_path = tmp_path / 'copy_of_file'
+    shutil.copy(data_dir / '2004.02.12.10.32.39', copy_path)
+
+    with patch('src.feature_cache.extract_features') as mock_extract:
+        cached_features(str(copy_path), params, cache_dir)
+        mock_extract.assert_not_called()
+
+
+#*--- Test 4 ---
+def test_cache_key_depends_on_params():
+    '''Sprawdza czy zmiana parametrów (np. norm_min) zmienia klucz cache'''
+    params = dict(DEFAULT_FEATURE_PARAMS)
+    changed = dict(params, norm_min=-60.0)
+
+    assert cache_key('abc', params) == cache_key('abc', dict(params))
+    assert cache_key('abc', params) != cache_key('abc', changed)
+    assert cache_key('abc', params) != cache_key('abd', params)
+
+
+#*--- Test 5 ---
+def test_feature_params_from_config(tmp_path):
+    '''Sprawdza czy parametry normalizacji są czytane z model_config.json'''
+    config_path = tmp_path / 'model_config.json'
+    config_path.write_text('{"threshold": 0.1, "norm_min": -60.0, "norm_max": 0.0}')
+
+    params = feature_params_from_config(str(config_path))
+
+    assert params['norm_min'] == -60.0
+    assert params['n_mels'] == 128
+    assert 'threshold' not in params
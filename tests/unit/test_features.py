@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import librosa
+from src.features import (melspec_plan, melspectrogram_batch, power_to_db_batch, melspectrogram,
+                          power_to_db, mel_filterbank, MELSPEC_DB_TOLERANCE)
+
+
+def _test_signals(n_channels=4, n_samples=4096):
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples) / 20000
+    return np.stack([np.sin(2 * np.pi * 250 * (i + 1) * t) + rng.normal(0, 0.1, n_samples)
+                     for i in range(n_channels)]).astype(np.float32)
+
+
+#*--- Test 1 ---
+def test_melspectrogram_batch_shape():
+    '''Sprawdza kształt wyniku (kanały, 128, T) i typ float32'''
+    result = melspectrogram_batch(_test_signals())
+
+    # 1 + 4096 // 128 = 33 ramki
+    assert result.shape == (4, 128, 33)
+    assert result.dtype == np.float32
+
+
+#*--- Test 2 ---
+def test_melspectrogram_batch_matches_librosa():
+    '''Sprawdza zgodność każdego kanału z librosa.feature.melspectrogram'''
+    signals = _test_signals()
+    result = melspectrogram_batch(signals)
+
+    for channel, signal in enumerate(signals):
+        expected = librosa.feature.melspectrogram(
+            y=signal, sr=20000, n_mels=128, fmax=10000, hop_length=128)
+        np.testing.assert_allclose(result[channel], expected, rtol=1e-3, atol=1e-6)
+
+
+#*--- Test 3 ---
+def test_power_to_db_batch_matches_librosa():
+    '''Sprawdza czy każdy kanał ma własną referencję (ref=np.max)'''
+    melspec = melspectrogram_batch(_test_signals())
+    melspec[1] *= 100
+
+    result = power_to_db_batch(melspec)
+
+    for channel in range(melspec.shape[0]):
+        expected = librosa.power_to_db(melspec[channel], ref=np.max)
+        np.testing.assert_allclose(result[channel], expected, atol=1e-3)
+
+
+#*--- Test 4 ---
+def test_melspec_plan_is_cached():
+    '''Sprawdza czy filtry mel i okno są budowane tylko raz dla tych samych parametrów'''
+    first = melspec_plan(20000, 2048, 128, 10000, 128)
+    second = melspec_plan(20000, 2048, 128, 10000, 128)
+
+    assert first[0] is second[0]
+    assert first[1] is second[1]
+    with pytest.raises(ValueError):
+        first[1][0, 0] = 1.0
+
+
+#*--- Test 5 ---
+def test_melspectrogram_batch_single_channel():
+    '''Sprawdza czy sygnał 1D jest traktowany jako jeden kanał'''
+    result = melspectrogram_batch(_test_signals(1)[0])
+    assert result.shape == (1, 128, 33)
+
+
+#*--- Test 6 ---
+def test_mel_filterbank_matches_librosa():
+    '''Sprawdza czy filtry mel w NumPy są takie same jak librosa.filters.mel'''
+    expected = librosa.filters.mel(sr=20000, n_fft=2048, n_mels=128, fmax=10000)
+    np.testing.assert_allclose(mel_filterbank(), expected, atol=1e-7)
+
+
+#*--- Test 7 ---
+def test_numpy_path_matches_librosa_db():
+    '''Sprawdza czy pełna ścieżka (mel + dB) mieści się w zadeklarowanej tolerancji'''
+    signal = _test_signals(1, 20480)[0]
+    expected = librosa.power_to_db(librosa.feature.melspectrogram(
+        y=signal, sr=20000, n_mels=128, fmax=10000, hop_length=128), ref=np.max)
+
+    result = power_to_db(melspectrogram(signal))
+
+    assert result.shape == (128, 161)
+    assert np.max(np.abs(result - expected)) <= MELSPEC_DB_TOLERANCE
@@ -0,0 +1,130 @@
+import pytest
+from botocore.exceptions import ClientError
+from src.idempotency import IdempotencyGuard, idempotency_key, COMPLETED
+
+
+def record(key='a.npy', etag=None, version=None):
+    obj = {'key': key}
+    if etag:
+        obj['eTag'] = etag
+    if version:
+        obj['versionId'] = version
+    return {'s3': {'bucket': {'name': 'b'}, 'object': obj}}
+
+
+def conditional_check_failed(operation):
+    return ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, operation)
+
+
+class ProcessedTable:
+    '''Tabela kluczy w pamięci z warunkami claim/complete/release jak w DynamoDB'''
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None):
+        current = self.items.get(Item['idempotency_key'])
+        values = ExpressionAttributeValues or {}
+        if ':owner' in values:
+            # complete: tylko właściciel dzierżawy
+            if current is None or current.get('owner') != values[':owner']:
+                raise conditional_check_failed('PutItem')
+        elif ConditionExpression and current is not None and not (
+                current['status'] == values[':in_progress']
+                and current['lease_until'] < values[':now']):
+            raise conditional_check_failed('PutItem')
+        self.items[Item['idempotency_key']] = Item
+
+    def delete_item(self, Key, ConditionExpression, ExpressionAttributeNames,
+                    ExpressionAttributeValues):
+        current = self.items.get(Key['idempotency_key'])
+        if (current is None or current['status'] != ExpressionAttributeValues[':in_progress']
+                or current.get('owner') != ExpressionAttributeValues[':owner']):
+            raise conditional_check_failed('DeleteItem')
+        del self.items[Key['idempotency_key']]
+
+
+#*--- Test 1 ---
+def test_idempotency_key():
+    '''Sprawdza klucz wersji obiektu: versionId, potem ETag, bez nich brak klucza'''
+    assert idempotency_key(record(etag='"abc"')) == 'b/a.npy#"abc"'
+    assert idempotency_key(record(etag='"abc"', version='v7')) == 'b/a.npy#v7'
+    assert idempotency_key(record()) is None
+
+
+#*--- Test 2 ---
+def test_lru_short_circuit():
+    '''Sprawdza czy ukończony klucz jest pomijany z LRU i czy LRU ma ograniczony rozmiar'''
+    guard = IdempotencyGuard(cache_size=2)
+
+    assert guard.claim('k1') is True
+    guard.complete(['k1'])
+    assert guard.claim('k1') is False
+    assert guard.claim(None) is True
+
+    guard.complete(['k2', 'k3'])
+    assert guard.claim('k1') is True
+    assert guard.stats == {'lru_hits': 1, 'table_hits': 0, 'misses': 2, 'unkeyed': 1,
+                           'lost_claims': 0}
+
+
+#*--- Test 3 ---
+def test_table_claim_across_containers():
+    '''Sprawdza warunkowy zapis: duplikat w innym kontenerze, zwolnienie i wygasła dzierżawa'''
+    table = ProcessedTable()
+    first, second = IdempotencyGuard(table), IdempotencyGuard(table)
+
+    assert first.claim('k1') is True
+    # przetwarzany równolegle -> drugi kontener pomija
+    assert second.claim('k1') is False
+    first.complete(['k1'])
+    assert table.items['k1']['status'] == COMPLETED
+    assert second.claim('k1') is False
+    assert second.stats['table_hits'] == 2
+
+    # błąd przetwarzania -> klucz zwolniony, ponowienie przechodzi
+    assert first.claim('k2') is True
+    first.release('k2')
+    assert second.claim('k2') is True
+
+    # porzucona dzierżawa (np. timeout) wygasa
+    expired = IdempotencyGuard(table, lease_seconds=-1)
+    assert expired.claim('k3') is True
+    assert second.claim('k3') is True
+
+
+#*--- Test 4 ---
+def test_claim_lease_per_call():
+    '''Sprawdza czy dzierżawa podana przy claim (pozostały czas wywołania) zastępuje domyślną'''
+    table = ProcessedTable()
+    guard = IdempotencyGuard(table)
+
+    assert guard.claim('k1', lease_seconds=40) is True
+    assert guard.claim('k2') is True
+    assert table.items['k1']['lease_until'] - table.items['k1']['expires_at'] == 40 - guard.ttl_seconds
+    assert table.items['k2']['lease_until'] - table.items['k2']['expires_at'] == (
+        guard.lease_seconds - guard.ttl_seconds)
+    # krótsza niż najbliższe ponowienie zdarzenia przez Lambdę (~60 s)
+    assert guard.lease_seconds < 90
+
+
+#*--- Test 5 ---
+def test_only_owner_completes_or_releases_claim():
+    '''Sprawdza czy wywołanie z wygasłą dzierżawą nie zwalnia ani nie kończy klucza następcy'''
+    table = ProcessedTable()
+    guard = IdempotencyGuard(table)
+
+    assert guard.claim('k1', lease_seconds=-1, owner='req-a') is True
+    # dzierżawa A wygasła, klucz przejmuje B
+    assert guard.claim('k1', owner='req-b') is True
+    assert table.items['k1']['owner'] == 'req-b'
+
+    guard.release('k1', owner='req-a')
+    guard.complete(['k1'], owner='req-a')
+    assert table.items['k1']['status'] != COMPLETED and table.items['k1']['owner'] == 'req-b'
+    assert guard.stats['lost_claims'] == 2
+    # duplikat nie przejmuje klucza B, który B potem kończy
+    assert IdempotencyGuard(table).claim('k1', owner='req-c') is False
+    guard.complete(['k1'], owner='req-b')
+    assert table.items['k1']['status'] == COMPLETED
@@ -1,4 +1,5 @@
 import pytest
+import io
 import json
 import numpy as np
 import os
@@ -6,14 +7,45 @@ from unittest.mock import MagicMock, patch
 import cloud.lambda_handler as lh
 from cloud.lambda_handler import lambda_handler
 
+
+def serve_objects(mock_s3, objects):
+    '''Podstawia obiekty S3 pod get_object/head_object.
+    objects: słownik klucz -> bytes/tablica numpy albo jeden obiekt dla każdego klucza'''
+    def to_bytes(obj):
+        if isinstance(obj, np.ndarray):
+            buffer = io.BytesIO()
+            np.save(buffer, obj)
+            return buffer.getvalue()
+        if isinstance(obj, Exception):
+            raise obj
+        return obj
+
+    def lookup(key):
+        return to_bytes(objects[key] if isinstance(objects, dict) else objects)
+
+    def get_object(Bucket, Key, Range=None):
+        data = lookup(Key)
+        if Range:
+            start, end = map(int, Range.replace('bytes=', '').split('-'))
+            data = data[start:end + 1]
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.head_object.side_effect = lambda Bucket, Key: {'ContentLength': len(lookup(Key))}
+
+def failed_invocation(event):
+    '''Wywołanie z nieudanym rekordem: wyjątek (ponowienie przez Lambdę) z raportem'''
+    with pytest.raises(lh.RecordsFailedError) as failure:
+        lambda_handler(event, None)
+    return failure.value.response
+
 #* ---Test 1: HEALTY ---
 
-@patch('cloud.lambda_handler.create_windows')
 @patch('cloud.lambda_handler.s3')
 @patch('cloud.lambda_handler.table')
 @patch('cloud.lambda_handler.ort')
 @patch('cloud.lambda_handler.os.path.exists')
-def test_lambda_healthy_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_create_windows):
+def test_lambda_healthy_flow(mock_exists, mock_ort, mock_table, mock_s3):
     '''Sprawdza czy Lambda zwróci HEALTHY'''
     def check_file_exists(path):
         if 'bearing_model.onnx' in str(path):
@@ -26,10 +58,8 @@ def test_lambda_healthy_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
     mock_ort.InferenceSession.return_value = mock_session
 
     fake_input = np.zeros((128, 100), dtype=np.float32)
-    processed_batch = np.zeros((5, 128, 64, 1), dtype=np.float32)
-
-    mock_create_windows.return_value = processed_batch
-    mock_session.run.return_value = [processed_batch]
+    # Rekonstrukcja idealna (zera) o kształcie podanego micro-batcha
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
 
     mock_session.get_inputs.return_value = [MagicMock(name='input_node')]
     mock_session.get_outputs.return_value = [MagicMock(name='output_node')]
@@ -38,12 +68,12 @@ def test_lambda_healthy_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
     lh.threshold = None
 
 
-    with patch('numpy.load', return_value=fake_input):
-        event = {
-            'Records': [{'s3': {'bucket': {'name': 'test-bucket'}, 'object': {'key': 'bearing_ok.npy'}}}]
-        }
+    serve_objects(mock_s3, fake_input)
+    event = {
+        'Records': [{'s3': {'bucket': {'name': 'test-bucket'}, 'object': {'key': 'bearing_ok.npy'}}}]
+    }
 
-        response = lambda_handler(event, None)
+    response = lambda_handler(event, None)
 
     body = json.loads(response['body'])
 
@@ -52,18 +82,17 @@ def test_lambda_healthy_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
     assert body['mse'] < 0.002
 
 
-    mock_create_windows.assert_called_once()
+    mock_session.run.assert_called_once()
     mock_table.put_item.assert_called_once()
 
 
 #* --- Test 2: Anomaly ---
 
-@patch('cloud.lambda_handler.create_windows')
 @patch('cloud.lambda_handler.s3')
 @patch('cloud.lambda_handler.table')
 @patch('cloud.lambda_handler.ort')
 @patch('cloud.lambda_handler.os.path.exists')
-def test_lambda_anomaly_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_create_windows):
+def test_lambda_anomaly_flow(mock_exists, mock_ort, mock_table, mock_s3):
     '''Sprawdza czy Lambda poprawnie wykrywa anomalię (duże MSE)'''
     def check_file_exists(path):
         if 'bearing_model.onnx' in str(path):
@@ -75,11 +104,7 @@ def test_lambda_anomaly_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
     mock_ort.InferenceSession.return_value = mock_session
 
     fake_input = np.zeros((128, 100), dtype=np.float32)
-    processed_batch = np.zeros((5, 128, 64, 1), dtype=np.float32)
-    reconstruction = np.ones((5, 128, 64, 1), dtype=np.float32)
-
-    mock_create_windows.return_value = processed_batch
-    mock_session.run.return_value = [reconstruction]
+    mock_session.run.side_effect = lambda outputs, feed: [np.ones_like(list(feed.values())[0])]
 
     mock_session.get_inputs.return_value = [MagicMock(name='input_node')]
     mock_session.get_outputs.return_value = [MagicMock(name='output_node')]
@@ -88,11 +113,11 @@ def test_lambda_anomaly_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
     lh.threshold = None
 
 
-    with patch('numpy.load', return_value=fake_input):
-        event = {
-            'Records': [{'s3': {'bucket': {'name': 'test-bucket'}, 'object': {'key': 'bearing_fault.npy'}}}]
-        }
-        response = lambda_handler(event, None)
+    serve_objects(mock_s3, fake_input)
+    event = {
+        'Records': [{'s3': {'bucket': {'name': 'test-bucket'}, 'object': {'key': 'bearing_fault.npy'}}}]
+    }
+    response = lambda_handler(event, None)
 
     body = json.loads(response['body'])
 
@@ -105,14 +130,13 @@ def test_lambda_anomaly_flow(mock_exists, mock_ort, mock_table, mock_s3, mock_cr
 
 # * --- Test 3: Inny Threshold ---
 
-@patch('cloud.lambda_handler.create_windows')
 @patch('cloud.lambda_handler.s3')
 @patch('cloud.lambda_handler.table')
 @patch('cloud.lambda_handler.ort')
 @patch('cloud.lambda_handler.os.path.exists')
 @patch('builtins.open', new_callable=MagicMock)
 @patch('json.load')
-def test_lambda_custom_config(mock_json_load, mock_open, mock_exists, mock_ort, mock_table, mock_s3, mock_create_windows):
+def test_lambda_custom_config(mock_json_load, mock_open, mock_exists, mock_ort, mock_table, mock_s3):
     '''Sprawdza czy Lambda ładuje próg z pliku config'''
     mock_exists.return_value = True
     mock_json_load.return_value = {'threshold': 0.5}
@@ -120,11 +144,7 @@ def test_lambda_custom_config(mock_json_load, mock_open, mock_exists, mock_ort,
     mock_session = MagicMock()
     mock_ort.InferenceSession.return_value = mock_session
 
-    processed_batch = np.zeros((1, 128, 64, 1), dtype=np.float32)
-    reconstruction = np.full((1, 128, 64, 1), 0.1, dtype=np.float32)  
-
-    mock_create_windows.return_value = processed_batch
-    mock_session.run.return_value = [reconstruction]
+    mock_session.run.side_effect = lambda outputs, feed: [np.full_like(list(feed.values())[0], 0.1)]
 
     mock_session.get_inputs.return_value = [MagicMock(name='input')]
     mock_session.get_outputs.return_value = [MagicMock(name='output')]
@@ -132,10 +152,10 @@ def test_lambda_custom_config(mock_json_load, mock_open, mock_exists, mock_ort,
     lh.session = None
     lh.threshold = None
 
-    with patch('numpy.load', return_value=np.zeros((128, 100))):
-        event = {'Records': [
-            {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
-        response = lambda_handler(event, None)
+    serve_objects(mock_s3, np.zeros((128, 100)))
+    event = {'Records': [
+        {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
+    response = lambda_handler(event, None)
 
     body = json.loads(response['body'])
 
@@ -153,7 +173,7 @@ def test_lambda_missing_model(mock_exists):
 
     event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
 
-    response = lambda_handler(event, None)
+    response = failed_invocation(event)
 
     assert response['statusCode'] == 500
     assert "Init Error" in response['body']
@@ -166,30 +186,30 @@ def test_lambda_missing_model(mock_exists):
 @patch('cloud.lambda_handler.s3')
 def test_lambda_s3_error(mock_s3, mock_exists, mock_ort):
     '''Sprawdza zachowanie gdy S3 rzuci błąd przy pobieraniu'''
-    mock_exists.return_value = True
+    # model jest, konfiguracji brak (wartości domyślne)
+    mock_exists.side_effect = lambda path: 'model_config' not in str(path)
     mock_ort.InferenceSession.return_value = MagicMock()
 
-    mock_s3.download_file.side_effect = Exception("Access Denied")
+    mock_s3.get_object.side_effect = Exception("Access Denied")
 
     lh.session = None
 
     event = {'Records': [
         {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
 
-    response = lambda_handler(event, None)
+    response = failed_invocation(event)
     
     assert response['statusCode'] == 500
     assert "Access Denied" in response['body']
 
 
 # * --- Test 6: Błąd DynamoDB (Zapis nieudany) ---
-@patch('cloud.lambda_handler.create_windows')
 @patch('cloud.lambda_handler.s3')
 @patch('cloud.lambda_handler.table')
 @patch('cloud.lambda_handler.ort')
 @patch('cloud.lambda_handler.os.path.exists')
-def test_lambda_db_failure(mock_exists, mock_ort, mock_table, mock_s3, mock_create_windows):
-    '''Sprawdza czy Lambda zwraca 200 nawet jeśli zapis do bazy się nie uda'''
+def test_lambda_db_failure(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy nieudany zapis do bazy kończy rekord błędem (do ponowienia)'''
     def check_file_exists(path):
         if 'bearing_model.onnx' in str(path):
             return True
@@ -200,9 +220,7 @@ def test_lambda_db_failure(mock_exists, mock_ort, mock_table, mock_s3, mock_crea
     mock_ort.InferenceSession.return_value = mock_session
 
     fake_input = np.zeros((128, 100), dtype=np.float32)
-    processed_batch = np.zeros((5, 128, 64, 1), dtype=np.float32)
-    mock_create_windows.return_value = processed_batch
-    mock_session.run.return_value = [processed_batch]
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
     mock_session.get_inputs.return_value = [MagicMock()]
     mock_session.get_outputs.return_value = [MagicMock()]
 
@@ -211,13 +229,634 @@ def test_lambda_db_failure(mock_exists, mock_ort, mock_table, mock_s3, mock_crea
     lh.session = None
     lh.threshold = None
 
-    with patch('numpy.load', return_value=fake_input):
-        event = {'Records': [
-            {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
+    serve_objects(mock_s3, fake_input)
+    event = {'Records': [
+        {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'k'}}}]}
+    response = failed_invocation(event)
+
+    assert response['statusCode'] == 500
+    assert "DynamoDB Timeout" in response['body']
+
+    mock_table.put_item.assert_called_once()
+
+
+# * --- Test 7: Skompresowany format uplinku (.egq) ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_quantized_upload(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy Lambda dekoduje plik .egq (uint8) i poprawnie zapisuje timestamp'''
+    from src.codec import encode_spectrogram
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    spectrogram = np.full((128, 100), 0.5, dtype=np.float32)
+    payload = encode_spectrogram(spectrogram, dtype='uint8')
+
+    serve_objects(mock_s3, payload)
+
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [list(feed.values())[0]]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': '2004.02.12.10.32.39.egq'}}}]}
+    response = lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    batch = mock_session.run.call_args[0][1]
+    fed = list(batch.values())[0]
+    assert fed.shape == (2, 128, 64, 1)
+    np.testing.assert_allclose(fed, 128 / 255, atol=1e-6)
+
+    item = mock_table.put_item.call_args[1]['Item']
+    assert item['timestamp'] == '2004-02-12-10-32-39'
+
+
+# * --- Test 8: Paczka wielu snapshotów (.bundle.npz) ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_bundle_single_inference(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy paczka jest oceniana jednym session.run i daje wynik na snapshot'''
+    from src.codec import encode_bundle
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    snapshots = [np.full((128, 100), 0.2, dtype=np.float32),
+                 np.full((128, 161), 0.8, dtype=np.float32),
+                 np.full((128, 64), 0.4, dtype=np.float32)]
+    manifest = [{'timestamp': f'2004.02.12.10.{i}2.39', 'device_id': 'rig_7'} for i in range(3)]
+    payload = encode_bundle(snapshots, manifest)
+
+    serve_objects(mock_s3, payload)
+
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    # Rekonstrukcja = same zera -> MSE okna = kwadrat wartości
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': 'rig_7_2004.02.12.10.02.39_3.bundle.npz'}}}]}
+    response = lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    mock_session.run.assert_called_once()
+    fed = list(mock_session.run.call_args[0][1].values())[0]
+    # 2 + 4 + 1 okien
+    assert fed.shape[0] == 7
+
+    body = json.loads(response['body'])
+    assert body['snapshots'] == 3
+    assert [r['windows_count'] for r in body['results']] == [2, 4, 1]
+    np.testing.assert_allclose([r['mse'] for r in body['results']], [0.04, 0.64, 0.16], atol=0.01)
+
+    # Wiele wyników -> jeden batch_writer zamiast put_item na snapshot
+    writer = mock_table.batch_writer.return_value.__enter__.return_value
+    assert writer.put_item.call_count == 3
+    mock_table.put_item.assert_not_called()
+    items = [call[1]['Item'] for call in writer.put_item.call_args_list]
+    assert items[1]['timestamp'] == '2004-02-12-10-12-39'
+    assert all(item['device_id'] == 'rig_7' for item in items)
+    # schemat v2: liczby jako Decimal (typ N w DynamoDB)
+    assert float(items[1]['mse_value']) == pytest.approx(0.64, abs=0.01)
+    assert type(items[1]['mse_value']).__name__ == 'Decimal'
+    assert items[1]['windows_processed'] == 4
+    assert items[1]['schema_version'] == 2
+    # profil błędu: 4 okna po 0.64 i 128 pasm mel
+    from src.result_schema import decode_profile
+    np.testing.assert_allclose(decode_profile(items[1]['window_mse']), [0.64] * 4, rtol=1e-3)
+    np.testing.assert_allclose(decode_profile(items[1]['band_error']), 0.64, rtol=1e-3)
+    assert items[1]['mse_argmax'] == 0
+
+
+# * --- Test 9: Wynik policzony na urządzeniu (.result.json) ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_edge_result_no_inference(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy wynik z edge trafia do DynamoDB bez pobierania spektrogramu i inferencji'''
+    import io
+    from src.codec import encode_result
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+
+    record = {'timestamp': '2004.02.12.10.32.39', 'device_id': 'rig_3', 'mse': 0.0042,
+              'max_window_mse': 0.006, 'status': 'ANOMALY_DETECTED',
+              'threshold': 0.0015, 'windows': 4}
+    mock_s3.get_object.return_value = {'Body': io.BytesIO(encode_result(record))}
+
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': '2004.02.12.10.32.39.result.json'}}}]}
+    response = lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['status'] == 'ANOMALY_DETECTED'
+    assert body['scored_on'] == 'edge'
+
+    mock_session.run.assert_not_called()
+    mock_s3.head_object.assert_not_called()
+    item = mock_table.put_item.call_args[1]['Item']
+    assert item['device_id'] == 'rig_3'
+    assert item['timestamp'] == '2004-02-12-10-32-39'
+    assert item['scored_on'] == 'edge'
+
+
+# * --- Test 10: Długi spektrogram w micro-batchach ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_long_spectrogram_micro_batches(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy długi spektrogram jest oceniany w micro-batchach o stałym rozmiarze'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    fed_sizes = []
+
+    def fake_run(outputs, feed):
+        batch = list(feed.values())[0]
+        fed_sizes.append(batch.shape[0])
+        return [np.zeros_like(batch)]
+    mock_session.run.side_effect = fake_run
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+
+    lh.session = None
+    lh.threshold = None
+
+    # 64 + 69 * 32 kolumn = 70 okien
+    serve_objects(mock_s3, np.full((128, 64 + 69 * 32), 0.1, dtype=np.float32))
+    with patch('cloud.lambda_handler.MICRO_BATCH_SIZE', '32'):
+        event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'long.npy'}}}]}
         response = lambda_handler(event, None)
 
     assert response['statusCode'] == 200
+    assert fed_sizes == [32, 32, 6]
     body = json.loads(response['body'])
-    assert body['status'] == 'HEALTHY'
+    assert body['windows_count'] == 70
+    assert body['mse'] == pytest.approx(0.01, rel=1e-4)
 
-    mock_table.put_item.assert_called_once()
+
+# * --- Test 11: Wiele rekordów w jednym zdarzeniu ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_multiple_records(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy wszystkie rekordy są oceniane razem, a błąd jednego nie psuje pozostałych'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+
+    serve_objects(mock_s3, {'2004.02.12.10.32.39.npy': np.full((128, 100), 0.1, dtype=np.float32),
+                            'missing.npy': Exception("NoSuchKey"),
+                            '2004.02.12.10.42.39.npy': np.full((128, 161), 0.3, dtype=np.float32)})
+
+    lh.session = None
+    lh.threshold = None
+
+    keys = ['2004.02.12.10.32.39.npy', 'missing.npy', '2004.02.12.10.42.39.npy']
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': k}}} for k in keys]}
+    response = failed_invocation(event)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['processed'] == 2 and body['failed'] == 1
+    assert [r['file'] for r in body['records']] == keys
+    assert 'NoSuchKey' in body['records'][1]['error']
+    assert body['records'][0]['windows_count'] == 2
+    assert body['records'][2]['windows_count'] == 4
+    assert body['records'][2]['mse'] == pytest.approx(0.09, rel=1e-4)
+
+    # 2 + 4 okien w jednym przebiegu oceny
+    mock_session.run.assert_called_once()
+    assert list(mock_session.run.call_args[0][1].values())[0].shape[0] == 6
+
+    writer = mock_table.batch_writer.return_value.__enter__.return_value
+    assert writer.put_item.call_count == 2
+
+
+# * --- Test 12: Wszystkie rekordy nieudane ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_all_records_failed(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy Lambda zwraca 500, gdy żaden rekord nie został przetworzony'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_ort.InferenceSession.return_value = MagicMock()
+    mock_s3.get_object.side_effect = Exception("Access Denied")
+
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': k}}}
+                         for k in ('a.npy', 'b.npy')]}
+    response = failed_invocation(event)
+
+    assert response['statusCode'] == 500
+    body = json.loads(response['body'])
+    assert body['failed'] == 2
+    mock_table.put_item.assert_not_called()
+    mock_table.batch_writer.assert_not_called()
+
+
+# * --- Test 13: Duża paczka czytana zakresami (Range GET) ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_large_bundle_ranged_get(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy paczka powyżej progu jest czytana zakresami, bez pobierania całości'''
+    from src.codec import encode_bundle
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+
+    snapshots = [np.full((128, 161), 0.1 * (i + 1), dtype=np.float32) for i in range(3)]
+    manifest = [{'timestamp': f'2004.02.12.10.{i}2.39'} for i in range(3)]
+    serve_objects(mock_s3, encode_bundle(snapshots, manifest))
+
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': 'rig_2004.02.12.10.02.39_3.bundle.npz'}}}]}
+    with patch('cloud.lambda_handler.RANGE_THRESHOLD', 0):
+        response = lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    np.testing.assert_allclose([r['mse'] for r in body['results']], [0.01, 0.04, 0.09], rtol=0.05)
+    assert all('Range' in call[1] for call in mock_s3.get_object.call_args_list)
+
+
+# * --- Test 14: Zoptymalizowany model z builda ---
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_prefers_optimized_artifact(mock_exists, mock_ort):
+    '''Sprawdza czy Lambda ładuje *.opt.onnx z jawnymi opcjami sesji'''
+    import onnxruntime
+    mock_exists.return_value = True
+
+    lh.session = None
+    lh.threshold = 0.002
+    with patch('cloud.lambda_handler.ORT_ARTIFACT_LEVEL', 'all'):
+        lh._create_session('bearing_model.onnx')
+
+    args, kwargs = mock_ort.InferenceSession.call_args
+    assert args[0] == 'bearing_model.opt.onnx'
+    assert kwargs['providers'] == ['CPUExecutionProvider']
+    # artefakt 'all' jest już w pełni zoptymalizowany
+    assert (kwargs['sess_options'].graph_optimization_level
+            == onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL)
+
+
+# * --- Test 15: Wariant modelu z configu ---
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_model_variant_fallback(mock_exists):
+    '''Sprawdza wybór wariantu modelu i powrót do fp32 gdy pliku brak'''
+    config = {'model_variant': 'int8_static'}
+
+    mock_exists.return_value = True
+    assert lh._model_path('bearing_model.onnx', config) == 'bearing_model.int8_static.onnx'
+    mock_exists.return_value = False
+    assert lh._model_path('bearing_model.onnx', config) == 'bearing_model.onnx'
+    assert lh._model_path('bearing_model.onnx', {}) == 'bearing_model.onnx'
+
+
+# * --- Test 16: Inicjalizacja w fazie init ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_eager_init_with_warmup(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy model ładowany przy imporcie (z rozgrzewką) nie jest ładowany ponownie w żądaniu'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock(name='input_node')]
+    mock_session.get_outputs.return_value = [MagicMock(name='output_node')]
+
+    lh.session = None
+    lh.threshold = None
+    lh._initialize(warm_up=True)
+
+    # rozgrzewka: jeden micro-batch zer o rozmiarze produkcyjnym
+    warmup_batch = list(mock_session.run.call_args[0][1].values())[0]
+    assert warmup_batch.shape == (lh.scorer.batch_size, 128, 64, 1)
+    assert {'session', 'warmup', 'total'} <= set(lh.init_metrics)
+    assert lh.scorer.windows == 0
+
+    serve_objects(mock_s3, np.zeros((128, 100), dtype=np.float32))
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'ok.npy'}}}]}
+    response = lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    mock_ort.InferenceSession.assert_called_once()
+    assert mock_session.run.call_count == 2
+    # metryki init raportowane raz, przy pierwszym wywołaniu
+    assert lh.init_metrics == {}
+
+
+# * --- Test 17: Duplikat zdarzenia S3 ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_duplicate_event_short_circuit(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy powtórzone zdarzenie (ten sam ETag) nie pobiera ani nie ocenia pliku'''
+    from src.idempotency import IdempotencyGuard
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+    lh.session = None
+    lh.threshold = None
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': 'a.npy', 'eTag': '"e1"'}}}]}
+    with patch('cloud.lambda_handler.guard', IdempotencyGuard()) as guard:
+        mock_s3.get_object.side_effect = Exception("Access Denied")
+        assert failed_invocation(event)['statusCode'] == 500
+
+        # błąd nie blokuje ponowienia
+        serve_objects(mock_s3, np.zeros((128, 100), dtype=np.float32))
+        assert json.loads(lambda_handler(event, None)['body'])['status'] == 'HEALTHY'
+
+        response = lambda_handler(event, None)
+        assert response['statusCode'] == 200
+        assert json.loads(response['body']) == {'file': 'a.npy', 'duplicate': True}
+        assert mock_s3.get_object.call_count == 2
+        mock_session.run.assert_called_once()
+        mock_table.put_item.assert_called_once()
+        assert guard.stats['lru_hits'] == 1
+
+
+# * --- Test 18: Rejestr modeli per urządzenie ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+def test_lambda_device_registry(mock_ort, mock_table, mock_s3, tmp_path):
+    '''Sprawdza czy urządzenie z prefiksu klucza dostaje własny model i próg (sesja z cache)'''
+    from src.model_registry import ModelRegistry, SessionCache
+
+    def make_session(reconstruction):
+        session = MagicMock()
+        session.run.side_effect = lambda outputs, feed: [reconstruction(list(feed.values())[0])]
+        session.get_inputs.return_value = [MagicMock()]
+        session.get_outputs.return_value = [MagicMock()]
+        return session
+
+    # model domyślny rekonstruuje idealnie, model rig_7 zwraca zera
+    default_session = make_session(np.copy)
+    rig_session = make_session(np.zeros_like)
+    mock_ort.InferenceSession.return_value = rig_session
+    model_file = tmp_path / 'rig_7.onnx'
+    model_file.write_bytes(b'\0' * 1024)
+
+    lh.session, lh.threshold = default_session, 0.5
+    lh.scorer = lh.MicroBatchScorer(default_session, 8)
+    lh.registry = ModelRegistry(
+        {'devices': {'rig_7': {'model': str(model_file), 'threshold': 0.01}}},
+        lh._load_device_model, cache=SessionCache())
+    serve_objects(mock_s3, np.full((128, 100), 0.5, dtype=np.float32))
+    event = {'Records': [
+        {'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'rig_7/2004.02.12.10.32.39.npy'}}},
+        {'s3': {'bucket': {'name': 'b'}, 'object': {'key': '2004.02.12.10.42.39.npy'}}}]}
+
+    try:
+        for _ in range(2):
+            assert lambda_handler(event, None)['statusCode'] == 200
+    finally:
+        lh.registry = None
+
+    writer = mock_table.batch_writer.return_value.__enter__.return_value
+    items = {c.kwargs['Item']['device_id']: c.kwargs['Item'] for c in writer.put_item.call_args_list}
+    assert items['rig_7']['status'] == 'ANOMALY_DETECTED'
+    assert float(items['rig_7']['threshold']) == 0.01
+    assert items['test_rig_1']['status'] == 'HEALTHY'
+    assert float(items['test_rig_1']['threshold']) == 0.5
+    # sesja rig_7 wczytana raz, drugie zdarzenie trafia w cache
+    mock_ort.InferenceSession.assert_called_once()
+    assert mock_ort.InferenceSession.call_args[0][0] == str(model_file)
+
+
+# * --- Test 19: Przeładowanie modelu z S3 bez redeployu ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+def test_lambda_hot_reload_from_manifest(mock_ort, mock_table, mock_s3, tmp_path):
+    '''Sprawdza czy nowy manifest podmienia sesję i próg, a wyniki niosą wersję modelu'''
+    published = {}
+
+    def publish(version, threshold, **extra):
+        published['default/current.json'] = json.dumps({
+            'version': version,
+            'model': f"s3://models/default/{version}/bearing_model.onnx",
+            'config': f"s3://models/default/{version}/model_config.json", **extra}).encode()
+        published[f"default/{version}/bearing_model.onnx"] = version.encode()
+        published[f"default/{version}/model_config.json"] = json.dumps(
+            {'threshold': threshold}).encode()
+        published['etag'] = f'"{version}"'
+
+    def download_file(bucket, key, path):
+        with open(path, 'wb') as f:
+            f.write(published[key])
+
+    snapshot = io.BytesIO()
+    np.save(snapshot, np.full((128, 100), 0.5, dtype=np.float32))
+    mock_s3.head_object.side_effect = lambda Bucket, Key: {'ETag': published['etag']}
+    mock_s3.get_object.side_effect = lambda Bucket, Key: (
+        {'ETag': published['etag'], 'Body': io.BytesIO(published[Key])} if Key.endswith('.json')
+        else {'Body': io.BytesIO(snapshot.getvalue()), 'ContentLength': len(snapshot.getvalue())})
+    mock_s3.download_file.side_effect = download_file
+
+    sessions = []
+
+    def make_session(path, **kwargs):
+        session = MagicMock()
+        session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+        session.get_inputs.return_value = [MagicMock()]
+        session.get_outputs.return_value = [MagicMock()]
+        sessions.append(path)
+        return session
+    mock_ort.InferenceSession.side_effect = make_session
+
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'ok.npy'}}}]}
+    publish('v1', 1.0)
+    with patch.multiple(lh, MODEL_MANIFEST='s3://models/default/current.json',
+                        MODEL_RELOAD_TTL=0, MODEL_CACHE_DIR=str(tmp_path),
+                        watcher=None, session=None, threshold=None):
+        first = json.loads(lambda_handler(event, None)['body'])
+        publish('v2', 0.01)
+        second = json.loads(lambda_handler(event, None)['body'])
+        third = json.loads(lambda_handler(event, None)['body'])
+        # model FCN nie pasuje do SCORING_MODE=windows: zostaje v2
+        publish('v3', 1.0, scoring_mode='fcn')
+        fourth = json.loads(lambda_handler(event, None)['body'])
+        version = lh.model_version
+
+    assert [r['status'] for r in (first, second, third, fourth)] == [
+        'HEALTHY', 'ANOMALY_DETECTED', 'ANOMALY_DETECTED', 'ANOMALY_DETECTED']
+    assert version == 'v2'
+    assert [os.path.basename(os.path.dirname(p)) for p in sessions] == ['v1', 'v2']
+    versions = [c.kwargs['Item']['model_version'] for c in mock_table.put_item.call_args_list]
+    assert versions == ['v1', 'v2', 'v2', 'v2']
+
+
+# * --- Test 20: Metryki EMF na wywołanie ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_emits_emf_metrics(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy każde wywołanie wypisuje jedną linię EMF z etapami, oknami i flagą zimnego startu'''
+    from src.metrics import Metrics, parse_emf_lines
+
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+    lh.session = None
+    lh.threshold = None
+    lh.cold_start = True
+    snapshot = np.zeros((128, 161), dtype=np.float32)
+    serve_objects(mock_s3, snapshot)
+
+    lines = []
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': 'a.npy'}}}]}
+    with patch.object(lh, 'metrics', Metrics(dimensions={'Function': 'test'}, emit=lines.append)):
+        lambda_handler(event, None)
+        lambda_handler(event, None)
+
+    first, second = parse_emf_lines(lines)
+    names = {m['Name'] for m in first['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    assert {'download_ms', 'windowing_ms', 'inference_ms', 'write_ms', 'request_ms',
+            'init_session_ms', 'windows', 'bytes_downloaded', 'peak_rss_mb'} <= names
+    assert first['Function'] == 'test'
+    assert first['windows'] == 4
+    assert first['bytes_downloaded'] == len(mock_s3.get_object(Bucket='b', Key='a.npy')['Body'].read())
+    assert (first['cold_start'], second['cold_start']) == (1, 0)
+    assert 'init_session_ms' not in second
+
+
+# * --- Test 21: Błędny rekord nie psuje reszty zdarzenia ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_bad_record_isolated(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy zły kształt i błąd oceny jednego pliku nie odrzucają pozostałych rekordów'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+
+    def run(outputs, feed):
+        batch = list(feed.values())[0]
+        if np.any(batch == 0.7):
+            raise RuntimeError("ORT: nieobsługiwane dane")
+        return [np.zeros_like(batch)]
+
+    mock_session.run.side_effect = run
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+    lh.session = None
+    lh.threshold = None
+
+    serve_objects(mock_s3, {'a.npy': np.full((128, 100), 0.1, dtype=np.float32),
+                            'narrow.npy': np.full((64, 161), 0.1, dtype=np.float32),
+                            'poison.npy': np.full((128, 100), 0.7, dtype=np.float32),
+                            'd.npy': np.full((128, 161), 0.3, dtype=np.float32)})
+    keys = ['a.npy', 'narrow.npy', 'poison.npy', 'd.npy']
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'}, 'object': {'key': k}}} for k in keys]}
+    response = failed_invocation(event)
+
+    body = json.loads(response['body'])
+    assert response['statusCode'] == 200
+    assert body['processed'] == 2 and body['failed'] == 2
+    assert 'kształt' in body['records'][1]['error']
+    assert 'ORT' in body['records'][2]['error']
+    assert [body['records'][i]['windows_count'] for i in (0, 3)] == [2, 4]
+    writer = mock_table.batch_writer.return_value.__enter__.return_value
+    assert writer.put_item.call_count == 2
+
+    # nieudany batch_writer: żaden rekord nie jest raportowany jako zapisany
+    writer.put_item.reset_mock()
+    mock_table.batch_writer.return_value.__exit__.side_effect = Exception("Throttling")
+    from src.metrics import Metrics, parse_emf_lines
+    lines = []
+    with patch.object(lh, 'metrics', Metrics(emit=lines.append)):
+        response = failed_invocation({'Records': [event['Records'][i] for i in (0, 3)]})
+
+    body = json.loads(response['body'])
+    assert response['statusCode'] == 500
+    assert body['processed'] == 0 and body['failed'] == 2
+    assert all('Throttling' in record['error'] for record in body['records'])
+    (document,) = parse_emf_lines(lines)
+    assert document['errors'] == 2 and document['write_errors'] == 2
+
+
+# * --- Test 22: Dzierżawa claimu z pozostałego czasu wywołania ---
+@patch('cloud.lambda_handler.s3')
+@patch('cloud.lambda_handler.table')
+@patch('cloud.lambda_handler.ort')
+@patch('cloud.lambda_handler.os.path.exists')
+def test_lambda_claim_lease_from_context(mock_exists, mock_ort, mock_table, mock_s3):
+    '''Sprawdza czy claim trwa tyle co wywołanie (+ margines), a nie dłużej niż ponowienia Lambdy'''
+    mock_exists.side_effect = lambda path: 'bearing_model.onnx' in str(path)
+    mock_session = MagicMock()
+    mock_ort.InferenceSession.return_value = mock_session
+    mock_session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    mock_session.get_inputs.return_value = [MagicMock()]
+    mock_session.get_outputs.return_value = [MagicMock()]
+    lh.session = None
+    lh.threshold = None
+    serve_objects(mock_s3, np.zeros((128, 100), dtype=np.float32))
+
+    guard = MagicMock()
+    guard.claim.return_value = True
+    guard.stats = {'lru_hits': 0, 'table_hits': 0, 'misses': 0, 'unkeyed': 0}
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 30000
+    context.aws_request_id = 'req-1'
+    event = {'Records': [{'s3': {'bucket': {'name': 'b'},
+                                 'object': {'key': 'a.npy', 'eTag': '"e1"'}}}]}
+    with patch.object(lh, 'guard', guard):
+        lambda_handler(event, context)
+
+    guard.claim.assert_called_once_with('b/a.npy#"e1"', 30 + lh.LEASE_MARGIN_SECONDS, 'req-1')
+    # tylko właściciel dzierżawy kończy lub zwalnia klucz
+    guard.complete.assert_called_once_with(['b/a.npy#"e1"'], 'req-1')
+    assert 30 + lh.LEASE_MARGIN_SECONDS < 60
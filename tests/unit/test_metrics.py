@@ -0,0 +1,81 @@
+import pytest
+import json
+import threading
+from src.metrics import Metrics, NULL_TIMER, parse_emf_lines, aggregate
+
+#*--- Test 1 ---
+def test_flush_emits_emf_document():
+    '''Jedna linia EMF: czasy etapów w ms, liczniki z jednostkami, wymiary; po flush stan wyzerowany'''
+    lines = []
+    metrics = Metrics(namespace='Test', dimensions={'Function': 'f'}, emit=lines.append)
+    metrics.add_time('download', 0.010)
+    metrics.add_time('download', 0.005)
+    metrics.count('bytes_downloaded', 100, 'Bytes')
+    metrics.count('bytes_downloaded', 50, 'Bytes')
+    metrics.gauge('cold_start', 1)
+    metrics.set_property('request_id', 'abc')
+    with metrics.timer('inference'):
+        pass
+
+    metrics.flush()
+
+    document = json.loads(lines[0])
+    directive = document['_aws']['CloudWatchMetrics'][0]
+    units = {m['Name']: m['Unit'] for m in directive['Metrics']}
+    assert directive['Namespace'] == 'Test'
+    assert directive['Dimensions'] == [['Function']]
+    assert document['Function'] == 'f' and document['request_id'] == 'abc'
+    assert document['download_ms'] == pytest.approx(15.0)
+    assert document['bytes_downloaded'] == 150
+    assert units['download_ms'] == 'Milliseconds' and units['bytes_downloaded'] == 'Bytes'
+    assert units['peak_rss_mb'] == 'Megabytes' and document['peak_rss_mb'] > 0
+    assert 'inference_ms' in units
+    assert metrics.timings == {} and metrics.values == {}
+
+#*--- Test 2 ---
+def test_disabled_metrics_are_noop():
+    '''Wyłączone metryki: wspólny pusty timer, nic nie jest zbierane ani wypisywane'''
+    lines = []
+    metrics = Metrics(enabled=False, emit=lines.append)
+    assert metrics.timer('download') is NULL_TIMER
+    with metrics.timer('download'):
+        metrics.count('windows', 4)
+    assert metrics.flush() is None
+    assert lines == [] and metrics.timings == {} and metrics.values == {}
+
+#*--- Test 3 ---
+def test_counts_from_threads_add_up():
+    '''Liczniki z wielu wątków (pula pobierania) sumują się bez strat'''
+    metrics = Metrics(emit=lambda line: None)
+
+    def work():
+        for _ in range(1000):
+            metrics.count('records')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.values['records'] == (4000, 'Count')
+
+#*--- Test 4 ---
+def test_aggregate_percentiles_from_log_lines():
+    '''Agregacja logów: linie z prefiksem runtime, zwykłe logi pominięte, percentyle per grupa'''
+    lines = ['START RequestId: 1\n', '[INFO] 📥 Pobieranie: a.npy\n']
+    for i in range(100):
+        metrics = Metrics(emit=lambda line: lines.append(f"2026-01-01T00:00:00Z\t{line}\n"))
+        metrics.add_time('inference', (i + 1) / 1000)
+        metrics.gauge('cold_start', int(i == 0))
+        metrics.flush()
+
+    documents = parse_emf_lines(lines)
+    summary = aggregate(documents)
+    by_start = aggregate(documents, by='cold_start')
+
+    assert len(documents) == 100
+    assert summary['all']['inference_ms']['count'] == 100
+    assert summary['all']['inference_ms']['p50'] == pytest.approx(50.5)
+    assert summary['all']['inference_ms']['p99'] == pytest.approx(99.01)
+    assert by_start['1']['inference_ms']['count'] == 1
+    assert by_start['0']['inference_ms']['count'] == 99
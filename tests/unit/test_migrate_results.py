@@ -0,0 +1,75 @@
+import pytest
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from cloud.migrate_results import migrate, migrate_item
+
+
+class FakeTable:
+    '''Tabela w pamięci: skan równoległy (po segmentach) i warunkowy update'''
+
+    def __init__(self, items):
+        self.items = {(i['device_id'], i['timestamp']): dict(i) for i in items}
+        self.scans = []
+
+    def scan(self, Segment=0, TotalSegments=1, **kwargs):
+        self.scans.append((Segment, TotalSegments, kwargs))
+        keys = sorted(self.items)[Segment::TotalSegments]
+        # filtr po stronie serwera: tylko elementy bez schema_version
+        return {'Items': [dict(self.items[k]) for k in keys
+                          if 'schema_version' not in self.items[k]]}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression,
+                    ExpressionAttributeNames, ExpressionAttributeValues):
+        item = self.items[(Key['device_id'], Key['timestamp'])]
+        if 'schema_version' in item:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        for assignment in UpdateExpression[len('SET '):].split(', '):
+            name, value = assignment.split(' = ')
+            item[ExpressionAttributeNames[name]] = ExpressionAttributeValues[value]
+
+
+def legacy(i):
+    return {'device_id': 'rig_1', 'timestamp': f't{i:02d}', 'mse_value': f'0.00{i}1',
+            'threshold': '0.002', 'windows_processed': '4', 'status': 'HEALTHY'}
+
+
+#*--- Test 1 ---
+def test_migrate_parallel_segments():
+    '''Sprawdza czy wszystkie elementy v1 są przepisane, każdy segment skanowany osobno'''
+    table = FakeTable([legacy(i) for i in range(10)])
+
+    stats = migrate(lambda: table, segments=3)
+
+    assert stats['found'] == 10 and stats['migrated'] == 10
+    assert sorted(segment for segment, _, _ in table.scans) == [0, 1, 2]
+    assert all('FilterExpression' in kwargs for _, _, kwargs in table.scans)
+    item = table.items[('rig_1', 't03')]
+    assert item['mse_value'] == Decimal('0.0031')
+    assert item['windows_processed'] == Decimal(4)
+    assert item['schema_version'] == 2
+    assert item['status'] == 'HEALTHY'
+
+    # ponowne uruchomienie nie ma nic do zrobienia
+    assert migrate(lambda: table, segments=3)['found'] == 0
+
+
+#*--- Test 2 ---
+def test_migrate_skips_items_rewritten_meanwhile():
+    '''Sprawdza czy element zapisany w międzyczasie przez Lambdę (v2) nie jest nadpisany'''
+    table = FakeTable([legacy(1)])
+    stale = dict(table.items[('rig_1', 't01')])
+    table.items[('rig_1', 't01')].update(mse_value=Decimal('0.9'), schema_version=2)
+
+    assert migrate_item(table, stale) is False
+    assert table.items[('rig_1', 't01')]['mse_value'] == Decimal('0.9')
+
+
+#*--- Test 3 ---
+def test_migrate_dry_run():
+    '''Sprawdza czy tryb --dry-run tylko liczy elementy'''
+    table = FakeTable([legacy(i) for i in range(4)])
+
+    stats = migrate(lambda: table, segments=2, dry_run=True)
+
+    assert stats == {**stats, 'found': 4, 'migrated': 0}
+    assert all('schema_version' not in item for item in table.items.values())
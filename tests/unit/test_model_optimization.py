@@ -0,0 +1,58 @@
+import pytest
+import shutil
+import numpy as np
+import onnxruntime as ort
+from src.model_optimization import (build_variants, calibration_windows,
+                                    WindowCalibrationReader)
+from src.ort_session import variant_path, MODEL_VARIANTS
+from src.scoring import score_spectrogram
+from edge.edge_inference import MODEL_PATH, FCN_MODEL_PATH
+
+
+def spectrograms(n, frames=161, seed=0):
+    '''Spektrogramy podobne do danych (wartości wokół 0.5)'''
+    rng = np.random.default_rng(seed)
+    return [np.clip(rng.normal(0.5, 0.1, (128, frames)), 0, 1).astype(np.float32)
+            for _ in range(n)]
+
+
+#*--- Test 1 ---
+def test_variant_path():
+    '''Sprawdza nazwy plików wariantów modelu'''
+    assert variant_path('models/bearing_model.onnx') == 'models/bearing_model.onnx'
+    assert (variant_path('models/bearing_model.onnx', 'int8_static')
+            == 'models/bearing_model.int8_static.onnx')
+    with pytest.raises(ValueError):
+        variant_path('models/bearing_model.onnx', 'int4')
+
+
+#*--- Test 2 ---
+def test_calibration_reader_layout():
+    '''Sprawdza czy okna kalibracyjne mają układ wejścia danego modelu'''
+    windows = calibration_windows(spectrograms(4), max_windows=10)
+    assert windows.shape == (10, 128, 64, 1)
+
+    nhwc = WindowCalibrationReader(MODEL_PATH, windows, batch_size=4)
+    assert [b.shape for b in nhwc.batches] == [(4, 128, 64, 1)] * 2 + [(2, 128, 64, 1)]
+    nchw = WindowCalibrationReader(FCN_MODEL_PATH, windows, batch_size=4)
+    assert nchw.get_next()[nchw.input_name].shape == (4, 1, 128, 64)
+
+    while nchw.get_next() is not None:
+        pass
+    nchw.rewind()
+    assert nchw.get_next() is not None
+
+
+#*--- Test 3 ---
+def test_variants_match_fp32(tmp_path):
+    '''Sprawdza czy warianty INT8/FP16 dają MSE bliskie modelowi fp32'''
+    model_path = str(tmp_path / 'bearing_model.onnx')
+    shutil.copy(MODEL_PATH, model_path)
+    paths = build_variants(model_path, calibration_windows(spectrograms(4), max_windows=64))
+    assert set(paths) == set(MODEL_VARIANTS) - {'fp32'}
+
+    test_spectrogram = spectrograms(1, seed=1)[0]
+    expected = score_spectrogram(ort.InferenceSession(model_path), test_spectrogram)
+    for variant, path in paths.items():
+        mse = score_spectrogram(ort.InferenceSession(path), test_spectrogram)
+        np.testing.assert_allclose(mse, expected, rtol=0.05, err_msg=variant)
@@ -0,0 +1,136 @@
+import pytest
+import io
+import json
+import os
+from unittest.mock import MagicMock
+from src.model_registry import (ModelRegistry, SessionCache, ArtifactStore, ManifestWatcher,
+                                device_from_key, parse_s3_uri, artifact_version,
+                                SESSION_MEMORY_FACTOR)
+
+
+def fake_download(contents):
+    '''download_file klienta S3 zapisujący podane bajty'''
+    def download_file(bucket, key, path):
+        with open(path, 'wb') as f:
+            f.write(contents[key])
+    return download_file
+
+#*--- Test 1 ---
+def test_device_from_key_and_s3_uri():
+    '''Urządzenie z prefiksu klucza, klucz bez prefiksu -> wartość domyślna'''
+    assert device_from_key('rig_7/2004.02.12.10.32.39.npy') == 'rig_7'
+    assert device_from_key('2004.02.12.10.32.39.npy', 'test_rig_1') == 'test_rig_1'
+    assert parse_s3_uri('s3://models/rig_7/model.onnx') == ('models', 'rig_7/model.onnx')
+    assert parse_s3_uri('bearing_model.onnx') is None
+
+#*--- Test 2 ---
+def test_session_cache_evicts_by_memory():
+    '''Najdawniej używana sesja usuwana po przekroczeniu budżetu pamięci'''
+    cache = SessionCache(max_bytes=250)
+    loads = []
+
+    def loader(name):
+        def load():
+            loads.append(name)
+            return f"session-{name}", 100
+        return load
+
+    assert cache.get('a', loader('a')) == 'session-a'
+    cache.get('b', loader('b'))
+    cache.get('a', loader('a'))          # a staje się najnowsza
+    cache.get('c', loader('c'))          # 300 B > 250 B -> usuwa b
+
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.bytes == 200
+    assert loads == ['a', 'b', 'c']
+    assert cache.stats['evictions'] == 1
+    assert cache.hit_rate == pytest.approx(1 / 4)
+
+    # pojedyncza sesja większa niż budżet zostaje w cache
+    cache.get('huge', lambda: ('session-huge', 1000))
+    assert len(cache) == 1 and 'huge' in cache
+
+#*--- Test 3 ---
+def test_registry_downloads_once_and_shares_sessions(tmp_path):
+    '''Model z S3 pobrany raz do katalogu cache, urządzenia z jednym modelem dzielą sesję'''
+    s3 = MagicMock()
+    s3.download_file.side_effect = fake_download({
+        'fleet/model.onnx': b'\0' * 1000,
+        'fleet/config.json': json.dumps({'threshold': 0.004}).encode()})
+    registry_spec = {
+        'default': {'model': 'bearing_model.onnx'},
+        'devices': {
+            'rig_7': {'model': 's3://models/fleet/model.onnx',
+                      'config': 's3://models/fleet/config.json'},
+            'rig_8': {'model': 's3://models/fleet/model.onnx',
+                      'config': 's3://models/fleet/config.json', 'threshold': 0.01}}}
+    scorer = MagicMock(buffer_bytes=500)
+    load_model = MagicMock(return_value=('session', scorer))
+    registry = ModelRegistry(registry_spec, load_model,
+                             store=ArtifactStore(s3, str(tmp_path)), cache=SessionCache())
+
+    rig_7 = registry.resolve('rig_7')
+    rig_8 = registry.resolve('rig_8')
+
+    assert registry.resolve('test_rig_1') is None
+    assert rig_7.session is rig_8.session
+    assert (rig_7.threshold, rig_8.threshold) == (0.004, 0.01)
+    load_model.assert_called_once_with(
+        os.path.join(str(tmp_path), 'models', 'fleet', 'model.onnx'), {'threshold': 0.004})
+    assert s3.download_file.call_count == 2
+    assert registry.cache.bytes == SESSION_MEMORY_FACTOR * 1000 + 500
+    assert registry.cache.stats['hits'] == 1
+    # wersja wyniku = hash treści modelu i configu, nie lokalizacja w S3
+    store_dir = os.path.join(str(tmp_path), 'models', 'fleet')
+    assert rig_7.version == artifact_version(os.path.join(store_dir, 'model.onnx'),
+                                             os.path.join(store_dir, 'config.json'))
+    assert rig_8.version == rig_7.version
+
+    # ciepły kontener: nowy rejestr korzysta z plików już zapisanych w /tmp
+    ModelRegistry(registry_spec, load_model, store=ArtifactStore(s3, str(tmp_path))).resolve('rig_7')
+    assert s3.download_file.call_count == 2
+
+#*--- Test 4 ---
+def test_manifest_watcher_ttl_and_etag():
+    '''Najwyżej jeden HEAD na TTL; manifest pobierany tylko po zmianie ETag'''
+    manifest = {'etag': '"v1"', 'body': {'version': 'v1'}}
+    s3 = MagicMock()
+    s3.head_object.side_effect = lambda Bucket, Key: {'ETag': manifest['etag']}
+    s3.get_object.side_effect = lambda Bucket, Key: {
+        'ETag': manifest['etag'], 'Body': io.BytesIO(json.dumps(manifest['body']).encode())}
+    now = [0.0]
+    watcher = ManifestWatcher(s3, 's3://models/default/current.json', ttl=60, clock=lambda: now[0])
+
+    assert watcher.poll() == {'version': 'v1'}
+    now[0] = 30
+    manifest.update(etag='"v2"', body={'version': 'v2'})
+    assert watcher.poll() is None              # przed upływem TTL: bez zapytań
+    assert s3.head_object.call_count == 1
+    now[0] = 61
+    assert watcher.poll() == {'version': 'v2'}
+    now[0] = 122
+    assert watcher.poll() is None              # ETag bez zmian: tylko HEAD
+    assert s3.head_object.call_count == 3
+    assert s3.get_object.call_count == 2
+    assert watcher.stats == {'checks': 3, 'changes': 2}
+
+#*--- Test 5 ---
+def test_threshold_only_device_uses_default_model():
+    '''Urządzenie nadpisujące tylko próg działa na modelu domyślnym (bez drugiej sesji, z przeładowaniem)'''
+    from src.model_registry import DeviceModel
+    load_model = MagicMock()
+    registry = ModelRegistry(
+        {'default': {'model': 'bearing_model.onnx', 'config': 'model_config.json'},
+         'devices': {'press_2': {'threshold': 0.004}}}, load_model)
+    default = DeviceModel('default', 'session-v1', 'scorer-v1', 0.002, 'v1')
+
+    press_2 = registry.resolve('press_2', default)
+
+    assert (press_2.session, press_2.scorer, press_2.version) == ('session-v1', 'scorer-v1', 'v1')
+    assert press_2.threshold == 0.004
+    load_model.assert_not_called()
+    assert len(registry.cache) == 0
+
+    # po przeładowaniu modelu domyślnego urządzenie dostaje nową sesję
+    reloaded = default._replace(session='session-v2', scorer='scorer-v2', version='v2')
+    assert registry.resolve('press_2', reloaded).session == 'session-v2'
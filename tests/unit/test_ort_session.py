@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+import onnxruntime as ort
+from src.ort_session import (available_cpus, session_options, create_session,
+                             optimize_model, optimized_path, RUNTIME_LEVEL_FOR_ARTIFACT)
+from edge.edge_inference import MODEL_PATH
+
+
+#*--- Test 1 ---
+def test_available_cpus_follows_lambda_memory(monkeypatch):
+    '''Sprawdza czy liczba wątków wynika z pamięci funkcji Lambda, a nie z rdzeni hosta'''
+    monkeypatch.setattr('os.sched_getaffinity', lambda pid: {0, 1, 2, 3}, raising=False)
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', raising=False)
+    assert available_cpus() == 4
+
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '512')
+    assert available_cpus() == 1
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '3538')
+    assert available_cpus() == 2
+
+
+#*--- Test 2 ---
+def test_session_options_explicit():
+    '''Sprawdza czy opcje sesji są ustawiane jawnie'''
+    options = session_options('basic', intra_op_threads=3, enable_mem_arena=False)
+
+    assert options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert options.intra_op_num_threads == 3
+    assert options.inter_op_num_threads == 1
+    assert not options.enable_cpu_mem_arena
+    assert options.execution_mode == ort.ExecutionMode.ORT_SEQUENTIAL
+
+
+#*--- Test 3 ---
+@pytest.mark.parametrize('level', ['extended', 'all'])
+def test_optimized_artifact_same_output(tmp_path, level):
+    '''Sprawdza czy zoptymalizowany model daje te same wyniki co oryginał'''
+    artifact = optimize_model(MODEL_PATH, str(tmp_path / 'model.opt.onnx'), level)
+    assert artifact.endswith('.opt.onnx')
+    assert optimized_path('dist/bearing_model.onnx') == 'dist/bearing_model.opt.onnx'
+
+    original = create_session(MODEL_PATH, intra_op_threads=1)
+    optimized = create_session(artifact, intra_op_threads=1,
+                               optimization_level=RUNTIME_LEVEL_FOR_ARTIFACT[level])
+    batch = np.random.default_rng(0).random((2, 128, 64, 1), dtype=np.float32)
+
+    expected = original.run(None, {original.get_inputs()[0].name: batch})[0]
+    result = optimized.run(None, {optimized.get_inputs()[0].name: batch})[0]
+    np.testing.assert_allclose(result, expected, atol=1e-5)
@@ -1,6 +1,6 @@
 import numpy as np
 import pytest
-from src.preprocessing import create_windows
+from src.preprocessing import create_windows, window_view, count_windows
 
 #*--- Test 1 ---
 def test_create_windows_shape():
@@ -101,3 +101,47 @@ def test_none_input():
     '''Sprawdza czy funkcja rzuci odpowiedni błąd gdy dostanie None'''
     with pytest.raises(AttributeError):
         create_windows(None)
+
+#*--- Test 12 ---
+def test_matches_loop_reference():
+    '''Sprawdza czy okna są identyczne z pętlą wycinków (dawna implementacja)'''
+    input_signal = np.random.rand(128, 500)
+    result = create_windows(input_signal)
+
+    expected = np.array([input_signal[:, s:s + 64] for s in range(0, 500 - 64 + 1, 32)])
+    np.testing.assert_array_equal(result[..., 0], expected.astype(np.float32))
+
+#*--- Test 13 ---
+def test_window_view_is_readonly_view():
+    '''Sprawdza czy window_view nie kopiuje danych i jest tylko do odczytu'''
+    input_signal = np.random.rand(128, 200).astype(np.float32)
+    view = window_view(input_signal)
+
+    assert view.shape == (5, 128, 64, 1)
+    assert np.shares_memory(view, input_signal)
+    assert not view.flags.writeable
+
+#*--- Test 14 ---
+def test_include_tail():
+    '''Sprawdza czy include_tail dodaje okno wyrównane do końca sygnału'''
+    input_signal = np.tile(np.arange(200, dtype=np.float32), (128, 1))
+
+    result = create_windows(input_signal, include_tail=True)
+
+    assert result.shape[0] == 6 == count_windows(200, include_tail=True)
+    np.testing.assert_array_equal(result[-1, 0, :, 0], np.arange(136, 200))
+    # Idealne dopasowanie - brak dodatkowego okna
+    assert create_windows(np.zeros((128, 160)), include_tail=True).shape[0] == 4
+
+#*--- Test 15 ---
+def test_preallocated_buffer():
+    '''Sprawdza czy okna trafiają do prealokowanego bufora, a za mały bufor daje ValueError'''
+    buffer = np.full((10, 128, 64, 1), -1, dtype=np.float32)
+    result = create_windows(np.ones((128, 200)), out=buffer)
+
+    assert result.shape[0] == 5
+    assert np.shares_memory(result, buffer)
+    assert np.all(buffer[:5] == 1) and np.all(buffer[5:] == -1)
+
+    with pytest.raises(ValueError):
+        create_windows(np.ones((128, 200)), out=np.empty((2, 128, 64, 1), dtype=np.float32))
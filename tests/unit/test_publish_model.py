@@ -0,0 +1,52 @@
+import pytest
+import json
+from unittest.mock import MagicMock
+from cloud.publish_model import publish, default_model_path
+from src.model_registry import artifact_version
+
+#*--- Test 1 ---
+def test_publish_writes_manifest_last(tmp_path):
+    '''Artefakty pod kluczem wersji (hash treści), manifest zapisany na końcu'''
+    model = tmp_path / 'bearing_model.onnx'
+    config = tmp_path / 'model_config.json'
+    model.write_bytes(b'model-v1')
+    config.write_text(json.dumps({'threshold': 0.003}))
+    s3 = MagicMock()
+
+    manifest = publish(s3, 'echoguard-models', 'default', str(model), str(config))
+
+    version = artifact_version(str(model), str(config))
+    assert manifest['version'] == version
+    assert manifest['model'] == f"s3://echoguard-models/default/{version}/bearing_model.onnx"
+    assert manifest['config'] == f"s3://echoguard-models/default/{version}/model_config.json"
+    assert manifest['scoring_mode'] == 'windows'
+    assert [c.args[2] for c in s3.upload_file.call_args_list] == [
+        f"default/{version}/bearing_model.onnx", f"default/{version}/model_config.json"]
+    put = s3.put_object.call_args.kwargs
+    assert put['Key'] == 'default/current.json'
+    assert json.loads(put['Body']) == manifest
+    assert s3.method_calls[-1][0] == 'put_object'
+
+    # inna zawartość modelu -> inna wersja
+    model.write_bytes(b'model-v2')
+    assert publish(s3, 'echoguard-models', 'default', str(model), str(config))['version'] != version
+
+#*--- Test 2 ---
+def test_fcn_manifest_names_fcn_model(tmp_path, monkeypatch):
+    '''Tryb fcn publikuje bearing_model_fcn.onnx (wariant z configu, gdy istnieje) i zapisuje tryb w manifeście'''
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'models' / 'bearing_model_fcn.onnx').write_bytes(b'fcn')
+    config = tmp_path / 'model_config.json'
+    config.write_text(json.dumps({'threshold': 0.003, 'model_variant': 'int8_static'}))
+
+    # brak wariantu int8 -> model fp32
+    model_path = default_model_path(str(config), 'fcn')
+    assert model_path == 'models/bearing_model_fcn.onnx'
+    (tmp_path / 'models' / 'bearing_model_fcn.int8_static.onnx').write_bytes(b'fcn-int8')
+    model_path = default_model_path(str(config), 'fcn')
+    assert model_path == 'models/bearing_model_fcn.int8_static.onnx'
+
+    manifest = publish(MagicMock(), 'echoguard-models', 'default', model_path, str(config), 'fcn')
+    assert manifest['scoring_mode'] == 'fcn'
+    assert manifest['model'].endswith('/bearing_model_fcn.int8_static.onnx')
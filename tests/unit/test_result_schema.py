@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from decimal import Decimal
+from unittest.mock import MagicMock
+from src.result_schema import (to_decimal, result_item, upgrade_item, is_current,
+                               scan_items, projection, error_profile, decode_profile,
+                               SCHEMA_VERSION)
+
+
+#*--- Test 1 ---
+def test_to_decimal():
+    '''Sprawdza konwersję liczb do Decimal akceptowanego przez DynamoDB'''
+    assert to_decimal(0.1) == Decimal('0.1')
+    assert to_decimal(np.float32(0.5)) == Decimal('0.5')
+    assert to_decimal(np.int64(7)) == Decimal(7)
+    assert to_decimal('0.0055') == Decimal('0.0055')
+    assert to_decimal('12') == Decimal(12)
+    with pytest.raises(ValueError):
+        to_decimal(float('nan'))
+
+
+#*--- Test 2 ---
+def test_result_item_numeric():
+    '''Sprawdza czy nowy element ma atrybuty liczbowe i wersję schematu'''
+    item = result_item('rig_1', '2004-02-12-10-32-39', 0.0031, 'ANOMALY_DETECTED',
+                       0.0015, 'a.npy', 4, scored_on='edge')
+
+    assert item['mse_value'] == Decimal('0.0031')
+    assert item['threshold'] == Decimal('0.0015')
+    assert item['windows_processed'] == Decimal(4)
+    assert item['schema_version'] == SCHEMA_VERSION
+    assert item['scored_on'] == 'edge'
+    assert 'processed_at' in item
+
+
+#*--- Test 3 ---
+def test_upgrade_legacy_item():
+    '''Sprawdza przepisanie elementu v1 (liczby jako tekst) do v2'''
+    legacy = {'device_id': 'rig_1', 'timestamp': 't', 'mse_value': '0.0055',
+              'threshold': '0.002', 'windows_processed': '4', 'status': 'HEALTHY'}
+    upgraded = upgrade_item(legacy)
+
+    assert not is_current(legacy) and is_current(upgraded)
+    assert upgraded['mse_value'] == Decimal('0.0055')
+    assert upgraded['windows_processed'] == Decimal(4)
+    assert upgraded['status'] == 'HEALTHY'
+    assert upgrade_item(upgraded) is upgraded
+
+
+#*--- Test 4 ---
+def test_scan_items_projection_and_pages():
+    '''Sprawdza czy skan przechodzi przez strony i wysyła projekcję do DynamoDB'''
+    table = MagicMock()
+    table.scan.side_effect = [{'Items': [{'a': 1}], 'LastEvaluatedKey': {'k': 1}},
+                              {'Items': [{'a': 2}]}]
+
+    items = scan_items(table, ('timestamp', 'mse_value'), segment=1, total_segments=4)
+
+    assert items == [{'a': 1}, {'a': 2}]
+    first, second = [call[1] for call in table.scan.call_args_list]
+    assert first['ProjectionExpression'] == '#f0, #f1'
+    assert first['ExpressionAttributeNames'] == {'#f0': 'timestamp', '#f1': 'mse_value'}
+    assert (first['Segment'], first['TotalSegments']) == (1, 4)
+    assert second['ExclusiveStartKey'] == {'k': 1}
+    assert projection(['status'])[1] == {'#f0': 'status'}
+
+
+#*--- Test 5 ---
+def test_error_profile_roundtrip():
+    '''Sprawdza profil błędu: float16, statystyki i dekodowanie atrybutu Binary'''
+    from boto3.dynamodb.types import Binary
+    window_mse = np.array([0.001, 0.0015, 0.02, 0.0012], dtype=np.float32)
+    band_error = np.linspace(1e-4, 1e-2, 128, dtype=np.float32)
+
+    attributes = error_profile(window_mse, band_error)
+
+    assert len(attributes['window_mse']) == 4 * 2
+    assert len(attributes['band_error']) == 128 * 2
+    assert attributes['mse_argmax'] == 2
+    assert attributes['mse_max'] == to_decimal(np.float32(0.02))
+    assert float(attributes['mse_p95']) == pytest.approx(np.percentile(window_mse, 95))
+    assert attributes['profile_pool'] == 1
+    # precyzja float16: ~3 cyfry znaczące
+    np.testing.assert_allclose(decode_profile(Binary(attributes['window_mse'])),
+                               window_mse, rtol=1e-3)
+    np.testing.assert_allclose(decode_profile(attributes['band_error']), band_error, rtol=1e-3)
+
+
+#*--- Test 6 ---
+def test_error_profile_pooled():
+    '''Sprawdza czy długi profil jest zmniejszany maksimum (szczyt nie ginie)'''
+    window_mse = np.full(1000, 0.001, dtype=np.float32)
+    window_mse[777] = 0.5
+
+    attributes = error_profile(window_mse, max_windows=100)
+
+    profile = decode_profile(attributes['window_mse'])
+    assert attributes['profile_pool'] == 10
+    assert len(profile) == 100
+    assert profile.argmax() == 77 and profile.max() == pytest.approx(0.5, rel=1e-3)
+    assert attributes['mse_argmax'] == 777
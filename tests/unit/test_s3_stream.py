@@ -0,0 +1,101 @@
+import pytest
+import io
+import numpy as np
+from unittest.mock import MagicMock
+from src.s3_stream import (read_npy_stream, read_npy_header, read_object,
+                           reusable_buffer, S3RangeReader)
+from src.codec import encode_bundle, decode_bundle
+
+
+def npy_bytes(array, version=None):
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, array, version=version)
+    return buffer.getvalue()
+
+
+def fake_s3(data):
+    '''Klient S3 zwracający jeden obiekt, z obsługą Range'''
+    s3 = MagicMock()
+    calls = []
+
+    def get_object(Bucket, Key, Range=None):
+        calls.append(Range)
+        body = data
+        if Range:
+            start, end = map(int, Range.replace('bytes=', '').split('-'))
+            body = data[start:end + 1]
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+    s3.get_object.side_effect = get_object
+    s3.head_object.return_value = {'ContentLength': len(data)}
+    return s3, calls
+
+
+#*--- Test 1 ---
+def test_read_npy_float32_direct():
+    '''Sprawdza czy float32 .npy jest czytany wprost do tablicy wynikowej'''
+    array = np.random.rand(128, 161).astype(np.float32)
+    result = read_npy_stream(io.BytesIO(npy_bytes(array)))
+
+    np.testing.assert_array_equal(result, array)
+    assert result.dtype == np.float32
+    assert result.flags.owndata and result.flags.writeable
+
+
+#*--- Test 2 ---
+def test_read_npy_converts_dtype_and_order():
+    '''Sprawdza konwersję float64 i tablice w porządku Fortrana'''
+    array = np.asfortranarray(np.random.rand(128, 50))
+    result = read_npy_stream(io.BytesIO(npy_bytes(array)))
+
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, array.astype(np.float32))
+
+
+#*--- Test 3 ---
+def test_read_npy_header_version_2():
+    '''Sprawdza odczyt nagłówka NPY w wersji 2.0'''
+    array = np.zeros((3, 4), dtype=np.float32)
+    stream = io.BytesIO(npy_bytes(array, version=(2, 0)))
+
+    shape, fortran_order, dtype = read_npy_header(stream)
+    assert shape == (3, 4) and not fortran_order and dtype == np.float32
+
+
+#*--- Test 4 ---
+def test_read_npy_rejects_other_data():
+    '''Sprawdza czy dane bez nagłówka NPY powodują ValueError, a ucięte EOFError'''
+    with pytest.raises(ValueError):
+        read_npy_stream(io.BytesIO(b'EGQ1' + bytes(20)))
+    with pytest.raises(EOFError):
+        read_npy_stream(io.BytesIO(npy_bytes(np.ones((128, 10), dtype=np.float32))[:-8]))
+
+
+#*--- Test 5 ---
+def test_read_object_reuses_buffer():
+    '''Sprawdza czy kolejne obiekty trafiają do tego samego bufora'''
+    s3, _ = fake_s3(b'x' * 1000)
+    first = read_object(s3, 'b', 'k')
+    assert bytes(first) == b'x' * 1000
+
+    s3, _ = fake_s3(b'y' * 500)
+    second = read_object(s3, 'b', 'k')
+    assert bytes(second) == b'y' * 500
+    assert second.obj is first.obj is reusable_buffer(10).obj
+
+
+#*--- Test 6 ---
+def test_range_reader_bundle():
+    '''Sprawdza czy paczka czytana zakresami (Range GET) daje te same snapshoty'''
+    snapshots = [np.random.rand(128, 161).astype(np.float32) for _ in range(5)]
+    manifest = [{'timestamp': f't{i}'} for i in range(5)]
+    payload = encode_bundle(snapshots, manifest, dtype='float32', compress=False)
+    s3, calls = fake_s3(payload)
+
+    reader = S3RangeReader(s3, 'b', 'k', block_size=4096)
+    result = decode_bundle(io.BufferedReader(reader))
+
+    assert [entry for entry, _ in result] == manifest
+    for (_, decoded), original in zip(result, snapshots):
+        np.testing.assert_array_equal(decoded, original)
+    assert all(r is not None for r in calls)
+    assert reader.bytes_fetched <= 2 * len(payload)
@@ -0,0 +1,212 @@
+import pytest
+import json
+import os
+import numpy as np
+from unittest.mock import MagicMock
+from src.scoring import (load_threshold, load_model_variant, reconstruction_mse,
+                         score_spectrogram, score_spectrogram_fcn, windowed_mse,
+                         iter_window_batches, MicroBatchScorer, tune_micro_batch,
+                         classify, DEFAULT_THRESHOLD)
+from edge.edge_inference import EdgeScorer, MODEL_PATH, FCN_MODEL_PATH
+from src.codec import decode_result, is_result_key
+
+
+def zero_session():
+    '''Sesja ONNX, której rekonstrukcja to same zera'''
+    session = MagicMock()
+    session.get_inputs.return_value = [MagicMock()]
+    session.get_outputs.return_value = [MagicMock()]
+    session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    return session
+
+
+#*--- Test 1 ---
+def test_load_threshold(tmp_path):
+    '''Sprawdza odczyt progu z configu i wartość domyślną'''
+    config = tmp_path / 'model_config.json'
+    config.write_text(json.dumps({'threshold': 0.0123}))
+
+    assert load_threshold(str(config)) == 0.0123
+    assert load_threshold(str(tmp_path / 'brak.json')) == DEFAULT_THRESHOLD
+    # bez "model_variant" w configu zostaje model fp32
+    assert load_model_variant(str(config)) == 'fp32'
+    config.write_text(json.dumps({'threshold': 0.0123, 'model_variant': 'int8_static'}))
+    assert load_model_variant(str(config)) == 'int8_static'
+
+
+#*--- Test 2 ---
+def test_reconstruction_mse_per_window():
+    '''Sprawdza czy MSE liczone jest osobno dla każdego okna'''
+    batch = np.stack([np.full((128, 64, 1), v, dtype=np.float32) for v in (0.1, 0.5)])
+    mse = reconstruction_mse(batch, np.zeros_like(batch))
+    np.testing.assert_allclose(mse, [0.01, 0.25], rtol=1e-5)
+
+
+#*--- Test 3 ---
+def test_score_spectrogram_windows():
+    '''Sprawdza czy spektrogram jest dzielony na okna i oceniany jednym wywołaniem'''
+    session = zero_session()
+    mse = score_spectrogram(session, np.full((128, 161), 0.2, dtype=np.float32))
+
+    assert len(mse) == 4
+    session.run.assert_called_once()
+    np.testing.assert_allclose(mse, 0.04, rtol=1e-5)
+    assert classify(float(np.mean(mse)), 0.05) == "HEALTHY"
+    assert classify(float(np.mean(mse)), 0.01) == "ANOMALY_DETECTED"
+
+
+#*--- Test 4 ---
+def test_edge_scorer_upload_policy():
+    '''Sprawdza czy spektrogram jest wysyłany tylko przy anomalii lub co N-ty snapshot'''
+    scorer = EdgeScorer(session=zero_session(), sample_every=3)
+    scorer.threshold = 0.01
+    healthy = np.full((128, 161), 0.05, dtype=np.float32)
+    anomaly = np.full((128, 161), 0.5, dtype=np.float32)
+
+    flags = [scorer.score(f"t{i}", healthy)[1] for i in range(6)]
+    assert flags == [False, False, True, False, False, True]
+
+    record, send = scorer.score('t6', anomaly)
+    assert send
+    assert record['status'] == "ANOMALY_DETECTED"
+    assert record['windows'] == 4
+
+    # anomalie nie przesuwają licznika próbkowania zdrowych snapshotów
+    scorer = EdgeScorer(session=zero_session(), sample_every=2)
+    scorer.threshold = 0.01
+    sequence = [healthy, anomaly, healthy, anomaly, anomaly, healthy, healthy]
+    flags = [scorer.score(f"t{i}", s)[1] for i, s in enumerate(sequence)]
+    assert flags == [False, True, True, True, True, False, True]
+
+
+#*--- Test 5 ---
+def test_edge_result_record_roundtrip():
+    '''Sprawdza czy rekord wyniku jest mały i odczytywalny po stronie chmury'''
+    scorer = EdgeScorer(session=zero_session())
+    record, _ = scorer.score('2004.02.12.10.32.39',
+                             np.full((128, 161), 0.01, dtype=np.float32))
+    payload = scorer.result_payload(record)
+
+    assert len(payload) < 512
+    assert decode_result(payload) == record
+    assert is_result_key(scorer.result_key('2004.02.12.10.32.39'))
+
+
+#*--- Test 6 ---
+def test_fcn_scoring_matches_windows_for_pixelwise_model():
+    '''Sprawdza czy MSE okien z mapy błędów jest identyczne z oknami, gdy model działa pikselowo'''
+    def pixelwise_session():
+        session = MagicMock()
+        session.get_inputs.return_value = [MagicMock()]
+        session.get_outputs.return_value = [MagicMock()]
+        session.run.side_effect = lambda outputs, feed: [np.sqrt(list(feed.values())[0])]
+        return session
+
+    spectrogram = np.random.default_rng(1).random((128, 161)).astype(np.float32)
+
+    windows = score_spectrogram(pixelwise_session(), spectrogram)
+    fcn_session = pixelwise_session()
+    fcn = score_spectrogram_fcn(fcn_session, spectrogram)
+
+    np.testing.assert_allclose(fcn, windows, rtol=1e-5)
+    # jedno przejście, szerokość dopełniona do wielokrotności 8
+    fcn_session.run.assert_called_once()
+    assert list(fcn_session.run.call_args[0][1].values())[0].shape == (1, 1, 128, 168)
+
+
+#*--- Test 7 ---
+def test_windowed_mse_sliding_mean():
+    '''Sprawdza średnią kroczącą po mapie błędów dla pozycji okien create_windows'''
+    errors = np.tile(np.arange(200, dtype=np.float32), (128, 1))
+    result = windowed_mse(errors)
+
+    assert len(result) == 5
+    np.testing.assert_allclose(result, [np.arange(s, s + 64).mean() for s in range(0, 137, 32)])
+
+
+#*--- Test 8 ---
+@pytest.mark.skipif(not os.path.exists(FCN_MODEL_PATH), reason='brak modelu FCN')
+def test_fcn_model_parity_with_window_model():
+    '''Sprawdza zgodność modelu FCN z modelem okienkowym (identyczne okno, bliskie MSE pliku)'''
+    import onnxruntime as ort
+    window_session = ort.InferenceSession(MODEL_PATH)
+    fcn_session = ort.InferenceSession(FCN_MODEL_PATH)
+    rng = np.random.default_rng(2)
+
+    # Pojedyncze okno 64: identyczna sieć, identyczny wynik
+    window = rng.random((128, 64)).astype(np.float32)
+    np.testing.assert_allclose(score_spectrogram_fcn(fcn_session, window),
+                               score_spectrogram(window_session, window), rtol=1e-4)
+
+    # Cały plik: okna widzą kontekst sąsiadów zamiast zer na brzegach -> małe różnice
+    spectrogram = np.clip(rng.normal(0.5, 0.1, (128, 161)), 0, 1).astype(np.float32)
+    windows = score_spectrogram(window_session, spectrogram)
+    fcn = score_spectrogram_fcn(fcn_session, spectrogram)
+    assert fcn.shape == windows.shape
+    assert abs(fcn.mean() - windows.mean()) / windows.mean() < 0.1
+
+
+#*--- Test 9 ---
+def test_window_batches_span_spectrograms():
+    '''Sprawdza czy micro-batche mają stały rozmiar i łączą okna kolejnych spektrogramów'''
+    spectrograms = [np.full((128, 161), 1, dtype=np.float32),   # 4 okna
+                    np.full((128, 100), 2, dtype=np.float32),   # 2 okna
+                    np.full((128, 30), 3, dtype=np.float32)]    # 1 okno (padding)
+    batches = [batch.copy() for batch in iter_window_batches(spectrograms, batch_size=3)]
+
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [b[:, 0, 0, 0].tolist() for b in batches] == [[1, 1, 1], [1, 2, 2], [3]]
+
+
+#*--- Test 10 ---
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason='brak modelu')
+def test_micro_batch_scorer_matches_single_batch():
+    '''Sprawdza czy micro-batching (IOBinding) daje te same MSE co jeden batch'''
+    import onnxruntime as ort
+    session = ort.InferenceSession(MODEL_PATH)
+    spectrograms = [np.random.default_rng(3).random((128, 800), dtype=np.float32),
+                    np.random.default_rng(4).random((128, 100), dtype=np.float32)]
+
+    scorer = MicroBatchScorer(session, batch_size=8)
+    result = scorer.score(spectrograms)
+
+    assert scorer._binding is not None
+    assert scorer.batches == 4
+    for mse, spectrogram in zip(result, spectrograms):
+        np.testing.assert_allclose(mse, score_spectrogram(session, spectrogram), rtol=1e-5)
+    all_mse = np.concatenate(result)
+    assert scorer.windows == len(all_mse) == 26
+    assert scorer.mean_mse == pytest.approx(all_mse.mean(), rel=1e-5)
+    assert scorer.max_mse == pytest.approx(all_mse.max())
+
+
+#*--- Test 11 ---
+def test_tune_micro_batch_report():
+    '''Sprawdza czy strojenie mierzy każdy rozmiar i wybiera najszybszy'''
+    best, report = tune_micro_batch(zero_session(), candidates=(1, 4, 16), n_windows=16, repeat=1)
+
+    assert [row['batch_size'] for row in report] == [1, 4, 16]
+    assert best == max(report, key=lambda row: row['windows_per_s'])['batch_size']
+    assert report[2]['buffer_mb'] == pytest.approx(16 * 2 * 128 * 64 * 4 / 1e6)
+
+
+#*--- Test 12 ---
+def test_band_errors_per_snapshot():
+    '''Sprawdza błąd w pasmach mel: micro-batche i FCN dają ten sam profil pasm'''
+    levels = np.linspace(0, 1, 128, dtype=np.float32)
+    first = np.repeat(levels[:, None], 100, axis=1)
+    second = np.full((128, 161), 0.5, dtype=np.float32)
+
+    scorer = MicroBatchScorer(zero_session(), batch_size=3)
+    mse, bands = scorer.score([first, second], band_errors=True)
+
+    assert [len(m) for m in mse] == [2, 4]
+    assert [b.shape for b in bands] == [(128,), (128,)]
+    # rekonstrukcja = zera -> błąd pasma = kwadrat jego wartości
+    np.testing.assert_allclose(bands[0], levels ** 2, rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(bands[1], 0.25, rtol=1e-5)
+    np.testing.assert_allclose(mse[0], np.mean(levels ** 2), rtol=1e-5)
+
+    fcn_mse, fcn_bands = score_spectrogram_fcn(zero_session(), first, band_errors=True)
+    np.testing.assert_allclose(fcn_bands, levels ** 2, rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(fcn_mse, mse[0], rtol=1e-5)
@@ -0,0 +1,152 @@
+import pytest
+import asyncio
+import os
+import numpy as np
+from unittest.mock import MagicMock, patch
+import cloud.lambda_handler as lh
+from cloud.scoring_worker import ScoringWorker, LocalDirectoryS3, watch_directory
+from src.idempotency import IdempotencyGuard
+from src.scoring import MicroBatchScorer
+from src.metrics import Metrics, parse_emf_lines
+
+
+@pytest.fixture
+def handler_state():
+    '''Sesja z idealną rekonstrukcją, licznik wywołań oceny, tabela wyników jako mock'''
+    session = MagicMock()
+    session.run.side_effect = lambda outputs, feed: [np.zeros_like(list(feed.values())[0])]
+    session.get_inputs.return_value = [MagicMock(name='input_node')]
+    session.get_outputs.return_value = [MagicMock(name='output_node')]
+    table = MagicMock()
+    writer = table.batch_writer.return_value.__enter__.return_value
+    calls = []
+    score = lh._score_snapshots
+
+    def counting_score(spectrograms, model=None):
+        calls.append(len(spectrograms))
+        return score(spectrograms, model)
+
+    with patch.object(lh, 'session', session), \
+            patch.object(lh, 'scorer', MicroBatchScorer(session, 8)), \
+            patch.object(lh, 'threshold', 0.5), \
+            patch.object(lh, 'table', table), \
+            patch.object(lh, 'guard', IdempotencyGuard()), \
+            patch.object(lh, '_score_snapshots', side_effect=counting_score):
+        yield {'table': table, 'writer': writer, 'calls': calls, 'session': session}
+
+
+def write_snapshots(directory, names, frames=161):
+    for name in names:
+        np.save(os.path.join(directory, name), np.zeros((128, frames), dtype=np.float32))
+
+
+def run_worker(directory, names, **options):
+    '''Wysyła zdarzenia dla plików z katalogu i czeka na zapis wyników'''
+    async def run():
+        worker = ScoringWorker(**options)
+        await worker.start()
+        client = LocalDirectoryS3(str(directory))
+        acks = []
+        for name in names:
+            await worker.submit(str(directory), name, client=client,
+                                ack=lambda name=name: acks.append(name))
+        await worker.stop()
+        return worker, acks
+
+    return asyncio.run(run())
+
+#*--- Test 1 ---
+def test_worker_coalesces_files_into_one_scoring_call(tmp_path, handler_state):
+    '''Pliki wielu urządzeń w jednym wywołaniu oceny i jednym batch_writerze'''
+    names = [f"2004.02.12.10.{i:02d}.00.npy" for i in range(6)]
+    write_snapshots(tmp_path, names)
+
+    worker, acks = run_worker(tmp_path, names, max_windows=1024, max_latency=0.2)
+
+    assert handler_state['calls'] == [6]
+    assert handler_state['table'].batch_writer.call_count == 1
+    assert handler_state['writer'].put_item.call_count == 6
+    assert sorted(acks) == names
+    assert worker.stats['files'] == 6
+    assert worker.stats['windows'] == 6 * 4
+    assert len(worker.latencies) == 6
+
+#*--- Test 2 ---
+def test_worker_caps_batch_at_max_windows(tmp_path, handler_state):
+    '''Paczka kończy się po max_windows oknach, reszta idzie w kolejnym wywołaniu'''
+    names = [f"2004.02.12.10.{i:02d}.00.npy" for i in range(3)]
+    write_snapshots(tmp_path, names)   # 161 ramek = 4 okna
+
+    worker, acks = run_worker(tmp_path, names, max_windows=8, max_latency=0.2)
+
+    assert sum(handler_state['calls']) == 3
+    assert max(handler_state['calls']) <= 2
+    assert worker.stats['batches'] == len(handler_state['calls'])
+    assert sorted(acks) == names
+
+#*--- Test 3 ---
+def test_worker_failed_file_not_acked(tmp_path, handler_state):
+    '''Uszkodzony plik to błąd tylko tego pliku; bez potwierdzenia, reszta zapisana'''
+    write_snapshots(tmp_path, ['2004.02.12.10.00.00.npy'])
+    (tmp_path / '2004.02.12.10.01.00.npy').write_bytes(b'not a numpy file')
+
+    worker, acks = run_worker(tmp_path, ['2004.02.12.10.00.00.npy', '2004.02.12.10.01.00.npy'],
+                              max_windows=1024, max_latency=0.05)
+
+    assert acks == ['2004.02.12.10.00.00.npy']
+    assert worker.stats['errors'] == 1
+    assert worker.stats['files'] == 1
+
+#*--- Test 4 ---
+def test_watch_directory_moves_processed_files(tmp_path, handler_state):
+    '''Watcher zgłasza nowe pliki, po zapisie przenosi je do processed/'''
+    names = ['2004.02.12.10.00.00.npy', '2004.02.12.10.10.00.npy']
+    write_snapshots(tmp_path, names)
+    (tmp_path / 'notes.txt').write_text('pomijany')
+
+    async def run():
+        worker = ScoringWorker(max_windows=1024, max_latency=0.01)
+        await worker.start()
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(watch_directory(worker, str(tmp_path), 0.01, stop))
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if worker.stats['files'] == 2:
+                break
+        stop.set()
+        await watcher
+        await worker.stop()
+        return worker
+
+    worker = asyncio.run(run())
+
+    assert worker.stats['files'] == 2
+    assert sorted(os.listdir(tmp_path / 'processed')) == names
+    assert sorted(os.listdir(tmp_path)) == ['notes.txt', 'processed']
+
+#*--- Test 5 ---
+def test_worker_scoring_failure_nacks_only_bad_file(tmp_path, handler_state):
+    '''Plik psujący wspólną ocenę (i plik o złym kształcie) nie odrzuca reszty paczki'''
+    def run(outputs, feed):
+        batch = list(feed.values())[0]
+        if np.any(batch == 0.7):
+            raise RuntimeError("ORT: nieobsługiwane dane")
+        return [np.zeros_like(batch)]
+
+    handler_state['session'].run.side_effect = run
+    names = ['a.npy', 'b.npy', 'c.npy', 'd.npy']
+    write_snapshots(tmp_path, ['a.npy', 'd.npy'])
+    np.save(tmp_path / 'b.npy', np.zeros((64, 161), dtype=np.float32))
+    np.save(tmp_path / 'c.npy', np.full((128, 161), 0.7, dtype=np.float32))
+
+    lines = []
+    with patch.object(lh, 'metrics', Metrics(emit=lines.append)):
+        worker, acks = run_worker(tmp_path, names, max_windows=1024, max_latency=0.2)
+
+    assert sorted(acks) == ['a.npy', 'd.npy']
+    assert worker.stats['errors'] == 2
+    documents = parse_emf_lines(lines)
+    assert sum(d.get('errors', 0) for d in documents) == 2
+    assert sum(d['records'] for d in documents) == 4
+    assert worker.stats['files'] == 2
+    assert handler_state['writer'].put_item.call_count == 2
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from src.features import melspectrogram, power_to_db, normalize_melspec
+from src.streaming import StreamingMelspec
+
+
+def _signal(n_samples=20480):
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples) / 20000
+    return (np.sin(2 * np.pi * 700 * t) + rng.normal(0, 0.2, n_samples)).astype(np.float32)
+
+
+#*--- Test 1 ---
+@pytest.mark.parametrize('chunk_size', [100, 128, 1000, 4096, 20480])
+def test_stream_matches_batch(chunk_size):
+    '''Sprawdza czy strumień w dowolnych kawałkach + flush daje to samo co wersja wsadowa'''
+    signal = _signal()
+    stream = StreamingMelspec()
+
+    for start in range(0, len(signal), chunk_size):
+        stream.push(signal[start:start + chunk_size])
+    stream.flush()
+
+    expected = melspectrogram(signal)
+    assert stream.melspec().shape == expected.shape == (128, 161)
+    np.testing.assert_allclose(stream.melspec(), expected, rtol=1e-4, atol=1e-7)
+
+    expected_norm = normalize_melspec(power_to_db(expected))
+    np.testing.assert_allclose(stream.normalized(), expected_norm, atol=1e-4)
+
+
+#*--- Test 2 ---
+def test_stream_computes_only_new_frames():
+    '''Sprawdza czy każdy kawałek liczy tylko nowe ramki STFT (hop 128)'''
+    stream = StreamingMelspec()
+
+    # 1024 zer paddingu + 1024 próbki = pierwsza pełna ramka
+    assert stream.push(np.zeros(1023)) == 0
+    assert stream.push(np.zeros(1)) == 1
+    assert stream.push(np.zeros(127)) == 0
+    assert stream.push(np.zeros(1)) == 1
+    assert stream.push(np.zeros(128 * 10)) == 10
+    assert stream.frames_emitted == 12
+
+
+#*--- Test 3 ---
+def test_stream_ring_keeps_last_frames():
+    '''Sprawdza czy bufor pierścieniowy przechowuje tylko ostatnie max_frames ramek'''
+    signal = _signal(40960)
+    stream = StreamingMelspec(max_frames=50)
+
+    for start in range(0, len(signal), 500):
+        stream.push(signal[start:start + 500])
+
+    full = StreamingMelspec(max_frames=1000)
+    full.push(signal)
+
+    assert len(stream) == 50
+    np.testing.assert_allclose(stream.melspec(), full.melspec()[:, -50:], rtol=1e-4, atol=1e-7)
+
+
+#*--- Test 4 ---
+def test_stream_normalized_range_and_dtype():
+    '''Sprawdza czy znormalizowana macierz jest w zakresie [0, 1] i typu float32'''
+    stream = StreamingMelspec()
+    stream.push(_signal(8000))
+    result = stream.normalized()
+
+    assert result.dtype == np.float32
+    assert result.shape[0] == 128
+    assert result.min() >= 0 and result.max() <= 1
+
+
+#*--- Test 5 ---
+def test_stream_reset():
+    '''Sprawdza czy reset czyści stan strumienia'''
+    stream = StreamingMelspec()
+    stream.push(_signal(8000))
+    stream.reset()
+
+    assert len(stream) == 0
+    assert stream.frames_emitted == 0
+    assert stream.melspec().shape == (128, 0)
@@ -0,0 +1,115 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from edge.uploader import S3Uploader
+
+
+#*--- Test 1 ---
+def test_uploader_puts_from_memory():
+    '''Sprawdza czy dane idą przez put_object z pamięci (bez plików tymczasowych)'''
+    mock_s3 = MagicMock()
+
+    with S3Uploader('bucket', mock_s3, max_workers=2) as uploader:
+        uploader.submit('a.egq', b'12345')
+        uploader.submit('b.egq', b'678')
+
+    keys = sorted(call.kwargs['Key'] for call in mock_s3.put_object.call_args_list)
+    assert keys == ['a.egq', 'b.egq']
+    mock_s3.upload_file.assert_not_called()
+
+    stats = uploader.stats()
+    assert stats['uploaded'] == 2
+    assert stats['bytes_sent'] == 8
+    assert stats['queue_depth'] == 0
+
+
+#*--- Test 2 ---
+def test_uploader_bounded_queue():
+    '''Sprawdza czy submit blokuje się po osiągnięciu max_pending (backpressure)'''
+    release = threading.Event()
+    mock_s3 = MagicMock()
+    mock_s3.put_object.side_effect = lambda **kwargs: release.wait(5)
+
+    uploader = S3Uploader('bucket', mock_s3, max_workers=1, max_pending=2)
+    uploader.submit('a', b'x')
+    uploader.submit('b', b'x')
+
+    blocked = threading.Thread(target=uploader.submit, args=('c', b'x'))
+    blocked.start()
+    time.sleep(0.1)
+    assert blocked.is_alive(), 'Trzecie zlecenie powinno czekać na wolne miejsce'
+    assert uploader.queue_depth == 2
+
+    release.set()
+    blocked.join(5)
+    uploader.close()
+    assert uploader.stats()['uploaded'] == 3
+    assert uploader.max_queue_depth == 2
+
+
+#*--- Test 3 ---
+def test_uploader_reports_failures():
+    '''Sprawdza czy błąd wysyłki trafia do callbacka i statystyk'''
+    mock_s3 = MagicMock()
+    mock_s3.put_object.side_effect = Exception('Access Denied')
+    errors = []
+
+    with S3Uploader('bucket', mock_s3) as uploader:
+        future = uploader.submit('a', b'x', callback=lambda key, error: errors.append((key, error)))
+        with pytest.raises(Exception, match='Access Denied'):
+            future.result()
+
+    assert uploader.stats()['failed'] == 1
+    assert errors[0][0] == 'a'
+
+
+#*--- Test 4 ---
+def test_bundler_flushes_every_n_snapshots():
+    '''Sprawdza czy paczka jest wysyłana co max_snapshots snapshotów oraz przy zamknięciu'''
+    import numpy as np
+    from edge.uploader import SnapshotBundler
+    from src.codec import decode_bundle
+
+    mock_s3 = MagicMock()
+    spectrogram = np.zeros((128, 161), dtype=np.float32)
+
+    with S3Uploader('bucket', mock_s3) as uploader:
+        with SnapshotBundler(uploader, device_id='rig_1', max_snapshots=3) as bundler:
+            for i in range(7):
+                bundler.add(f'2004.02.12.10.{i}2.39', spectrogram)
+
+    calls = mock_s3.put_object.call_args_list
+    assert len(calls) == 3
+    keys = sorted(call.kwargs['Key'] for call in calls)
+    assert keys[0] == 'rig_1_2004.02.12.10.02.39_3.bundle.npz'
+    sizes = sorted(len(decode_bundle(call.kwargs['Body'])) for call in calls)
+    assert sizes == [1, 3, 3]
+
+
+#*--- Test 5 ---
+def test_bundler_flushes_partial_bundle_after_max_age():
+    '''Sprawdza czy niepełna paczka jest wysyłana po max_age_s bez kolejnego add()'''
+    import numpy as np
+    from edge.uploader import SnapshotBundler
+    from src.codec import decode_bundle
+
+    mock_s3 = MagicMock()
+    sent = threading.Event()
+    spectrogram = np.zeros((128, 161), dtype=np.float32)
+
+    with S3Uploader('bucket', mock_s3) as uploader:
+        bundler = SnapshotBundler(uploader, device_id='rig_1', max_snapshots=10,
+                                  max_age_s=0.05, callback=lambda key, error: sent.set())
+        bundler.add('2004.02.12.10.02.39', spectrogram)
+        bundler.add('2004.02.12.10.12.39', spectrogram)
+
+        assert sent.wait(timeout=5)
+        assert len(bundler) == 0 and bundler.bundles_sent == 1
+        # kolejna paczka ma własny licznik czasu
+        bundler.add('2004.02.12.10.22.39', spectrogram)
+        bundler.flush()
+
+    calls = mock_s3.put_object.call_args_list
+    assert [len(decode_bundle(call.kwargs['Body'])) for call in calls] == [2, 1]
+    assert calls[0].kwargs['Key'] == 'rig_1_2004.02.12.10.02.39_2.bundle.npz'